@@ -0,0 +1,10 @@
+"""``python -m backend``: run the API server (see serve.py)."""
+import sys
+from pathlib import Path
+
+# The backend modules import each other by their flat names
+sys.path.insert(0, str(Path(__file__).parent))
+
+from serve import main  # noqa: E402
+
+main()
@@ -0,0 +1,316 @@
+"""Concurrent load test for the Eastern Empire API.
+
+Drives a weighted mix of reads and writes across the events, newsletter,
+contact and bookings routes and reports throughput and p50/p95/p99 latency
+per route. By default the app runs in-process over an ASGI transport with
+the in-memory storage engine, which isolates application overhead; pass
+--url to load a running deployment (or --storage mongo to run in-process
+against MONGO_URL) to include database round trips.
+
+Against a real database (--url or --storage mongo) only the read routes are
+driven unless --writes is given: the write routes create events, newsletter
+subscriptions, contact messages and bookings that stay behind, and on a
+production deployment they reach real inboxes and email checks.
+
+    python bench_load.py --concurrency 32 --duration 10 --output bench.json
+    python bench_load.py --mix launch --compare bench.json
+    python bench_load.py --url http://localhost:8001 --writes
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import httpx
+
+ROOT_DIR = Path(__file__).parent
+
+
+# Request builders: each returns (method, path, params, json body)
+
+def list_upcoming_events(rng):
+    return "GET", "/api/events", {"upcoming": "true"}, None
+
+
+def list_past_events(rng):
+    return "GET", "/api/events", {"to": date.today().isoformat(), "limit": 20}, None
+
+
+def create_event(rng):
+    day = date.today() + timedelta(days=rng.randint(1, 365))
+    return "POST", "/api/events", None, {
+        "title": f"Load test show {uuid.uuid4().hex[:8]}",
+        "venue": "City Recital Hall",
+        "address": "2 Angel Place, Sydney NSW 2000",
+        "date": day.isoformat(),
+        "time": "7:30 PM",
+    }
+
+
+def subscribe_newsletter(rng):
+    return "POST", "/api/newsletter", None, {"email": f"fan-{uuid.uuid4().hex}@example.com"}
+
+
+def list_newsletter(rng):
+    return "GET", "/api/newsletter", None, None
+
+
+def submit_contact(rng):
+    return "POST", "/api/contact", None, {
+        "firstName": "Asha",
+        "lastName": "Load",
+        "email": f"contact-{uuid.uuid4().hex[:12]}@example.com",
+        "subject": "Booking question",
+        "message": "Are you available for a Diwali event next year?",
+    }
+
+
+def list_contact(rng):
+    return "GET", "/api/contact", None, None
+
+
+def submit_booking(rng):
+    return "POST", "/api/bookings", None, {
+        "name": "Load Test",
+        "email": f"booking-{uuid.uuid4().hex[:12]}@example.com",
+        "eventType": rng.choice(["wedding", "corporate", "festival", "private"]),
+        "eventDate": (date.today() + timedelta(days=rng.randint(30, 400))).isoformat(),
+        "venue": "Doltone House",
+        "guestCount": str(rng.choice([50, 120, 250, 400])),
+        "configuration": rng.choice(["duo", "trio", "full-band"]),
+        "message": "Looking for a Bollywood set for the reception.",
+    }
+
+
+def list_bookings(rng):
+    return "GET", "/api/bookings", None, None
+
+
+ROUTES = {
+    "GET /api/events?upcoming": list_upcoming_events,
+    "GET /api/events?to": list_past_events,
+    "POST /api/events": create_event,
+    "POST /api/newsletter": subscribe_newsletter,
+    "GET /api/newsletter": list_newsletter,
+    "POST /api/contact": submit_contact,
+    "GET /api/contact": list_contact,
+    "POST /api/bookings": submit_booking,
+    "GET /api/bookings": list_bookings,
+}
+
+# Relative weights per route. "public" is a normal day on the Gigs page,
+# "launch" is a gig announcement bringing a burst of form posts, and "admin"
+# is staff dashboards polling the inbound lists.
+MIXES = {
+    "public": {
+        "GET /api/events?upcoming": 60, "GET /api/events?to": 15, "POST /api/newsletter": 10,
+        "POST /api/contact": 5, "POST /api/bookings": 5, "GET /api/bookings": 2,
+        "GET /api/contact": 1, "GET /api/newsletter": 1, "POST /api/events": 1,
+    },
+    "launch": {
+        "GET /api/events?upcoming": 40, "POST /api/newsletter": 25, "POST /api/contact": 15,
+        "POST /api/bookings": 15, "GET /api/events?to": 5,
+    },
+    "admin": {
+        "GET /api/bookings": 35, "GET /api/contact": 25, "GET /api/newsletter": 20,
+        "GET /api/events?upcoming": 10, "POST /api/events": 5, "POST /api/bookings": 5,
+    },
+}
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    position = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[position]
+
+
+def summarize(samples, elapsed):
+    routes = {}
+    for route, entries in sorted(samples.items()):
+        latencies = sorted(latency for latency, _ in entries)
+        errors = sum(1 for _, status in entries if status >= 400)
+        routes[route] = {
+            "requests": len(entries),
+            "errors": errors,
+            "rps": round(len(entries) / elapsed, 1),
+            "mean_ms": round(sum(latencies) / len(latencies), 3),
+            "p50_ms": round(percentile(latencies, 0.50), 3),
+            "p95_ms": round(percentile(latencies, 0.95), 3),
+            "p99_ms": round(percentile(latencies, 0.99), 3),
+            "max_ms": round(latencies[-1], 3),
+        }
+    total = sum(route["requests"] for route in routes.values())
+    return {
+        "total": {
+            "requests": total,
+            "errors": sum(route["errors"] for route in routes.values()),
+            "rps": round(total / elapsed, 1),
+            "elapsed_s": round(elapsed, 3),
+        },
+        "routes": routes,
+    }
+
+
+async def worker(http, rng, weights, deadline, remaining, samples):
+    names, relative = list(weights), list(weights.values())
+    while time.perf_counter() < deadline:
+        if remaining is not None:
+            if remaining[0] <= 0:
+                return
+            remaining[0] -= 1
+        route = rng.choices(names, weights=relative)[0]
+        method, path, params, body = ROUTES[route](rng)
+        started = time.perf_counter()
+        try:
+            response = await http.request(method, path, params=params, json=body)
+            status = response.status_code
+        except httpx.HTTPError:
+            status = 599
+        samples.setdefault(route, []).append(((time.perf_counter() - started) * 1000, status))
+
+
+async def seed(http, events):
+    payload = [create_event(random.Random(i))[3] for i in range(events)]
+    for offset in range(0, len(payload), 1000):
+        response = await http.post("/api/events/bulk", json=payload[offset:offset + 1000])
+        response.raise_for_status()
+
+
+async def run(args):
+    app = None
+    if args.url:
+        transport = httpx.AsyncHTTPTransport(limits=httpx.Limits(max_connections=args.concurrency))
+        base_url = args.url.rstrip("/")
+    else:
+        os.environ["STORAGE_BACKEND"] = args.storage
+        # Every simulated client shares one address, so the form rate limits
+        # would reject most writes; measure the handlers unless asked not to
+        os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+        sys.path.insert(0, str(ROOT_DIR))
+        import server
+
+        app = server.app
+        await app.router.startup()
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://bench"
+
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=args.timeout) as http:
+            if args.seed_events is None:
+                # Never bulk-load fixtures into a remote deployment unless asked
+                args.seed_events = 0 if args.url else 200
+            if args.seed_events:
+                await seed(http, args.seed_events)
+            writes = args.writes or (not args.url and args.storage == "memory")
+            weights = {
+                route: weight for route, weight in MIXES[args.mix].items()
+                if weight > 0 and (writes or not route.startswith("POST "))
+            }
+            if not weights:
+                raise SystemExit(f"The {args.mix} mix has no read routes; pass --writes to run it")
+            if not writes:
+                print("Write routes skipped (pass --writes to include them)", file=sys.stderr)
+            samples = {}
+            remaining = [args.requests] if args.requests else None
+            # A fixed warm-up keeps lazy imports and pool handshakes out of the numbers
+            await asyncio.gather(*(
+                worker(http, random.Random(-i), weights, time.perf_counter() + args.warmup, None, {})
+                for i in range(args.concurrency)
+            ))
+            started = time.perf_counter()
+            deadline = started + (args.duration if not args.requests else float("inf"))
+            await asyncio.gather(*(
+                worker(http, random.Random(args.seed + i), weights, deadline, remaining, samples)
+                for i in range(args.concurrency)
+            ))
+            elapsed = time.perf_counter() - started
+    finally:
+        if app is not None:
+            await app.router.shutdown()
+
+    result = summarize(samples, elapsed)
+    result["meta"] = {
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "commit": git_commit(),
+        "target": args.url or f"in-process ({args.storage})",
+        "mix": args.mix,
+        "writes": writes,
+        "concurrency": args.concurrency,
+        "duration_s": args.duration if not args.requests else None,
+        "requests": args.requests,
+        "seed_events": args.seed_events,
+        "python": sys.version.split()[0],
+    }
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(result, baseline=None):
+    header = f"{'route':<28}{'reqs':>8}{'err':>6}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+    if baseline:
+        header += f"{'p95 vs base':>13}{'rps vs base':>13}"
+    print(header)
+    for route, stats in result["routes"].items():
+        line = (f"{route:<28}{stats['requests']:>8}{stats['errors']:>6}{stats['rps']:>9.1f}"
+                f"{stats['p50_ms']:>9.2f}{stats['p95_ms']:>9.2f}{stats['p99_ms']:>9.2f}")
+        before = (baseline or {}).get("routes", {}).get(route)
+        if before:
+            line += f"{change(before['p95_ms'], stats['p95_ms']):>13}{change(before['rps'], stats['rps']):>13}"
+        print(line)
+    total = result["total"]
+    print(f"total: {total['requests']} requests, {total['errors']} errors, "
+          f"{total['rps']:.1f} req/s over {total['elapsed_s']:.2f} s")
+
+
+def change(before, after):
+    if not before:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="base URL of a running backend (default: run the app in-process)")
+    parser.add_argument("--storage", choices=["memory", "mongo"], default="memory",
+                        help="storage engine for in-process runs")
+    parser.add_argument("--mix", choices=sorted(MIXES), default="public")
+    parser.add_argument("--writes", action="store_true",
+                        help="include the write routes with --url or --storage mongo (always on in memory)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run (ignored with --requests)")
+    parser.add_argument("--requests", type=int, help="stop after this many requests instead of --duration")
+    parser.add_argument("--warmup", type=float, default=1.0, help="seconds of unrecorded warm-up")
+    parser.add_argument("--seed-events", type=int,
+                        help="events to bulk-load before the run (default: 200 in-process, 0 with --url)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for the request mix")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--output", type=Path, help="write the results as JSON")
+    parser.add_argument("--compare", type=Path, help="JSON results of an earlier run to compare against")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    baseline = json.loads(args.compare.read_text()) if args.compare else None
+    print_report(result, baseline)
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2) + "\n")
+        print(f"Saved results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
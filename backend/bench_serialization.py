@@ -0,0 +1,100 @@
+"""Per-row CPU cost of the list endpoint serializers.
+
+Compares the pydantic path (build a model per row, then jsonable_encoder +
+json.dumps) with the projection fast path (shape the raw dict, encode once).
+No database is involved; rows are synthetic documents shaped like Mongo's.
+
+    python bench_serialization.py [--rows 10000] [--repeat 5]
+"""
+import argparse
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'bench')
+
+import server  # noqa: E402
+from responses import dump_rows, render_json, shape_rows  # noqa: E402
+
+
+def make_rows(kind: str, count: int):
+    now = datetime.utcnow()
+    rows = []
+    for i in range(count):
+        created = now - timedelta(minutes=i)
+        if kind == "newsletter":
+            row = {"id": str(uuid.uuid4()), "email": f"fan{i}@example.com", "subscribed_at": created}
+        elif kind == "contact":
+            row = {
+                "id": str(uuid.uuid4()), "firstName": "Asha", "lastName": f"Fan{i}",
+                "email": f"fan{i}@example.com", "subject": "Hello",
+                "message": "We loved the show at the Opera House. " * 4, "created_at": created,
+            }
+        elif kind == "events":
+            row = {
+                "_id": ObjectId(), "id": str(i), "title": f"Show {i}", "venue": "City Recital Hall",
+                "address": "2 Angel Place, Sydney NSW 2000", "date": (now + timedelta(days=i)).date().isoformat(),
+                "time": "7:30 PM", "description": "An intimate evening of romantic melodies.",
+                "ticketUrl": "https://www.cityrecitalhall.com/", "created_at": created,
+            }
+        else:
+            row = {
+                "id": str(uuid.uuid4()), "name": f"Client {i}", "email": f"client{i}@example.com",
+                "phone": "0400 000 000", "eventType": "wedding", "eventDate": "2026-03-14",
+                "venue": "Doltone House", "guestCount": "200", "configuration": "full-band",
+                "message": "Looking for a Bollywood set for the reception.", "created_at": created,
+                "status": "pending",
+            }
+        rows.append(row)
+    return rows
+
+
+def model_path(rows, model):
+    prepared = []
+    for row in rows:
+        row = dict(row)
+        if "_id" in row:
+            row["_id"] = str(row["_id"])
+        prepared.append(model(**row))
+    return render_json(prepared)
+
+
+def fast_path(rows, layout):
+    return dump_rows(shape_rows(rows, layout))
+
+
+def best_of(repeat, fn, *args):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.process_time()
+        fn(*args)
+        best = min(best, time.process_time() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    cases = [
+        ("newsletter", server.NewsletterSubscription, server.NEWSLETTER_LAYOUT),
+        ("contact", server.ContactMessage, server.CONTACT_LAYOUT),
+        ("events", server.Event, server.EVENT_LAYOUT),
+        ("bookings", server.BookingInquiry, server.BOOKING_LAYOUT),
+    ]
+    print(f"{'collection':<12}{'model us/row':>14}{'fast us/row':>14}{'speedup':>10}")
+    for kind, model, layout in cases:
+        rows = make_rows(kind, args.rows)
+        before = best_of(args.repeat, model_path, rows, model) / args.rows * 1e6
+        after = best_of(args.repeat, fast_path, rows, layout) / args.rows * 1e6
+        print(f"{kind:<12}{before:>14.2f}{after:>14.2f}{before / after:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
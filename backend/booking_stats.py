@@ -0,0 +1,225 @@
+"""Summary statistics over booking inquiries for the admin dashboard.
+
+On engines that run aggregation pipelines (MongoDB) the full summary comes
+from one ``$facet`` aggregation, so only a few hundred bytes cross the wire
+however many inquiries exist. Collections without ``aggregate`` (the memory
+engine) have their documents folded in Python. After a load, ``submit_booking`` and
+status updates apply their change to the cached counters directly, and a
+full reload happens once ``ttl`` expires to pick up writes made by other
+workers. A status change to a booking the loaded counters do not include
+triggers that reload early instead of driving a count below zero.
+"""
+import asyncio
+import re
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Optional
+
+UNKNOWN = "unknown"
+
+# Lower bounds of the guest-count buckets and their labels
+GUEST_BOUNDARIES = [0, 50, 100, 200, 500]
+GUEST_LABELS = ["0-49", "50-99", "100-199", "200-499", "500+"]
+
+_DIGITS = re.compile(r"[0-9]+")
+
+STATS_PROJECTION = {
+    "_id": 0, "status": 1, "eventType": 1, "eventDate": 1, "configuration": 1,
+    "guestCount": 1, "created_at": 1, "status_changed_at": 1,
+}
+
+
+def guest_bucket(guest_count: Optional[str]) -> str:
+    # Guest counts are free text ("120", "about 200", "100-150"); use the first number
+    match = _DIGITS.search(guest_count or "")
+    if not match:
+        return UNKNOWN
+    guests = int(match.group())
+    label = GUEST_LABELS[0]
+    for boundary, name in zip(GUEST_BOUNDARIES, GUEST_LABELS):
+        if guests >= boundary:
+            label = name
+    return label
+
+
+def event_month(event_date: Optional[str]) -> str:
+    return event_date[:7] if event_date and len(event_date) >= 7 else UNKNOWN
+
+
+def _group(field: str) -> list:
+    return [
+        {"$group": {"_id": {"$ifNull": [f"${field}", UNKNOWN]}, "count": {"$sum": 1}}},
+    ]
+
+
+STATS_PIPELINE = [
+    {"$facet": {
+        "total": [{"$count": "count"}],
+        "by_status": _group("status"),
+        "by_event_type": _group("eventType"),
+        "by_configuration": _group("configuration"),
+        "by_month": [
+            {"$group": {
+                "_id": {"$cond": [
+                    {"$gte": [{"$strLenCP": {"$ifNull": ["$eventDate", ""]}}, 7]},
+                    {"$substrCP": ["$eventDate", 0, 7]},
+                    UNKNOWN,
+                ]},
+                "count": {"$sum": 1},
+            }},
+        ],
+        "guest_count": [
+            {"$project": {"found": {"$regexFind": {"input": {"$ifNull": ["$guestCount", ""]}, "regex": "[0-9]+"}}}},
+            {"$project": {"guests": {"$convert": {
+                "input": "$found.match", "to": "long", "onError": None, "onNull": None,
+            }}}},
+            {"$bucket": {
+                "groupBy": "$guests",
+                "boundaries": GUEST_BOUNDARIES + [10 ** 12],
+                "default": UNKNOWN,
+                "output": {"count": {"$sum": 1}},
+            }},
+        ],
+        "status_latency": [
+            {"$match": {"status_changed_at": {"$type": "date"}, "created_at": {"$type": "date"}}},
+            {"$group": {
+                "_id": "$status",
+                "count": {"$sum": 1},
+                "total_ms": {"$sum": {"$subtract": ["$status_changed_at", "$created_at"]}},
+            }},
+        ],
+    }},
+]
+
+
+class BookingStats:
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self.loaded_at: Optional[float] = None
+        self.generated_at: Optional[datetime] = None
+        self._lock = asyncio.Lock()
+        self._writes = 0
+        self._reset()
+
+    def _reset(self) -> None:
+        self.total = 0
+        self.by_status = Counter()
+        self.by_event_type = Counter()
+        self.by_configuration = Counter()
+        self.by_month = Counter()
+        self.guest_count = Counter()
+        # status -> [documents with a status change, summed milliseconds to it]
+        self.status_latency = defaultdict(lambda: [0, 0.0])
+
+    @property
+    def fresh(self) -> bool:
+        return self.loaded_at is not None and time.monotonic() - self.loaded_at < self.ttl
+
+    def invalidate(self) -> None:
+        self.loaded_at = None
+
+    async def get(self, collection) -> dict:
+        """Return the summary, reloading it first when it is missing or expired."""
+        if not self.fresh:
+            async with self._lock:
+                if not self.fresh:
+                    await self._load(collection)
+        return self.as_dict()
+
+    async def _load(self, collection) -> None:
+        # Fold into a scratch instance so requests served meanwhile see the old numbers
+        scratch = BookingStats(self.ttl)
+        writes = self._writes
+        if hasattr(collection, "aggregate"):
+            results = await collection.aggregate(STATS_PIPELINE).to_list(1)
+            scratch._load_facets(results[0] if results else {})
+        else:
+            async for document in collection.find({}, STATS_PROJECTION):
+                scratch.add(document)
+        for name in ("total", "by_status", "by_event_type", "by_configuration", "by_month",
+                     "guest_count", "status_latency"):
+            setattr(self, name, getattr(scratch, name))
+        self.generated_at = datetime.utcnow()
+        # A write that landed mid-load may or may not be in the result, so
+        # serve it once and load again on the next request
+        self.loaded_at = time.monotonic() if self._writes == writes else None
+
+    def _load_facets(self, facets: dict) -> None:
+        total = facets.get("total") or []
+        self.total = total[0]["count"] if total else 0
+        for name in ("by_status", "by_event_type", "by_configuration", "by_month"):
+            counter = getattr(self, name)
+            for row in facets.get(name, []):
+                counter[row["_id"] if row["_id"] is not None else UNKNOWN] += row["count"]
+        labels = dict(zip(GUEST_BOUNDARIES, GUEST_LABELS))
+        for row in facets.get("guest_count", []):
+            self.guest_count[labels.get(row["_id"], UNKNOWN)] += row["count"]
+        for row in facets.get("status_latency", []):
+            self.status_latency[row["_id"] or UNKNOWN] = [row["count"], float(row["total_ms"])]
+
+    # Incremental updates
+
+    def record_insert(self, booking: dict) -> None:
+        self._writes += 1
+        if self.loaded_at is not None:
+            self.add(booking)
+
+    def record_status_change(self, before: dict, after: dict) -> None:
+        """Move one booking from its ``before`` to its ``after`` state."""
+        self._writes += 1
+        if self.loaded_at is None:
+            return
+        if not self._counted(before):
+            # The booking is not in the loaded summary (written by another
+            # worker, restored from the archive, still queued): reload instead
+            self.invalidate()
+            return
+        self.by_status[before.get("status") or UNKNOWN] -= 1
+        self.by_status[after.get("status") or UNKNOWN] += 1
+        self._add_latency(before, -1)
+        self._add_latency(after, 1)
+
+    def _counted(self, booking: dict) -> bool:
+        status = booking.get("status") or UNKNOWN
+        if self.by_status[status] <= 0:
+            return False
+        changed_at, created_at = booking.get("status_changed_at"), booking.get("created_at")
+        if isinstance(changed_at, datetime) and isinstance(created_at, datetime):
+            return self.status_latency[status][0] > 0
+        return True
+
+    def add(self, booking: dict) -> None:
+        self.total += 1
+        self.by_status[booking.get("status") or UNKNOWN] += 1
+        self.by_event_type[booking.get("eventType") or UNKNOWN] += 1
+        self.by_configuration[booking.get("configuration") or UNKNOWN] += 1
+        self.by_month[event_month(booking.get("eventDate"))] += 1
+        self.guest_count[guest_bucket(booking.get("guestCount"))] += 1
+        self._add_latency(booking, 1)
+
+    def _add_latency(self, booking: dict, sign: int) -> None:
+        changed_at, created_at = booking.get("status_changed_at"), booking.get("created_at")
+        if isinstance(changed_at, datetime) and isinstance(created_at, datetime):
+            entry = self.status_latency[booking.get("status") or UNKNOWN]
+            entry[0] += sign
+            entry[1] += sign * (changed_at - created_at).total_seconds() * 1000
+
+    def as_dict(self) -> dict:
+        def counts(counter):
+            return {key: value for key, value in sorted(counter.items(), key=lambda item: str(item[0])) if value > 0}
+
+        latency = {}
+        for status, (count, total_ms) in sorted(self.status_latency.items()):
+            if count > 0:
+                latency[status] = {"count": count, "avg_hours": round(total_ms / count / 3_600_000, 2)}
+        return {
+            "total": self.total,
+            "by_status": counts(self.by_status),
+            "by_event_type": counts(self.by_event_type),
+            "by_month": counts(self.by_month),
+            "by_configuration": counts(self.by_configuration),
+            "guest_count": counts(self.guest_count),
+            "time_to_status_change": latency,
+            "generated_at": self.generated_at,
+        }
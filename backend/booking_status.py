@@ -0,0 +1,67 @@
+"""Booking status workflow.
+
+Inquiries move pending -> confirmed or declined, and confirmed -> completed.
+Every accepted change bumps ``version``; a caller that passes the version it
+last saw only succeeds if nobody changed the booking since, so two people
+triaging the same inbox cannot silently overwrite each other.
+"""
+from datetime import datetime
+from typing import Literal, Optional
+
+from pydantic import BaseModel
+from pymongo import UpdateOne
+
+BookingStatus = Literal["pending", "confirmed", "declined", "completed"]
+
+TRANSITIONS = {
+    "pending": {"confirmed", "declined"},
+    "confirmed": {"completed"},
+    "declined": set(),
+    "completed": set(),
+}
+
+# Fields read to plan a change and to keep booking_stats current
+STATUS_PROJECTION = {"_id": 0, "id": 1, "status": 1, "version": 1, "created_at": 1, "status_changed_at": 1}
+
+
+class BookingStatusChange(BaseModel):
+    id: str
+    status: BookingStatus
+    version: Optional[int] = None
+
+
+def current_version(booking: dict) -> int:
+    # Bookings stored before versioning have no field and count as version 1
+    return booking.get("version") or 1
+
+
+def version_filter(version: int):
+    return {"$in": [1, None]} if version == 1 else version
+
+
+def plan_change(booking: Optional[dict], status: str, expected_version: Optional[int], changed_at: datetime):
+    """Check one requested change against the stored booking.
+
+    Returns ``(outcome, operation)``: an outcome dict when the change is not
+    written (``not_found``, ``unchanged``, ``conflict`` or
+    ``invalid_transition``), otherwise an ``UpdateOne`` that only applies if
+    the booking still has the status and version it was planned against.
+    """
+    if booking is None:
+        return {"status": "not_found"}, None
+    version = current_version(booking)
+    if expected_version is not None and expected_version != version:
+        return {"status": "conflict", "version": version,
+                "errors": [f"expected version {expected_version}, booking is at {version}"]}, None
+    current = booking.get("status")
+    if current == status:
+        return {"status": "unchanged", "version": version}, None
+    # Statuses from before the workflow existed move like pending ones
+    allowed = TRANSITIONS.get(current, TRANSITIONS["pending"])
+    if status not in allowed:
+        return {"status": "invalid_transition", "version": version,
+                "errors": [f"cannot move from {current} to {status}"]}, None
+    return None, UpdateOne(
+        {"id": booking["id"], "status": current, "version": version_filter(version)},
+        {"$set": {"status": status, "status_changed_at": changed_at, "version": version + 1}},
+    )
@@ -0,0 +1,114 @@
+import json
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+
+
+class UnparsableLine:
+    """Stands in for an NDJSON line that is not valid JSON."""
+
+    def __init__(self, line: int, error: str):
+        self.line = line
+        self.error = error
+
+
+def parse_ndjson(body: bytes) -> list:
+    # Each line stands alone, so one bad line only costs that item
+    items = []
+    for number, line in enumerate(body.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            items.append(json.loads(line))
+        except json.JSONDecodeError as exc:
+            items.append(UnparsableLine(number, f"{exc.msg} at column {exc.colno}"))
+        except ValueError as exc:
+            items.append(UnparsableLine(number, str(exc)))
+    return items
+
+
+def parse_bulk_body(body: bytes, content_type: Optional[str], max_items: int) -> list:
+    """Decode a JSON array or NDJSON request body into a list of raw items.
+
+    A malformed NDJSON line becomes an ``UnparsableLine`` item, which
+    ``validate_items`` reports as invalid; a malformed JSON array rejects
+    the whole request.
+    """
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    try:
+        if content_type in ("application/x-ndjson", "application/ndjson", "application/jsonl"):
+            items = parse_ndjson(body)
+        else:
+            items = json.loads(body or b"[]")
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=f"Invalid request body: {exc}")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Request body must be a JSON array or NDJSON")
+    if len(items) > max_items:
+        raise HTTPException(status_code=413, detail=f"At most {max_items} items per request")
+    return items
+
+
+def validation_messages(exc: ValidationError) -> List[str]:
+    return [
+        f"{'.'.join(str(part) for part in error['loc']) or 'item'}: {error['msg']}"
+        for error in exc.errors()
+    ]
+
+
+def validate_items(items: list, model) -> Tuple[List[Tuple[int, object]], List[dict]]:
+    """Split raw items into ``(index, model)`` pairs and per-item error results."""
+    valid, invalid = [], []
+    for index, item in enumerate(items):
+        if isinstance(item, UnparsableLine):
+            invalid.append({"index": index, "status": "invalid", "errors": [f"line {item.line}: {item.error}"]})
+            continue
+        if not isinstance(item, dict):
+            invalid.append({"index": index, "status": "invalid", "errors": ["item: must be an object"]})
+            continue
+        try:
+            valid.append((index, model(**item)))
+        except ValidationError as exc:
+            invalid.append({"index": index, "status": "invalid", "errors": validation_messages(exc)})
+    return valid, invalid
+
+
+async def run_bulk(collection, operations: list, batch_size: int) -> Tuple[Dict[int, dict], int]:
+    """Apply ``(index, key, op)`` upserts as unordered ``bulk_write`` batches.
+
+    Returns an outcome per request index (``created`` when the upsert inserted
+    a document, ``matched`` when one already existed, or ``error``) and the
+    number of documents inserted, upserted or modified. Matched documents
+    whose fields were already the same do not count.
+    """
+    outcomes, changed = {}, 0
+    for start in range(0, len(operations), batch_size):
+        batch = operations[start:start + batch_size]
+        upserted, failed = set(), {}
+        try:
+            result = await collection.bulk_write([op for _, _, op in batch], ordered=False)
+            upserted = set(result.upserted_ids)
+            details = result.bulk_api_result
+        except BulkWriteError as exc:
+            details = exc.details
+            upserted = {entry["index"] for entry in details.get("upserted", [])}
+            failed = {error["index"]: error.get("errmsg", "write failed") for error in details.get("writeErrors", [])}
+        changed += details.get("nInserted", 0) + details.get("nUpserted", 0) + details.get("nModified", 0)
+        for position, (index, key, _) in enumerate(batch):
+            if position in failed:
+                outcomes[index] = {"index": index, "key": key, "status": "error", "errors": [failed[position]]}
+            else:
+                status = "created" if position in upserted else "matched"
+                outcomes[index] = {"index": index, "key": key, "status": status}
+    return outcomes, changed
+
+
+def bulk_report(total: int, outcomes: Dict[int, dict], rejected: List[dict]) -> dict:
+    results = sorted(list(outcomes.values()) + rejected, key=lambda item: item["index"])
+    summary = {"received": total}
+    for item in results:
+        summary[item["status"]] = summary.get(item["status"], 0) + 1
+    summary["results"] = results
+    return summary
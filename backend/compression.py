@@ -0,0 +1,230 @@
+"""gzip/brotli response compression.
+
+``CompressionMiddleware`` compresses response bodies for clients that accept
+it, choosing brotli over gzip when both are allowed. Bodies smaller than
+``minimum_size`` go out as they are, since framing overhead eats the saving,
+and so do responses that already carry a Content-Encoding.
+
+Handlers serving cached bodies attach a ``CompressedVariants`` to the cache
+entry instead: each encoding is then produced once per entry and reused by
+every hit. Those responses carry ``Vary: Accept-Encoding``, which tells the
+middleware the encoding was already chosen; it passes them straight through,
+including bodies sent as is because compressing them did not help.
+"""
+import zlib
+from typing import Dict, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from metrics import Counter, registry
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is offered without it
+    brotli = None
+
+COMPRESSED_RESPONSES = registry.register(Counter(
+    "compressed_responses_total", "Responses sent compressed, by encoding and source.", ("encoding", "source"),
+))
+COMPRESSION_SAVED_BYTES = registry.register(Counter(
+    "compression_saved_bytes_total", "Bytes saved by compressing whole response bodies.", ("encoding",),
+))
+
+# Types worth compressing; anything else (images, archives) is already dense
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "application/javascript", "image/svg+xml")
+
+
+def compressible(content_type: str) -> bool:
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    if media_type == "text/event-stream":
+        # Each event has to reach the client as soon as it is sent
+        return False
+    return media_type.startswith("text/") or media_type in COMPRESSIBLE_TYPES
+
+
+def parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    """``{coding: q}`` for an Accept-Encoding header."""
+    accepted = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+class Compression:
+    """Compression settings shared by the middleware and cached variants."""
+
+    def __init__(self, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 5):
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        # Preferred first
+        self.encodings = ("br", "gzip") if brotli is not None else ("gzip",)
+
+    def negotiate(self, accept_encoding: Optional[str]) -> Optional[str]:
+        """Best encoding the client accepts, or None to send the body as is."""
+        accepted = parse_accept_encoding(accept_encoding)
+        best, best_quality = None, 0.0
+        for encoding in self.encodings:
+            quality = accepted.get(encoding, accepted.get("*", 0.0))
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)
+        return compressor.compress(body) + compressor.flush()
+
+    def stream(self, encoding: str) -> "StreamCompressor":
+        return StreamCompressor(self, encoding)
+
+
+class StreamCompressor:
+    """Incremental compressor for bodies sent in several chunks."""
+
+    def __init__(self, compression: Compression, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=compression.brotli_quality)
+        else:
+            self._compressor = zlib.compressobj(compression.gzip_level, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        # Flush per chunk so streamed exports keep arriving as they are produced
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+class CompressedVariants:
+    """Compressed forms of one cached body, each produced on first use."""
+
+    def __init__(self, body: bytes, compression: Compression):
+        self.body = body
+        self.compression = compression
+        self._encoded: Dict[str, Optional[bytes]] = {}
+
+    def encode(self, accept_encoding: Optional[str]) -> Tuple[Optional[str], bytes]:
+        """``(encoding, body)`` for a client's Accept-Encoding; encoding is None when sent as is."""
+        encoding = self.compression.negotiate(accept_encoding)
+        if encoding is None or len(self.body) < self.compression.minimum_size:
+            return None, self.body
+        if encoding not in self._encoded:
+            encoded = self.compression.compress(self.body, encoding)
+            # Remember when compressing does not help, so later hits skip it too
+            self._encoded[encoding] = encoded if len(encoded) < len(self.body) else None
+            if self._encoded[encoding] is not None:
+                COMPRESSION_SAVED_BYTES.inc(encoding, amount=len(self.body) - len(encoded))
+        encoded = self._encoded[encoding]
+        if encoded is None:
+            return None, self.body
+        COMPRESSED_RESPONSES.inc(encoding, "cache")
+        return encoding, encoded
+
+
+def weak_etag(etag: str) -> str:
+    # The compressed bytes differ from the ones the strong ETag names
+    return etag if etag.startswith("W/") else "W/" + etag
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware compressing responses the client accepts."""
+
+    def __init__(self, app, compression: Compression):
+        self.app = app
+        self.compression = compression
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = self.compression.negotiate(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, CompressingSend(send, self.compression, encoding))
+
+
+class CompressingSend:
+    """ASGI ``send`` that compresses the response body on its way out."""
+
+    def __init__(self, send, compression: Compression, encoding: str):
+        self.send = send
+        self.compression = compression
+        self.encoding = encoding
+        self.start = None
+        self.compressor: Optional[StreamCompressor] = None
+        self.passthrough = False
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            message["headers"] = list(message.get("headers", ()))
+            self.start = message
+            headers = MutableHeaders(raw=message["headers"])
+            status = message["status"]
+            if (status < 200 or status in (204, 304) or "content-encoding" in headers
+                    or "accept-encoding" in headers.get("vary", "").lower()
+                    or not compressible(headers.get("content-type", ""))):
+                self.passthrough = True
+                await self.send(message)
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.compressor is not None:
+            data = self.compressor.chunk(body)
+            if not more_body:
+                data += self.compressor.finish()
+            await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+            return
+
+        headers = MutableHeaders(raw=self.start["headers"])
+        if not more_body:
+            # The whole body is here: compress it only if that pays off
+            encoded = self.compression.compress(body, self.encoding) if len(body) >= self.compression.minimum_size else None
+            if encoded is None or len(encoded) >= len(body):
+                await self.send(self.start)
+                await self.send(message)
+                return
+            COMPRESSED_RESPONSES.inc(self.encoding, "response")
+            COMPRESSION_SAVED_BYTES.inc(self.encoding, amount=len(body) - len(encoded))
+            self._set_headers(headers)
+            headers["Content-Length"] = str(len(encoded))
+            await self.send(self.start)
+            await self.send({"type": "http.response.body", "body": encoded})
+            return
+
+        # Streamed body of unknown length: compress chunk by chunk
+        COMPRESSED_RESPONSES.inc(self.encoding, "stream")
+        self.compressor = self.compression.stream(self.encoding)
+        self._set_headers(headers)
+        del headers["Content-Length"]
+        await self.send(self.start)
+        await self.send({"type": "http.response.body", "body": self.compressor.chunk(body), "more_body": True})
+
+    def _set_headers(self, headers: MutableHeaders) -> None:
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if "etag" in headers:
+            headers["ETag"] = weak_etag(headers["etag"])
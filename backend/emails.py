@@ -0,0 +1,194 @@
+"""Email normalization, newsletter dedupe and background deliverability checks.
+
+Submitted addresses are trimmed and lowercased (``Email``), so ``A@x.com``
+and ``a@x.com`` are one subscriber. ``KnownEmails`` remembers every
+subscribed address, loaded from the collection at startup, so a repeat
+signup is answered without a database round trip; the unique index on
+``email`` still settles races and writes from other workers.
+
+``DeliverabilityChecker`` looks up each new address's domain in a pool of
+background workers and flags the stored record with ``email_status``
+(``ok``, ``undeliverable`` or ``unknown``) afterwards, so no request waits on
+DNS.
+"""
+import asyncio
+import hashlib
+import logging
+import socket
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Annotated, Awaitable, Callable, Dict, Optional
+
+from pydantic import AfterValidator, EmailStr
+from pymongo.errors import PyMongoError
+
+from metrics import Counter, registry
+
+logger = logging.getLogger(__name__)
+
+EMAIL_CHECKS = registry.register(Counter(
+    "email_checks_total", "Background email domain checks by result.", ("result",),
+))
+
+
+def normalize_email(value: str) -> str:
+    return value.strip().lower()
+
+
+# EmailStr that is stored and compared in its normalized form
+Email = Annotated[EmailStr, AfterValidator(normalize_email)]
+
+
+def email_domain(email: str) -> str:
+    return email.rpartition("@")[2]
+
+
+class KnownEmails:
+    """Set of subscribed addresses, kept as 8-byte digests to stay small.
+
+    A digest collision could turn one signup away as a duplicate; at 64 bits
+    that needs billions of addresses to become likely.
+    """
+
+    def __init__(self):
+        self._digests: set = set()
+        self.loaded = False
+
+    @staticmethod
+    def _digest(email: str) -> bytes:
+        return hashlib.blake2b(normalize_email(email).encode(), digest_size=8).digest()
+
+    def __contains__(self, email: str) -> bool:
+        return self._digest(email) in self._digests
+
+    def __len__(self) -> int:
+        return len(self._digests)
+
+    def add(self, email: str) -> None:
+        self._digests.add(self._digest(email))
+
+    async def load(self, collection, batch_size: int = 5000) -> int:
+        """Add every address in ``collection``; returns how many it holds."""
+        async for document in collection.find({}, {"_id": 0, "email": 1}, batch_size=batch_size):
+            if document.get("email"):
+                self.add(document["email"])
+        self.loaded = True
+        return len(self._digests)
+
+
+async def resolve_domain(domain: str, timeout: float) -> Optional[bool]:
+    """True when ``domain`` resolves, False when it does not exist, None when unsure.
+
+    Uses the system resolver (getaddrinfo in the default executor), which
+    a local caching resolver can answer; a timeout or a temporary failure
+    is reported as unknown rather than undeliverable.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        await asyncio.wait_for(loop.getaddrinfo(domain, None, proto=socket.IPPROTO_TCP), timeout)
+        return True
+    except socket.gaierror as exc:
+        if exc.errno in (socket.EAI_NONAME, getattr(socket, "EAI_NODATA", socket.EAI_NONAME)):
+            return False
+        return None
+    except (asyncio.TimeoutError, OSError):
+        return None
+
+
+class DeliverabilityChecker:
+    """Check address domains in ``workers`` background tasks and flag the records.
+
+    ``check`` only queues the work. Results are memoized per domain for
+    ``cache_ttl`` seconds, since most addresses share a handful of domains.
+    A record that is not stored yet (write-behind) is retried a few times.
+    """
+
+    def __init__(self, workers: int = 4, max_queue: int = 10000, timeout: float = 2.0,
+                 cache_ttl: float = 3600.0, cache_size: int = 10000, retry_delay: float = 1.0,
+                 resolve: Callable[[str, float], Awaitable[Optional[bool]]] = resolve_domain):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self.retry_delay = retry_delay
+        self.resolve = resolve
+        self.checked = 0
+        self.dropped = 0
+        self._domains: "OrderedDict[str, tuple]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: list = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self) -> None:
+        if self.workers <= 0:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._tasks = [
+            asyncio.create_task(self._run(), name=f"email-check:{number}") for number in range(self.workers)
+        ]
+
+    def check(self, collection, record_id: str, email: str, attempt: int = 1) -> None:
+        if not self.running:
+            return
+        try:
+            self._queue.put_nowait((collection, record_id, email, attempt))
+        except asyncio.QueueFull:
+            # Unchecked records keep a null email_status; nothing else depends on it
+            self.dropped += 1
+
+    async def domain_status(self, domain: str) -> str:
+        cached = self._domains.get(domain)
+        if cached is not None and cached[0] > time.monotonic():
+            self._domains.move_to_end(domain)
+            return cached[1]
+        resolved = await self.resolve(domain, self.timeout)
+        status = {True: "ok", False: "undeliverable"}.get(resolved, "unknown")
+        if status != "unknown":
+            self._domains[domain] = (time.monotonic() + self.cache_ttl, status)
+            self._domains.move_to_end(domain)
+            while len(self._domains) > self.cache_size:
+                self._domains.popitem(last=False)
+        return status
+
+    async def _run(self) -> None:
+        while True:
+            collection, record_id, email, attempt = await self._queue.get()
+            try:
+                status = await self.domain_status(email_domain(email))
+                result = await collection.update_one(
+                    {"id": record_id},
+                    {"$set": {"email_status": status, "email_checked_at": datetime.utcnow()}},
+                )
+                if result.matched_count == 0 and attempt < 3:
+                    asyncio.get_running_loop().call_later(
+                        self.retry_delay, self.check, collection, record_id, email, attempt + 1
+                    )
+                    continue
+                self.checked += 1
+                EMAIL_CHECKS.inc(status)
+            except PyMongoError as exc:
+                logger.warning("Could not flag email status of %s: %s", record_id, exc)
+            except Exception:
+                logger.exception("Email check for %s failed", record_id)
+            finally:
+                self._queue.task_done()
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": len(self._tasks),
+            "queued": self._queue.qsize() if self._queue else 0,
+            "checked": self.checked,
+            "dropped": self.dropped,
+            "domains_cached": len(self._domains),
+        }
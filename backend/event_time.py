@@ -0,0 +1,62 @@
+"""Typed start times for events.
+
+Events are entered with a display ``date`` ("2025-12-31") and ``time``
+("9:00 PM", "19:30", "8pm till late") in the venue's local time. The API also
+stores ``starts_at``, the same moment as a naive UTC datetime (a BSON date),
+which is what range filters and sorting use. Local times are resolved with
+``EVENT_TIMEZONE`` (default Australia/Sydney); the ``tzdata`` package provides
+the zone database where the OS does not.
+"""
+import os
+import re
+from datetime import date, datetime, time, timezone
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+EVENT_TIMEZONE = ZoneInfo(os.environ.get('EVENT_TIMEZONE', 'Australia/Sydney'))
+
+_CLOCK = re.compile(r"\b(\d{1,2})(?:[:.](\d{2}))?\s*([ap])?\.?m?\.?\b", re.IGNORECASE)
+
+
+def parse_clock(value: Optional[str]) -> Optional[time]:
+    """Read the first clock time in ``value``; None when there is none."""
+    for match in _CLOCK.finditer(value or ""):
+        hour, minute, meridiem = int(match.group(1)), int(match.group(2) or 0), match.group(3)
+        if meridiem is None and match.group(2) is None:
+            # A bare number ("Doors 7") is too ambiguous to be a time
+            continue
+        if meridiem:
+            if not 1 <= hour <= 12:
+                continue
+            hour = hour % 12 + (12 if meridiem.lower() == "p" else 0)
+        if hour < 24 and minute < 60:
+            return time(hour, minute)
+    return None
+
+
+def to_utc(local: datetime, tz: ZoneInfo = EVENT_TIMEZONE) -> datetime:
+    """Naive UTC for a naive local wall-clock time in ``tz``."""
+    return local.replace(tzinfo=tz).astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def local_day_start(day: date, tz: ZoneInfo = EVENT_TIMEZONE) -> datetime:
+    """Naive UTC instant at which ``day`` begins in ``tz``."""
+    return to_utc(datetime.combine(day, time()), tz)
+
+
+def local_today(tz: ZoneInfo = EVENT_TIMEZONE) -> date:
+    return datetime.now(tz).date()
+
+
+def event_starts_at(event_date: Optional[str], event_time: Optional[str],
+                    tz: ZoneInfo = EVENT_TIMEZONE) -> Optional[datetime]:
+    """``starts_at`` for an event's display strings.
+
+    An unreadable time places the event at the start of its day, so it still
+    sorts and filters by date; an unreadable date gives None.
+    """
+    try:
+        day = date.fromisoformat((event_date or "").strip())
+    except ValueError:
+        return None
+    return to_utc(datetime.combine(day, parse_clock(event_time) or time()), tz)
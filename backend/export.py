@@ -0,0 +1,66 @@
+import csv
+import io
+from datetime import date, datetime
+from typing import AsyncIterator
+
+from fastapi.responses import StreamingResponse
+
+from responses import Layout, dump_json, shape_rows
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _encode_ndjson(rows) -> bytes:
+    return b"".join(dump_json(row) + b"\n" for row in rows)
+
+
+def _encode_csv(rows, keys) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([_csv_value(row[key]) for key in keys])
+    return buffer.getvalue().encode("utf-8")
+
+
+async def export_chunks(cursor, layout: Layout, fmt: str, batch_size: int) -> AsyncIterator[bytes]:
+    """Yield one encoded chunk per ``batch_size`` documents read from ``cursor``.
+
+    Only a single batch is held in memory at a time, so the export size is
+    bounded by the database rather than the worker.
+    """
+    keys = [key for key, _ in layout]
+    if fmt == "csv":
+        yield _encode_csv([dict(zip(keys, keys))], keys)
+
+    batch = []
+    async for document in cursor:
+        batch.append(document)
+        if len(batch) >= batch_size:
+            rows = shape_rows(batch, layout)
+            yield _encode_csv(rows, keys) if fmt == "csv" else _encode_ndjson(rows)
+            batch = []
+    if batch:
+        rows = shape_rows(batch, layout)
+        yield _encode_csv(rows, keys) if fmt == "csv" else _encode_ndjson(rows)
+
+
+def export_response(cursor, layout: Layout, fmt: str, filename: str, batch_size: int) -> StreamingResponse:
+    return StreamingResponse(
+        export_chunks(cursor, layout, fmt, batch_size),
+        media_type=EXPORT_FORMATS[fmt],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}.{fmt}"',
+            "Cache-Control": "no-store",
+        },
+    )
@@ -0,0 +1,125 @@
+import logging
+import os
+import time
+
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# Contact messages are deleted by MongoDB's TTL monitor this many days after
+# created_at; 0 keeps them forever. Applied by ensure_indexes at startup.
+CONTACT_RETENTION_DAYS = float(os.environ.get('CONTACT_RETENTION_DAYS', '0'))
+
+if CONTACT_RETENTION_DAYS > 0:
+    # Ascending, but it serves the newest-first listing as well
+    CONTACT_CREATED_AT = IndexModel(
+        [("created_at", ASCENDING)], name="created_at_ttl",
+        expireAfterSeconds=int(CONTACT_RETENTION_DAYS * 86400),
+    )
+else:
+    CONTACT_CREATED_AT = IndexModel([("created_at", DESCENDING)], name="created_at_desc")
+
+
+# Indexes backing every lookup and sort the API performs, keyed by collection.
+# Names are fixed so create_indexes stays idempotent across restarts.
+INDEXES = {
+    "newsletter_subscriptions": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    "events": [
+        # Older events created through the API only carry `_id` until
+        # migrate_starts_at.py copies it into `id`, so the uniqueness
+        # constraint only applies where `id` is set.
+        IndexModel(
+            [("id", ASCENDING)],
+            name="id_unique",
+            unique=True,
+            partialFilterExpression={"id": {"$type": "string"}},
+        ),
+        IndexModel([("starts_at", ASCENDING), ("id", ASCENDING)], name="starts_at_id"),
+        IndexModel(
+            [("title", TEXT), ("venue", TEXT), ("description", TEXT)],
+            name="text_search",
+            weights={"title": 10, "venue": 5, "description": 1},
+        ),
+    ],
+    "booking_inquiries": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("created_at", DESCENDING)], name="created_at_desc"),
+        IndexModel(
+            [("name", TEXT), ("venue", TEXT), ("message", TEXT)],
+            name="text_search",
+            weights={"name": 10, "venue": 5, "message": 1},
+        ),
+    ],
+    "contact_messages": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        CONTACT_CREATED_AT,
+        IndexModel(
+            [("subject", TEXT), ("message", TEXT)],
+            name="text_search",
+            weights={"subject": 5, "message": 1},
+        ),
+    ],
+    # Completed and declined bookings moved out by retention.py
+    "booking_inquiries_archive": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+    ],
+}
+
+# Indexes a configuration change has made redundant. Dropping the TTL index
+# matters: left in place it would keep deleting contacts after retention is
+# turned off.
+OBSOLETE_INDEXES = {
+    "contact_messages": ["created_at_desc" if CONTACT_RETENTION_DAYS > 0 else "created_at_ttl"],
+}
+
+# IndexOptionsConflict, IndexKeySpecsConflict
+INDEX_OPTIONS_CONFLICT = (85, 86)
+
+
+async def update_ttl(db, collection: str, models) -> bool:
+    """Apply a changed expireAfterSeconds with collMod; False when none of ``models`` is a TTL index."""
+    changed = False
+    for model in models:
+        document = model.document
+        if "expireAfterSeconds" in document:
+            await db.command({
+                "collMod": collection,
+                "index": {"name": document["name"], "expireAfterSeconds": document["expireAfterSeconds"]},
+            })
+            changed = True
+    return changed
+
+
+async def ensure_indexes(db) -> dict:
+    """Create any missing indexes and return build time in ms per collection.
+
+    Existing indexes with the same definition are left alone by MongoDB. A
+    failure on one collection (for example duplicate emails blocking the
+    unique index) is logged and does not stop the remaining collections.
+    """
+    timings = {}
+    for collection, models in INDEXES.items():
+        started = time.perf_counter()
+        try:
+            try:
+                await db[collection].create_indexes(models)
+            except OperationFailure as exc:
+                # A new retention period cannot be applied by recreating the index
+                if exc.code not in INDEX_OPTIONS_CONFLICT or not await update_ttl(db, collection, models):
+                    raise
+                await db[collection].create_indexes(models)
+            for name in OBSOLETE_INDEXES.get(collection, []):
+                try:
+                    await db[collection].drop_index(name)
+                    logger.info("Dropped obsolete index %s on %s", name, collection)
+                except OperationFailure:
+                    pass  # not there
+        except OperationFailure as exc:
+            logger.error("Could not create indexes on %s: %s", collection, exc)
+            continue
+        timings[collection] = round((time.perf_counter() - started) * 1000, 2)
+        logger.info("Indexes ready on %s in %.2f ms", collection, timings[collection])
+    return timings
@@ -0,0 +1,891 @@
+"""In-memory stand-in for the subset of Motor the API uses.
+
+Collections keep documents in insertion order and understand the query,
+projection, sort and update operators that ``server.py`` issues, so the full
+API can run (and be benchmarked) in-process without a MongoDB server.
+Unique indexes are enforced, single-field indexes serve equality lookups and
+a ``text`` index keeps an inverted index for ``$text`` queries.
+Errors and result objects are pymongo's own, so handlers behave the same on
+both engines.
+"""
+import asyncio
+import copy
+import functools
+import re
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from pymongo.results import (
+    BulkWriteResult,
+    DeleteResult,
+    InsertManyResult,
+    InsertOneResult,
+    UpdateResult,
+)
+
+_MISSING = object()
+
+
+# Values and comparison
+
+def get_path(document: dict, path: str, default=_MISSING):
+    value = document
+    for part in path.split("."):
+        if isinstance(value, dict) and part in value:
+            value = value[part]
+        else:
+            return default
+    return value
+
+
+def set_path(document: dict, path: str, value) -> None:
+    parts = path.split(".")
+    for part in parts[:-1]:
+        document = document.setdefault(part, {})
+    document[parts[-1]] = value
+
+
+def unset_path(document: dict, path: str) -> None:
+    parts = path.split(".")
+    for part in parts[:-1]:
+        document = document.get(part)
+        if not isinstance(document, dict):
+            return
+    document.pop(parts[-1], None)
+
+
+# BSON comparison order between types (https://www.mongodb.com/docs/manual/reference/bson-type-comparison-order/)
+def _type_rank(value) -> int:
+    if value is _MISSING or value is None:
+        return 1
+    if isinstance(value, bool):
+        return 8
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, str):
+        return 3
+    if isinstance(value, dict):
+        return 4
+    if isinstance(value, (list, tuple)):
+        return 5
+    if isinstance(value, bytes):
+        return 6
+    if isinstance(value, ObjectId):
+        return 7
+    if isinstance(value, datetime):
+        return 9
+    return 10
+
+
+def compare_values(a, b) -> int:
+    rank_a, rank_b = _type_rank(a), _type_rank(b)
+    if rank_a != rank_b:
+        return -1 if rank_a < rank_b else 1
+    if rank_a == 1:
+        return 0
+    if rank_a == 4:
+        a, b = list(a.items()), list(b.items())
+    try:
+        return (a > b) - (a < b)
+    except TypeError:
+        return 0
+
+
+_BSON_TYPES = {
+    "string": str, 2: str,
+    "objectId": ObjectId, 7: ObjectId,
+    "date": datetime, 9: datetime,
+    "bool": bool, 8: bool,
+    "object": dict, 3: dict,
+    "array": list, 4: list,
+    "int": int, 16: int, "long": int, 18: int,
+    "double": float, 1: float,
+    "null": type(None), 10: type(None),
+}
+
+
+def _matches_type(value, bson_type) -> bool:
+    if value is _MISSING:
+        return False
+    if bson_type == "number":
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    expected = _BSON_TYPES.get(bson_type)
+    if expected is None:
+        raise OperationFailure(f"Unsupported $type: {bson_type!r}")
+    if expected is int:
+        return isinstance(value, int) and not isinstance(value, bool)
+    return isinstance(value, expected)
+
+
+# Query matching
+
+def _candidates(value) -> list:
+    # Array fields match when any element (or the array itself) matches
+    if isinstance(value, list):
+        return value + [value]
+    return [value]
+
+
+def _equals(value, expected) -> bool:
+    if expected is None:
+        return value is _MISSING or value is None
+    return any(
+        _type_rank(candidate) == _type_rank(expected) and compare_values(candidate, expected) == 0
+        for candidate in _candidates(value)
+    )
+
+
+def _compare(value, expected, accept) -> bool:
+    # Range operators only match values of the same BSON type bracket
+    return any(
+        _type_rank(candidate) == _type_rank(expected) and accept(compare_values(candidate, expected))
+        for candidate in _candidates(value)
+        if candidate is not _MISSING
+    )
+
+
+def _match_operators(value, operators: dict) -> bool:
+    for op, operand in operators.items():
+        if op == "$eq":
+            ok = _equals(value, operand)
+        elif op == "$ne":
+            ok = not _equals(value, operand)
+        elif op == "$gt":
+            ok = _compare(value, operand, lambda c: c > 0)
+        elif op == "$gte":
+            ok = _compare(value, operand, lambda c: c >= 0)
+        elif op == "$lt":
+            ok = _compare(value, operand, lambda c: c < 0)
+        elif op == "$lte":
+            ok = _compare(value, operand, lambda c: c <= 0)
+        elif op == "$in":
+            ok = any(_equals(value, item) for item in operand)
+        elif op == "$nin":
+            ok = not any(_equals(value, item) for item in operand)
+        elif op == "$exists":
+            ok = (value is not _MISSING) == bool(operand)
+        elif op == "$type":
+            types = operand if isinstance(operand, list) else [operand]
+            ok = any(_matches_type(value, bson_type) for bson_type in types)
+        elif op == "$regex":
+            flags = re.IGNORECASE if "i" in operators.get("$options", "") else 0
+            pattern = operand if hasattr(operand, "search") else re.compile(operand, flags)
+            ok = any(isinstance(c, str) and pattern.search(c) for c in _candidates(value))
+        elif op == "$options":
+            continue
+        elif op == "$not":
+            ok = not _match_operators(value, operand)
+        else:
+            raise OperationFailure(f"Unsupported query operator: {op}")
+        if not ok:
+            return False
+    return True
+
+
+def _is_operator_dict(value) -> bool:
+    return isinstance(value, dict) and value and all(key.startswith("$") for key in value)
+
+
+def matches(document: dict, query: Optional[dict]) -> bool:
+    for key, condition in (query or {}).items():
+        if key == "$and":
+            if not all(matches(document, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches(document, clause) for clause in condition):
+                return False
+        elif key == "$nor":
+            if any(matches(document, clause) for clause in condition):
+                return False
+        elif key.startswith("$"):
+            raise OperationFailure(f"Unsupported query operator: {key}")
+        else:
+            value = get_path(document, key)
+            if _is_operator_dict(condition):
+                if not _match_operators(value, condition):
+                    return False
+            elif not _equals(value, condition):
+                return False
+    return True
+
+
+# Projection, sorting and updates
+
+def project(document: dict, projection: Optional[dict]) -> dict:
+    if not projection:
+        return copy.deepcopy(document)
+    include_id = projection.get("_id", 1)
+    fields = {key: flag for key, flag in projection.items() if key != "_id"}
+    if fields and all(fields.values()):
+        result = {}
+        if include_id and "_id" in document:
+            result["_id"] = document["_id"]
+        for path in fields:
+            value = get_path(document, path)
+            if value is not _MISSING:
+                set_path(result, path, value)
+        return copy.deepcopy(result)
+    result = copy.deepcopy(document)
+    for path in fields:
+        unset_path(result, path)
+    if not include_id:
+        result.pop("_id", None)
+    return result
+
+
+def normalize_sort(key_or_list, direction=None) -> List[Tuple[str, int]]:
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction or 1)]
+    # {"$meta": "textScore"} orders stay as they are
+    return [(key, order if isinstance(order, dict) else int(order)) for key, order in key_or_list]
+
+
+def _is_text_score(value) -> bool:
+    return isinstance(value, dict) and value.get("$meta") == "textScore"
+
+
+def sort_documents(documents: List[dict], sort: List[Tuple[str, int]],
+                   scores: Optional[dict] = None) -> List[dict]:
+    def cmp(a, b):
+        for path, direction in sort:
+            if _is_text_score(direction):
+                # Text scores always sort best first
+                score_a, score_b = scores[_hashable(a["_id"])], scores[_hashable(b["_id"])]
+                result = (score_b > score_a) - (score_b < score_a)
+            else:
+                result = compare_values(get_path(a, path), get_path(b, path))
+                result *= 1 if direction >= 0 else -1
+            if result:
+                return result
+        return 0
+    return sorted(documents, key=functools.cmp_to_key(cmp))
+
+
+def _equality_fields(query: dict) -> dict:
+    """Fields an upsert copies from its filter into the new document."""
+    fields = {}
+    for key, condition in (query or {}).items():
+        if key == "$and":
+            for clause in condition:
+                fields.update(_equality_fields(clause))
+        elif not key.startswith("$"):
+            if _is_operator_dict(condition):
+                if "$eq" in condition:
+                    fields[key] = condition["$eq"]
+            else:
+                fields[key] = condition
+    return fields
+
+
+def apply_update(document: dict, update: dict, inserting: bool = False) -> None:
+    if not update or not all(key.startswith("$") for key in update):
+        raise OperationFailure("update only works with $ operators")
+    for op, fields in update.items():
+        for path, value in fields.items():
+            if op == "$set":
+                set_path(document, path, copy.deepcopy(value))
+            elif op == "$setOnInsert":
+                if inserting:
+                    set_path(document, path, copy.deepcopy(value))
+            elif op == "$unset":
+                unset_path(document, path)
+            elif op == "$inc":
+                current = get_path(document, path, 0)
+                set_path(document, path, current + value)
+            elif op == "$max":
+                current = get_path(document, path)
+                if current is _MISSING or compare_values(value, current) > 0:
+                    set_path(document, path, copy.deepcopy(value))
+            elif op == "$push":
+                current = get_path(document, path, _MISSING)
+                items = list(current) if current is not _MISSING else []
+                if isinstance(value, dict) and "$each" in value:
+                    items.extend(copy.deepcopy(value["$each"]))
+                else:
+                    items.append(copy.deepcopy(value))
+                set_path(document, path, items)
+            else:
+                raise OperationFailure(f"Unsupported update operator: {op}")
+
+
+# Indexes
+
+class MemoryIndex:
+    def __init__(self, keys: List[Tuple[str, int]], name: str, unique: bool = False,
+                 partial_filter: Optional[dict] = None, **options):
+        self.keys = keys
+        self.name = name
+        self.unique = unique
+        self.partial_filter = partial_filter
+        self.options = options
+        # key tuple -> set of _ids, used for equality lookups and uniqueness
+        self.entries: Dict[tuple, set] = {}
+
+    def spec(self) -> tuple:
+        return (tuple(self.keys), self.unique, repr(self.partial_filter), repr(sorted(self.options.items())))
+
+    def covers(self, document: dict) -> bool:
+        return self.partial_filter is None or matches(document, self.partial_filter)
+
+    def key_for(self, document: dict) -> tuple:
+        return tuple(_hashable(get_path(document, path, None)) for path, _ in self.keys)
+
+    def add(self, document: dict) -> None:
+        if self.covers(document):
+            self.entries.setdefault(self.key_for(document), set()).add(_hashable(document["_id"]))
+
+    def remove(self, document: dict) -> None:
+        if self.covers(document):
+            ids = self.entries.get(self.key_for(document))
+            if ids is not None:
+                ids.discard(_hashable(document["_id"]))
+                if not ids:
+                    del self.entries[self.key_for(document)]
+
+    def conflicts(self, document: dict) -> bool:
+        if not self.unique or not self.covers(document):
+            return False
+        ids = self.entries.get(self.key_for(document), set())
+        return bool(ids - {_hashable(document["_id"])})
+
+
+_TOKEN = re.compile(r"[0-9a-z]+")
+_PHRASE = re.compile(r'"([^"]*)"')
+_STOP_WORDS = frozenset(
+    "a an and are as at be but by for from has have in is it its of on or that the this to was were "
+    "will with".split()
+)
+
+
+def _stem(word: str) -> str:
+    # A few English suffix rules, applied the same way to documents and queries
+    if len(word) > 4 and word.endswith("ies"):
+        word = word[:-3] + "y"
+    elif len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        word = word[:-1]
+    for suffix in ("ing", "ed"):
+        if len(word) > len(suffix) + 3 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+
+def text_terms(text: str) -> List[str]:
+    return [_stem(token) for token in _TOKEN.findall(text.lower()) if token not in _STOP_WORDS]
+
+
+def parse_text_search(search: str) -> Tuple[set, List[str], set]:
+    """Split a ``$search`` string into (terms, phrases, negated terms) as MongoDB does."""
+    phrases = [phrase.lower() for phrase in _PHRASE.findall(search) if phrase.strip()]
+    terms, negated = set(), set()
+    for word in _PHRASE.sub(" ", search).split():
+        target = negated if word.startswith("-") else terms
+        target.update(text_terms(word.lstrip("-")))
+    for phrase in phrases:
+        terms.update(text_terms(phrase))
+    return terms, phrases, negated - terms
+
+
+class MemoryTextIndex(MemoryIndex):
+    """Inverted index over the string fields of a ``text`` index.
+
+    Postings are updated as documents are stored and removed, so ``$text``
+    queries only visit documents containing a search term. Scores follow
+    MongoDB's shape (field weight times a damped term frequency, scaled by
+    the term's share of the field) without matching its exact values.
+    """
+
+    def __init__(self, keys: List[Tuple[str, int]], name: str, weights: Optional[dict] = None, **options):
+        options.pop("unique", None)
+        options.pop("partial_filter", None)
+        super().__init__(keys, name, weights=weights, **options)
+        self.fields = [path for path, kind in keys if kind == "text"]
+        self.weights = {path: (weights or {}).get(path, 1) for path in self.fields}
+        # term -> {_id: score}
+        self.postings: Dict[str, Dict[Any, float]] = {}
+        # _id -> terms posted for it, so removal does not re-tokenize
+        self.document_terms: Dict[Any, set] = {}
+
+    def spec(self) -> tuple:
+        return ("text", tuple(self.fields), repr(sorted(self.weights.items())))
+
+    def _scores(self, document: dict) -> Dict[str, float]:
+        scores: Dict[str, float] = {}
+        for path in self.fields:
+            value = get_path(document, path, None)
+            if not isinstance(value, str):
+                continue
+            terms = text_terms(value)
+            counts: Dict[str, int] = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, count in counts.items():
+                damped = sum(0.5 ** occurrence for occurrence in range(count))
+                share = 0.5 * count / len(terms) + 0.5
+                scores[term] = scores.get(term, 0.0) + self.weights[path] * damped * share
+        return scores
+
+    def add(self, document: dict) -> None:
+        _id = _hashable(document["_id"])
+        scores = self._scores(document)
+        for term, score in scores.items():
+            self.postings.setdefault(term, {})[_id] = score
+        self.document_terms[_id] = set(scores)
+
+    def remove(self, document: dict) -> None:
+        _id = _hashable(document["_id"])
+        for term in self.document_terms.pop(_id, ()):
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(_id, None)
+                if not posting:
+                    del self.postings[term]
+
+    def conflicts(self, document: dict) -> bool:
+        return False
+
+    def search(self, search: str, documents: Dict[Any, dict]) -> Dict[Any, float]:
+        """Map each matching ``_id`` to its score for a ``$search`` string."""
+        terms, phrases, negated = parse_text_search(search)
+        scores: Dict[Any, float] = {}
+        for term in terms:
+            for _id, score in self.postings.get(term, {}).items():
+                scores[_id] = scores.get(_id, 0.0) + score
+        for term in negated:
+            for _id in self.postings.get(term, {}):
+                scores.pop(_id, None)
+        if phrases:
+            for _id in list(scores):
+                text = " ".join(
+                    value.lower() for value in (get_path(documents[_id], path, None) for path in self.fields)
+                    if isinstance(value, str)
+                )
+                if not all(phrase in text for phrase in phrases):
+                    del scores[_id]
+        return scores
+
+
+def _hashable(value):
+    if isinstance(value, dict):
+        return tuple((key, _hashable(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return tuple(_hashable(item) for item in value)
+    return value
+
+
+def _duplicate_key_error(collection: str, index: MemoryIndex, document: dict) -> DuplicateKeyError:
+    key = {path: get_path(document, path, None) for path, _ in index.keys}
+    message = f"E11000 duplicate key error collection: {collection} index: {index.name} dup key: {key}"
+    return DuplicateKeyError(message, 11000, {"code": 11000, "errmsg": message, "keyValue": key})
+
+
+# Cursor, collection, database
+
+class MemoryCursor:
+    def __init__(self, collection: "MemoryCollection", query: Optional[dict],
+                 projection: Optional[dict], batch_size: int = 0):
+        self._collection = collection
+        self._query = query or {}
+        self._projection = projection
+        self._sort: List[Tuple[str, int]] = []
+        self._skip = 0
+        self._limit = 0
+        self._results: Optional[List[dict]] = None
+        self._position = 0
+        self.batch_size = batch_size or 101
+
+    def sort(self, key_or_list, direction=None) -> "MemoryCursor":
+        self._sort = normalize_sort(key_or_list, direction)
+        return self
+
+    def skip(self, count: int) -> "MemoryCursor":
+        self._skip = count
+        return self
+
+    def limit(self, count: int) -> "MemoryCursor":
+        self._limit = count
+        return self
+
+    def _evaluate(self) -> List[dict]:
+        if self._results is None:
+            scores = {}
+            documents = self._collection._select(self._query, scores)
+            if any(_is_text_score(direction) for _, direction in self._sort) and "$text" not in self._query:
+                raise OperationFailure("query requires text score metadata, but it is not available", 40218)
+            if self._sort:
+                documents = sort_documents(documents, self._sort, scores)
+            documents = documents[self._skip:]
+            if self._limit:
+                documents = documents[:self._limit]
+            projection = self._projection or {}
+            score_fields = [path for path, flag in projection.items() if _is_text_score(flag)]
+            if score_fields:
+                projection = {path: flag for path, flag in projection.items() if path not in score_fields}
+            self._results = []
+            for document in documents:
+                result = project(document, projection)
+                for path in score_fields:
+                    set_path(result, path, scores[_hashable(document["_id"])])
+                self._results.append(result)
+        return self._results
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        results = self._evaluate()
+        end = len(results) if length is None else self._position + length
+        batch = results[self._position:end]
+        self._position += len(batch)
+        await asyncio.sleep(0)
+        return batch
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> dict:
+        results = self._evaluate()
+        if self._position >= len(results):
+            raise StopAsyncIteration
+        if self._position % self.batch_size == 0:
+            # Yield to the loop once per batch, like a real getMore round trip
+            await asyncio.sleep(0)
+        document = results[self._position]
+        self._position += 1
+        return document
+
+
+class MemoryCollection:
+    def __init__(self, database: "MemoryDatabase", name: str):
+        self.database = database
+        self.name = name
+        self._documents: Dict[Any, dict] = {}
+        self._indexes: Dict[str, MemoryIndex] = {}
+        self._indexes["_id_"] = MemoryIndex([("_id", 1)], "_id_", unique=True)
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.database.name}.{self.name}"
+
+    # Reads
+
+    def _select(self, query: Optional[dict], scores: Optional[dict] = None) -> List[dict]:
+        query = query or {}
+        if "$text" in query:
+            query = dict(query)
+            text_scores = self._text_search(query.pop("$text"))
+            if scores is not None:
+                scores.update(text_scores)
+            candidates = [self._documents[_id] for _id in text_scores]
+        else:
+            candidates = self._indexed_candidates(query)
+        if candidates is None:
+            candidates = self._documents.values()
+        return [document for document in candidates if matches(document, query)]
+
+    def _text_search(self, condition: dict) -> Dict[Any, float]:
+        index = next((index for index in self._indexes.values() if isinstance(index, MemoryTextIndex)), None)
+        if index is None:
+            raise OperationFailure("text index required for $text query", 27)
+        return index.search(condition.get("$search", ""), self._documents)
+
+    def _indexed_candidates(self, query: dict) -> Optional[Iterable[dict]]:
+        # Serve plain equality, or $in over plain values, on an index's leading field from the index
+        for index in self._indexes.values():
+            path = index.keys[0][0]
+            if isinstance(index, MemoryTextIndex) or len(index.keys) != 1 or index.partial_filter is not None or path not in query:
+                continue
+            condition = query[path]
+            if _is_operator_dict(condition) and list(condition) == ["$in"]:
+                values = condition["$in"]
+            elif _is_operator_dict(condition) or isinstance(condition, (dict, list)):
+                continue
+            else:
+                values = [condition]
+            if any(value is None or isinstance(value, (dict, list)) for value in values):
+                continue
+            ids = set()
+            for value in values:
+                ids |= index.entries.get((_hashable(value),), set())
+            return [self._documents[_id] for _id in ids if _id in self._documents]
+        return None
+
+    def find(self, filter: Optional[dict] = None, projection: Optional[dict] = None, *,
+             batch_size: int = 0, sort=None, limit: int = 0, skip: int = 0) -> MemoryCursor:
+        cursor = MemoryCursor(self, filter, projection, batch_size)
+        if sort:
+            cursor.sort(sort)
+        return cursor.skip(skip).limit(limit)
+
+    async def find_one(self, filter: Optional[dict] = None, projection: Optional[dict] = None, **kwargs):
+        results = await self.find(filter, projection, limit=1, **kwargs).to_list(1)
+        return results[0] if results else None
+
+    async def count_documents(self, filter: Optional[dict] = None) -> int:
+        return len(self._select(filter or {}))
+
+    async def estimated_document_count(self) -> int:
+        return len(self._documents)
+
+    # Writes
+
+    def _check_unique(self, document: dict) -> None:
+        for index in self._indexes.values():
+            if index.conflicts(document):
+                raise _duplicate_key_error(self.full_name, index, document)
+
+    def _store(self, document: dict) -> None:
+        self._check_unique(document)
+        self._documents[_hashable(document["_id"])] = document
+        for index in self._indexes.values():
+            index.add(document)
+
+    def _replace(self, old: dict, new: dict) -> None:
+        for index in self._indexes.values():
+            index.remove(old)
+        try:
+            self._check_unique(new)
+        except DuplicateKeyError:
+            for index in self._indexes.values():
+                index.add(old)
+            raise
+        self._documents[_hashable(new["_id"])] = new
+        for index in self._indexes.values():
+            index.add(new)
+
+    def _remove(self, document: dict) -> None:
+        for index in self._indexes.values():
+            index.remove(document)
+        del self._documents[_hashable(document["_id"])]
+
+    def _insert(self, document: dict):
+        if "_id" not in document:
+            document["_id"] = ObjectId()
+        elif _hashable(document["_id"]) in self._documents:
+            raise _duplicate_key_error(self.full_name, self._indexes["_id_"], document)
+        self._store(copy.deepcopy(document))
+        return document["_id"]
+
+    def _update(self, filter: dict, update: dict, upsert: bool, multi: bool) -> dict:
+        targets = self._select(filter)
+        if not multi:
+            targets = targets[:1]
+        if not targets:
+            if not upsert:
+                return {"n": 0, "nModified": 0}
+            document = copy.deepcopy(_equality_fields(filter))
+            apply_update(document, update, inserting=True)
+            document.setdefault("_id", ObjectId())
+            self._store(document)
+            return {"n": 1, "nModified": 0, "upserted": document["_id"]}
+        modified = 0
+        for current in targets:
+            updated = copy.deepcopy(current)
+            apply_update(updated, update)
+            if updated != current:
+                self._replace(current, updated)
+                modified += 1
+        return {"n": len(targets), "nModified": modified}
+
+    def _delete(self, filter: dict, multi: bool) -> int:
+        targets = self._select(filter)
+        if not multi:
+            targets = targets[:1]
+        for document in targets:
+            self._remove(document)
+        return len(targets)
+
+    async def insert_one(self, document: dict, **kwargs) -> InsertOneResult:
+        inserted_id = self._insert(document)
+        await asyncio.sleep(0)
+        return InsertOneResult(inserted_id, True)
+
+    async def insert_many(self, documents: Iterable[dict], ordered: bool = True, **kwargs) -> InsertManyResult:
+        documents = list(documents)
+        inserted, errors = [], []
+        for position, document in enumerate(documents):
+            try:
+                inserted.append(self._insert(document))
+            except DuplicateKeyError as exc:
+                errors.append({"index": position, "code": 11000, "errmsg": str(exc), "op": document})
+                if ordered:
+                    break
+        await asyncio.sleep(0)
+        if errors:
+            raise BulkWriteError({
+                "writeErrors": errors, "writeConcernErrors": [], "nInserted": len(inserted),
+                "nUpserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": [],
+            })
+        return InsertManyResult(inserted, True)
+
+    async def update_one(self, filter: dict, update: dict, upsert: bool = False, **kwargs) -> UpdateResult:
+        raw = self._update(filter, update, upsert, multi=False)
+        await asyncio.sleep(0)
+        return UpdateResult(raw, True)
+
+    async def update_many(self, filter: dict, update: dict, upsert: bool = False, **kwargs) -> UpdateResult:
+        raw = self._update(filter, update, upsert, multi=True)
+        await asyncio.sleep(0)
+        return UpdateResult(raw, True)
+
+    async def find_one_and_update(self, filter: dict, update: dict, projection: Optional[dict] = None,
+                                  upsert: bool = False, return_document: bool = False, **kwargs):
+        targets = self._select(filter)[:1]
+        before = copy.deepcopy(targets[0]) if targets else None
+        raw = self._update(filter, update, upsert, multi=False)
+        await asyncio.sleep(0)
+        if return_document:  # ReturnDocument.AFTER
+            _id = raw.get("upserted", before["_id"] if before else None)
+            after = self._documents.get(_hashable(_id)) if _id is not None else None
+            return project(after, projection) if after is not None else None
+        return project(before, projection) if before is not None else None
+
+    async def delete_one(self, filter: dict, **kwargs) -> DeleteResult:
+        deleted = self._delete(filter, multi=False)
+        await asyncio.sleep(0)
+        return DeleteResult({"n": deleted}, True)
+
+    async def delete_many(self, filter: dict, **kwargs) -> DeleteResult:
+        deleted = self._delete(filter, multi=True)
+        await asyncio.sleep(0)
+        return DeleteResult({"n": deleted}, True)
+
+    async def bulk_write(self, requests: list, ordered: bool = True, **kwargs) -> BulkWriteResult:
+        result = {
+            "writeErrors": [], "writeConcernErrors": [], "nInserted": 0, "nUpserted": 0,
+            "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": [],
+        }
+        for position, request in enumerate(requests):
+            try:
+                if isinstance(request, InsertOne):
+                    self._insert(request._doc)
+                    result["nInserted"] += 1
+                elif isinstance(request, (UpdateOne, UpdateMany)):
+                    raw = self._update(request._filter, request._doc, bool(request._upsert),
+                                       multi=isinstance(request, UpdateMany))
+                    if "upserted" in raw:
+                        result["nUpserted"] += 1
+                        result["upserted"].append({"index": position, "_id": raw["upserted"]})
+                    else:
+                        result["nMatched"] += raw["n"]
+                        result["nModified"] += raw["nModified"]
+                elif isinstance(request, ReplaceOne):
+                    replacement = dict(request._doc)
+                    targets = self._select(request._filter)[:1]
+                    if targets:
+                        replacement["_id"] = targets[0]["_id"]
+                        self._replace(targets[0], copy.deepcopy(replacement))
+                        result["nMatched"] += 1
+                        result["nModified"] += 1
+                    elif request._upsert:
+                        self._insert(replacement)
+                        result["nUpserted"] += 1
+                        result["upserted"].append({"index": position, "_id": replacement["_id"]})
+                elif isinstance(request, (DeleteOne, DeleteMany)):
+                    result["nRemoved"] += self._delete(request._filter, multi=isinstance(request, DeleteMany))
+                else:
+                    raise OperationFailure(f"Unsupported bulk operation: {request!r}")
+            except DuplicateKeyError as exc:
+                result["writeErrors"].append({"index": position, "code": 11000, "errmsg": str(exc)})
+                if ordered:
+                    break
+        await asyncio.sleep(0)
+        if result["writeErrors"]:
+            raise BulkWriteError(result)
+        return BulkWriteResult(result, True)
+
+    # Indexes
+
+    async def create_indexes(self, indexes: list, **kwargs) -> List[str]:
+        return [self._create_index(model.document) for model in indexes]
+
+    async def create_index(self, keys, **kwargs) -> str:
+        keys = normalize_sort(keys)
+        name = kwargs.pop("name", "_".join(f"{path}_{order}" for path, order in keys))
+        return self._create_index({"key": dict(keys), "name": name, **kwargs})
+
+    def _create_index(self, document: dict) -> str:
+        options = dict(document)
+        keys = list(options.pop("key").items())
+        name = options.pop("name")
+        index_class = MemoryTextIndex if any(kind == "text" for _, kind in keys) else MemoryIndex
+        index = index_class(
+            keys, name,
+            unique=options.pop("unique", False),
+            partial_filter=options.pop("partialFilterExpression", None),
+            **options,
+        )
+        existing = self._indexes.get(name)
+        if existing is None and index_class is MemoryTextIndex:
+            other = next((other for other in self._indexes.values() if isinstance(other, MemoryTextIndex)), None)
+            if other is not None:
+                raise OperationFailure(f"Index already exists with a different name: {other.name}", 85)
+        if existing is not None:
+            if existing.spec() != index.spec():
+                raise OperationFailure(f"Index with name: {name} already exists with different options", 85)
+            return name
+        for document in self._documents.values():
+            if index.conflicts(document):
+                raise _duplicate_key_error(self.full_name, index, document)
+            index.add(document)
+        self._indexes[name] = index
+        return name
+
+    async def index_information(self) -> dict:
+        return {
+            name: {"key": index.keys, "unique": index.unique, **index.options}
+            for name, index in self._indexes.items()
+        }
+
+    async def drop_index(self, name: str) -> None:
+        if name not in self._indexes or name == "_id_":
+            raise OperationFailure(f"index not found with name [{name}]", 27)
+        del self._indexes[name]
+
+    async def drop(self) -> None:
+        self.database._collections.pop(self.name, None)
+
+
+class MemoryDatabase:
+    def __init__(self, client: "MemoryClient", name: str):
+        self.client = client
+        self.name = name
+        self._collections: Dict[str, MemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = MemoryCollection(self, name)
+        return self._collections[name]
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    async def list_collection_names(self) -> List[str]:
+        return list(self._collections)
+
+    async def command(self, command, **kwargs) -> dict:
+        if command == "ping" or command == {"ping": 1}:
+            return {"ok": 1.0}
+        if isinstance(command, dict) and "collMod" in command and "index" in command:
+            # Only the TTL change indexes.ensure_indexes makes
+            change = dict(command["index"])
+            index = self[command["collMod"]]._indexes.get(change.pop("name", None))
+            if index is None:
+                raise OperationFailure("cannot find index for collMod", 27)
+            index.options.update(change)
+            return {"ok": 1.0}
+        raise OperationFailure(f"Unsupported command: {command!r}")
+
+
+class MemoryClient:
+    def __init__(self):
+        self._databases: Dict[str, MemoryDatabase] = {}
+
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        if name not in self._databases:
+            self._databases[name] = MemoryDatabase(self, name)
+        return self._databases[name]
+
+    def close(self) -> None:
+        pass
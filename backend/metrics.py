@@ -0,0 +1,388 @@
+"""Request and database timing with a Prometheus text exposition endpoint.
+
+``MetricsMiddleware`` times every request by route template, method and
+status. ``instrument_database`` wraps the database handle so each
+collection call is timed as well, and the time is charged to the request
+that made it, which splits request latency into database time and
+application time (validation, serialization, framework). Nothing here needs
+a client library; ``render`` emits the text format directly.
+"""
+import bisect
+import collections
+import contextvars
+import logging
+import sys
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [
+        '%s="%s"' % (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in zip(names, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{%s}" % ",".join(pairs) if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values: Dict[tuple, float] = collections.defaultdict(float)
+
+    def inc(self, *labels, amount: float = 1.0) -> None:
+        self._values[labels] += amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0.0)
+
+    def samples(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in sorted(self._values.items()):
+            yield f"{self.name}{_format_labels(self.labels, labels)} {value:g}"
+
+
+class Gauge:
+    """Gauge whose values are read from a callback at scrape time."""
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...], collect):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._collect = collect
+
+    def samples(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} gauge"
+        for labels, value in self._collect():
+            yield f"{self.name}{_format_labels(self.labels, labels)} {value:g}"
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, *labels) -> int:
+        series = self._series.get(labels)
+        return sum(series[:-1]) if series else 0
+
+    def samples(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = 'le="%s"' % ("+Inf" if bound == float("inf") else f"{bound:g}")
+                yield f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labels, labels)} {series[-1]:.6f}"
+            yield f"{self.name}_count{_format_labels(self.labels, labels)} {cumulative}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_DURATION = registry.register(Histogram(
+    "http_request_duration_seconds", "Request latency by route template, method and status.",
+    ("route", "method", "status"),
+))
+REQUEST_DB_TIME = registry.register(Histogram(
+    "http_request_db_seconds", "Time each request spent waiting on the database.",
+    ("route", "method"),
+))
+REQUEST_APP_TIME = registry.register(Histogram(
+    "http_request_app_seconds", "Request time outside the database (validation, serialization, framework).",
+    ("route", "method"),
+))
+DB_OPERATION_DURATION = registry.register(Histogram(
+    "db_operation_duration_seconds", "Database call latency by collection and operation.",
+    ("collection", "operation"),
+))
+DB_OPERATION_ERRORS = registry.register(Counter(
+    "db_operation_errors_total", "Database calls that raised, by collection and operation.",
+    ("collection", "operation"),
+))
+SLOW_REQUESTS = registry.register(Counter(
+    "http_slow_requests_total", "Requests slower than SLOW_REQUEST_MS.", ("route", "method"),
+))
+
+
+# Per-request database time. A one-element list so nested tasks can add to it.
+_db_time: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("db_time", default=None)
+
+
+def _record_db(collection: str, operation: str, started: float, failed: bool = False) -> None:
+    elapsed = time.perf_counter() - started
+    DB_OPERATION_DURATION.observe(elapsed, collection, operation)
+    if failed:
+        DB_OPERATION_ERRORS.inc(collection, operation)
+    accumulator = _db_time.get()
+    if accumulator is not None:
+        accumulator[0] += elapsed
+
+
+class InstrumentedCursor:
+    """Cursor proxy that times ``to_list`` and async iteration."""
+
+    def __init__(self, cursor, collection: str, operation: str):
+        self._cursor = cursor
+        self._collection = collection
+        self._operation = operation
+
+    def sort(self, *args, **kwargs):
+        self._cursor = self._cursor.sort(*args, **kwargs)
+        return self
+
+    def skip(self, *args, **kwargs):
+        self._cursor = self._cursor.skip(*args, **kwargs)
+        return self
+
+    def limit(self, *args, **kwargs):
+        self._cursor = self._cursor.limit(*args, **kwargs)
+        return self
+
+    async def to_list(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            result = await self._cursor.to_list(*args, **kwargs)
+        except Exception:
+            _record_db(self._collection, self._operation, started, failed=True)
+            raise
+        _record_db(self._collection, self._operation, started)
+        return result
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        # Iteration is charged to the request but not observed per document,
+        # which would flood the histogram with near-zero buffered reads.
+        started = time.perf_counter()
+        try:
+            return await self._cursor.__anext__()
+        except StopAsyncIteration:
+            raise
+        except Exception:
+            DB_OPERATION_ERRORS.inc(self._collection, self._operation)
+            raise
+        finally:
+            accumulator = _db_time.get()
+            if accumulator is not None:
+                accumulator[0] += time.perf_counter() - started
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class InstrumentedCollection:
+    _TIMED = {
+        "find_one", "find_one_and_update", "count_documents", "insert_one", "insert_many", "update_one",
+        "update_many", "delete_one", "delete_many", "bulk_write", "create_indexes",
+    }
+
+    def __init__(self, collection):
+        self._collection = collection
+        self._name = collection.name
+
+    def find(self, *args, **kwargs):
+        return InstrumentedCursor(self._collection.find(*args, **kwargs), self._name, "find")
+
+    def __getattr__(self, name):
+        attribute = getattr(self._collection, name)
+        if name == "aggregate":
+            # Resolved here rather than defined, so engines without pipelines
+            # (the memory engine) still lack it behind the wrapper
+            return lambda *args, **kwargs: InstrumentedCursor(attribute(*args, **kwargs), self._name, "aggregate")
+        if name not in self._TIMED:
+            return attribute
+
+        async def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = await attribute(*args, **kwargs)
+            except Exception:
+                _record_db(self._name, name, started, failed=True)
+                raise
+            _record_db(self._name, name, started)
+            return result
+        return timed
+
+
+class InstrumentedDatabase:
+    def __init__(self, db):
+        self._db = db
+        self._collections: Dict[str, InstrumentedCollection] = {}
+
+    def __getitem__(self, name: str) -> InstrumentedCollection:
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections[name] = InstrumentedCollection(self._db[name])
+        return collection
+
+    # Database-level methods passed through untimed; other attributes are collections
+    _METHODS = {"list_collection_names", "get_collection", "name", "client"}
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if name in self._METHODS:
+            return getattr(self._db, name)
+        return self[name]
+
+    async def command(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await self._db.command(*args, **kwargs)
+        finally:
+            _record_db("$cmd", "command", started)
+
+
+def instrument_database(db):
+    if db is None or isinstance(db, InstrumentedDatabase):
+        return db
+    return InstrumentedDatabase(db)
+
+
+class SlowRequestProfiler:
+    """Sampling profiler for requests slower than a threshold.
+
+    A daemon thread records the event loop thread's stack every ``interval``
+    seconds into a ring buffer. When a request finishes over the threshold,
+    the samples taken during it are aggregated and logged. Samples are per
+    thread, so concurrent requests share them; the report shows where the
+    loop was busy while the slow request was in flight.
+    """
+
+    def __init__(self, threshold_ms: float, interval: float = 0.005, max_samples: int = 20000,
+                 top: int = 15):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval
+        self.top = top
+        self._samples = collections.deque(maxlen=max_samples)
+        self._thread_id = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        self._thread_id = threading.get_ident()
+        self._thread = threading.Thread(target=self._sample, name="slow-request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None and len(stack) < 40:
+                code = frame.f_code
+                stack.append(f"{code.co_filename}:{frame.f_lineno} {code.co_name}")
+                frame = frame.f_back
+            self._samples.append((time.perf_counter(), tuple(stack)))
+
+    def report(self, route: str, method: str, started: float, finished: float) -> None:
+        samples = [stack for at, stack in list(self._samples) if started <= at <= finished]
+        if not samples:
+            return
+        leaves = collections.Counter(stack[0] for stack in samples if stack)
+        inclusive = collections.Counter()
+        for stack in samples:
+            inclusive.update(set(stack))
+        # Frames on every sample (the loop, middleware) say nothing about the cause
+        varying = [(frame, count) for frame, count in inclusive.most_common() if count < len(samples)]
+
+        def share(count):
+            return f"{count * 100 / len(samples):5.1f}%"
+
+        lines = ["self:"] + [f"  {share(count)}  {frame}" for frame, count in leaves.most_common(self.top)]
+        if varying:
+            lines += ["inclusive:"] + [f"  {share(count)}  {frame}" for frame, count in varying[:self.top]]
+        logger.warning(
+            "Slow request %s %s took %.1f ms (%d samples):\n%s",
+            method, route, (finished - started) * 1000, len(samples), "\n".join(lines),
+        )
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency and database time per route."""
+
+    def __init__(self, app, profiler: Optional[SlowRequestProfiler] = None, slow_threshold_ms: float = 0):
+        self.app = app
+        self.profiler = profiler
+        self.slow_threshold = slow_threshold_ms / 1000
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+        # Event streams stay open for as long as the client listens, so only
+        # the time until their headers go out is recorded
+        streaming_at = [None]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                headers = dict(message.get("headers") or ())
+                if headers.get(b"content-type", b"").startswith(b"text/event-stream"):
+                    streaming_at[0] = time.perf_counter()
+            await send(message)
+
+        db_time = [0.0]
+        token = _db_time.set(db_time)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            finished = streaming_at[0] or time.perf_counter()
+            _db_time.reset(token)
+            route = scope.get("route")
+            # Unmatched paths share one label to keep cardinality bounded
+            template = getattr(route, "path", None) or "<unmatched>"
+            method = scope.get("method", "")
+            elapsed = finished - started
+            REQUEST_DURATION.observe(elapsed, template, method, str(status[0]))
+            REQUEST_DB_TIME.observe(db_time[0], template, method)
+            REQUEST_APP_TIME.observe(max(elapsed - db_time[0], 0.0), template, method)
+            if self.slow_threshold and elapsed >= self.slow_threshold and streaming_at[0] is None:
+                SLOW_REQUESTS.inc(template, method)
+                if self.profiler is not None:
+                    self.profiler.report(template, method, started, finished)
@@ -0,0 +1,84 @@
+"""Lowercase email addresses stored before submissions were normalized.
+
+Rewrites ``email`` on newsletter subscriptions, contact messages and booking
+inquiries to its normalized form (see ``emails.normalize_email``). Newsletter
+subscriptions that only differed by case are merged: the earliest one is
+kept and the others are deleted, since the unique index allows one document
+per address. Safe to run more than once.
+
+    python migrate_emails.py --dry-run
+    python migrate_emails.py
+"""
+import argparse
+import asyncio
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+from dotenv import load_dotenv
+from pymongo import DeleteOne, UpdateOne
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+from emails import normalize_email  # noqa: E402
+from storage import open_database  # noqa: E402
+
+COLLECTIONS = ("newsletter_subscriptions", "contact_messages", "booking_inquiries")
+
+
+def plan(documents: list, merge: bool) -> list:
+    """Updates (and, with ``merge``, deletes) normalizing the ``email`` of ``documents``."""
+    if not merge:
+        return [
+            UpdateOne({"_id": document["_id"]}, {"$set": {"email": normalize_email(document["email"])}})
+            for document in documents
+            if document["email"] != normalize_email(document["email"])
+        ]
+    groups = defaultdict(list)
+    for document in documents:
+        groups[normalize_email(document["email"])].append(document)
+    operations = []
+    for email, group in groups.items():
+        group.sort(key=lambda document: document.get("subscribed_at") or datetime.max)
+        keep, duplicates = group[0], group[1:]
+        # Deletes go first so the kept document's new address is free in the unique index
+        operations += [DeleteOne({"_id": document["_id"]}) for document in duplicates]
+        if keep["email"] != email:
+            operations.append(UpdateOne({"_id": keep["_id"]}, {"$set": {"email": email}}))
+    return operations
+
+
+async def migrate(dry_run: bool = False, batch_size: int = 1000) -> dict:
+    client, db = open_database()
+    totals = {}
+    try:
+        for name in COLLECTIONS:
+            started = time.perf_counter()
+            documents = await db[name].find(
+                {"email": {"$type": "string"}}, {"_id": 1, "email": 1, "subscribed_at": 1}
+            ).to_list(None)
+            operations = plan(documents, merge=name == "newsletter_subscriptions")
+            deletes = sum(isinstance(operation, DeleteOne) for operation in operations)
+            print(f"{name}: {len(operations) - deletes} to lowercase, {deletes} duplicates to remove "
+                  f"({(time.perf_counter() - started) * 1000:.1f} ms)")
+            totals[name] = {"updated": len(operations) - deletes, "removed": deletes}
+            if dry_run or not operations:
+                continue
+            # Ordered, so each batch's deletes land before its updates
+            for offset in range(0, len(operations), batch_size):
+                await db[name].bulk_write(operations[offset:offset + batch_size], ordered=True)
+        if dry_run:
+            print("Dry run: nothing written")
+        return totals
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Normalize stored email addresses")
+    parser.add_argument("--dry-run", action="store_true", help="count the changes without writing them")
+    parser.add_argument("--batch-size", type=int, default=1000, help="operations per bulk_write")
+    args = parser.parse_args()
+    asyncio.run(migrate(dry_run=args.dry_run, batch_size=args.batch_size))
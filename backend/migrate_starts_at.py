@@ -0,0 +1,90 @@
+"""Backfill ``starts_at`` and ``id`` on events stored before they existed.
+
+Computes the typed start time from each event's ``date`` and ``time``
+strings (see ``event_time``) and copies ``_id`` into ``id`` on events that
+only carry ``_id``, since keyset pages are ordered by ``(starts_at, id)``
+and an event without ``id`` would fall out of paging. Writes the changes
+in unordered bulk batches, then
+creates the ``starts_at_id`` index and drops the ``date_id`` index it
+replaces. Safe to run more than once: events that already have
+``starts_at`` and ``id`` are skipped unless --recompute is given, for example after
+changing EVENT_TIMEZONE.
+
+    python migrate_starts_at.py --dry-run
+    python migrate_starts_at.py
+"""
+import argparse
+import asyncio
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+from pymongo import UpdateOne
+from pymongo.errors import OperationFailure
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+from event_time import EVENT_TIMEZONE, event_starts_at  # noqa: E402
+from indexes import ensure_indexes  # noqa: E402
+from storage import open_database  # noqa: E402
+
+REPLACED_INDEX = "date_id"
+
+
+async def migrate(dry_run: bool = False, recompute: bool = False, batch_size: int = 1000) -> dict:
+    started = time.perf_counter()
+    client, db = open_database()
+    try:
+        query = {} if recompute else {"$or": [{"starts_at": {"$exists": False}}, {"id": {"$exists": False}}]}
+        operations, unreadable, missing_ids = [], [], 0
+        async for event in db.events.find(query, {"_id": 1, "id": 1, "date": 1, "time": 1, "starts_at": 1}):
+            fields = {}
+            if "id" not in event:
+                fields["id"] = str(event["_id"])
+                missing_ids += 1
+            if recompute or "starts_at" not in event:
+                starts_at = event_starts_at(event.get("date"), event.get("time"))
+                if starts_at is None:
+                    # Stored as null so the next run does not visit it again
+                    unreadable.append(f"{event['_id']} (date {event.get('date')!r})")
+                if "starts_at" not in event or event["starts_at"] != starts_at:
+                    fields["starts_at"] = starts_at
+            if fields:
+                operations.append(UpdateOne({"_id": event["_id"]}, {"$set": fields}))
+        read_ms = (time.perf_counter() - started) * 1000
+
+        for entry in unreadable:
+            print(f"unreadable date: {entry}")
+        print(f"{len(operations)} events to update in {EVENT_TIMEZONE.key}, {missing_ids} without id "
+              f"({read_ms:.1f} ms)")
+        if dry_run:
+            print("Dry run: nothing written")
+            return {"updated": 0, "pending": len(operations), "unreadable": len(unreadable), "missing_ids": missing_ids}
+
+        write_started = time.perf_counter()
+        modified = 0
+        for offset in range(0, len(operations), batch_size):
+            result = await db.events.bulk_write(operations[offset:offset + batch_size], ordered=False)
+            modified += result.modified_count
+        write_ms = (time.perf_counter() - write_started) * 1000
+
+        await ensure_indexes(db)
+        try:
+            await db.events.drop_index(REPLACED_INDEX)
+            print(f"Dropped index {REPLACED_INDEX}")
+        except OperationFailure:
+            pass  # already gone
+        print(f"Updated {modified} events in {write_ms:.1f} ms")
+        return {"updated": modified, "pending": 0, "unreadable": len(unreadable), "missing_ids": missing_ids}
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill typed start times and ids on events")
+    parser.add_argument("--dry-run", action="store_true", help="count the changes without writing them")
+    parser.add_argument("--recompute", action="store_true", help="recompute starts_at on every event")
+    parser.add_argument("--batch-size", type=int, default=1000, help="updates per bulk_write")
+    args = parser.parse_args()
+    asyncio.run(migrate(dry_run=args.dry_run, recompute=args.recompute, batch_size=args.batch_size))
@@ -0,0 +1,193 @@
+"""Rate limiting and double-submit suppression for the public form endpoints.
+
+Each form route has token buckets keyed by client IP and by submitted email,
+and a short window in which an identical submission is answered with the
+first one's response instead of being written again. Buckets live in a
+``BucketStore``; the default one is per process, so with several workers
+the effective limit is multiplied unless a shared store is plugged in.
+"""
+import asyncio
+import hashlib
+import heapq
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Dict, List, NamedTuple, Optional
+
+from fastapi import HTTPException, Request
+
+from metrics import Counter, registry
+
+RATE_LIMIT_REJECTIONS = registry.register(Counter(
+    "rate_limit_rejections_total", "Form submissions rejected by the rate limiter.", ("route", "key"),
+))
+DUPLICATE_SUBMISSIONS = registry.register(Counter(
+    "duplicate_submissions_total", "Identical form submissions absorbed by the dedupe window.", ("route",),
+))
+
+
+class Limit(NamedTuple):
+    rate: float   # tokens refilled per second
+    burst: float  # bucket capacity
+
+
+def parse_limit(spec: Optional[str]) -> Optional[Limit]:
+    """Parse ``"count/seconds"`` or ``"count/seconds:burst"``; empty or ``0`` disables."""
+    if not spec or spec.strip() == "0":
+        return None
+    rate_part, _, burst = spec.partition(":")
+    count, _, seconds = rate_part.partition("/")
+    count, seconds = float(count), float(seconds or 1)
+    return Limit(rate=count / seconds, burst=float(burst) if burst else count)
+
+
+class RouteLimits(NamedTuple):
+    ip: Optional[Limit]
+    email: Optional[Limit]
+    dedupe_window: float
+
+    @classmethod
+    def from_env(cls, route: str, ip: str, email: str, dedupe_window: float) -> "RouteLimits":
+        prefix = route.upper()
+        return cls(
+            ip=parse_limit(os.environ.get(f'RATE_LIMIT_{prefix}_IP', ip)),
+            email=parse_limit(os.environ.get(f'RATE_LIMIT_{prefix}_EMAIL', email)),
+            dedupe_window=float(os.environ.get(f'DEDUPE_WINDOW_{prefix}', dedupe_window)),
+        )
+
+
+class BucketStore(ABC):
+    """Where token buckets live. Implementations must make ``take`` atomic."""
+
+    @abstractmethod
+    async def take(self, key: str, limit: Limit, cost: float = 1.0) -> float:
+        """Consume ``cost`` tokens; return 0 when allowed, else seconds until it would be."""
+
+
+class MemoryBucketStore(BucketStore):
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def take(self, key: str, limit: Limit, cost: float = 1.0) -> float:
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (limit.burst, now))
+        tokens = min(limit.burst, tokens + (now - updated) * limit.rate)
+        wait = 0.0
+        if tokens >= cost:
+            tokens -= cost
+        else:
+            wait = (cost - tokens) / limit.rate
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        # Forgetting the least recently seen client only ever hands it a full bucket
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class Submission:
+    def __init__(self, duplicate=None):
+        self.duplicate = duplicate
+        self.result = None
+
+
+class FormGuard:
+    def __init__(self, limits: Dict[str, RouteLimits], store: Optional[BucketStore] = None,
+                 trust_forwarded_for: bool = False, max_recent: int = 10000):
+        self.limits = limits
+        self.store = store or MemoryBucketStore()
+        self.trust_forwarded_for = trust_forwarded_for
+        self.max_recent = max_recent
+        # content hash -> (expires_at, future resolving to the first response)
+        self._recent: Dict[str, tuple] = {}
+        # (expires_at, content hash), soonest first. Routes have different
+        # windows, so insertion order says nothing about what expires next
+        self._expiry: List[tuple] = []
+
+    def client_ip(self, request: Request) -> str:
+        if self.trust_forwarded_for:
+            forwarded = request.headers.get("x-forwarded-for")
+            if forwarded:
+                return forwarded.split(",")[0].strip()
+        return request.client.host if request.client else "unknown"
+
+    def _fingerprint(self, route: str, payload: dict) -> str:
+        canonical = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+        return hashlib.blake2b(route.encode("utf-8") + b"\0" + canonical, digest_size=16).hexdigest()
+
+    def _evict(self, now: float) -> None:
+        while self._expiry and (self._expiry[0][0] <= now or len(self._recent) >= self.max_recent):
+            expires_at, fingerprint = heapq.heappop(self._expiry)
+            entry = self._recent.get(fingerprint)
+            # Skip heap items whose entry was dropped or claimed again since
+            if entry is not None and entry[0] == expires_at:
+                del self._recent[fingerprint]
+
+    def _claim(self, fingerprint: str, window: float) -> Optional[asyncio.Future]:
+        now = time.monotonic()
+        self._evict(now)
+        entry = self._recent.get(fingerprint)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+        self._recent[fingerprint] = (now + window, asyncio.get_running_loop().create_future())
+        heapq.heappush(self._expiry, (now + window, fingerprint))
+        return None
+
+    async def _check_rate(self, route: str, limits: RouteLimits, request: Request, email: Optional[str]) -> None:
+        checks = [("ip", limits.ip, self.client_ip(request))]
+        if email:
+            checks.append(("email", limits.email, email.lower()))
+        for kind, limit, value in checks:
+            if limit is None:
+                continue
+            wait = await self.store.take(f"{route}:{kind}:{value}", limit)
+            if wait > 0:
+                RATE_LIMIT_REJECTIONS.inc(route, kind)
+                raise HTTPException(
+                    status_code=429,
+                    detail="Too many submissions, please try again later",
+                    headers={"Retry-After": str(max(1, int(wait + 0.999)))},
+                )
+
+    @asynccontextmanager
+    async def submission(self, route: str, request: Request, payload: dict):
+        """Admit one form submission.
+
+        Yields a ``Submission``; when ``duplicate`` is set the same payload was
+        accepted moments ago and the handler should return that response
+        instead of writing again. Otherwise the handler stores its response in
+        ``result`` so later duplicates can be answered with it.
+        """
+        limits = self.limits.get(route)
+        if limits is None:
+            yield Submission()
+            return
+
+        fingerprint = self._fingerprint(route, payload) if limits.dedupe_window > 0 else None
+        if fingerprint is not None:
+            pending = self._claim(fingerprint, limits.dedupe_window)
+            if pending is not None:
+                DUPLICATE_SUBMISSIONS.inc(route)
+                yield Submission(duplicate=await asyncio.shield(pending))
+                return
+
+        submission = Submission()
+        try:
+            await self._check_rate(route, limits, request, payload.get("email"))
+            yield submission
+        except BaseException as exc:
+            if fingerprint is not None:
+                # Let a retry through, and fail any duplicate waiting on this one
+                entry = self._recent.pop(fingerprint, None)
+                if entry is not None and not entry[1].done():
+                    entry[1].set_exception(exc)
+                    entry[1].exception()
+            raise
+        if fingerprint is not None:
+            entry = self._recent.get(fingerprint)
+            if entry is not None and not entry[1].done():
+                entry[1].set_result(submission.result)
@@ -0,0 +1,129 @@
+import hashlib
+import json
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from compression import CompressedVariants, weak_etag
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    orjson = None
+
+# (output key, value used when the stored document lacks the field)
+Layout = List[Tuple[str, Any]]
+
+
+def render_json(content) -> bytes:
+    """Serialize a response body the same way FastAPI's JSONResponse does."""
+    return json.dumps(
+        jsonable_encoder(content),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def response_layout(model) -> Layout:
+    """Output keys of ``model`` in field order, as FastAPI would emit them.
+
+    Fields with a default factory fall back to ``None`` rather than a freshly
+    generated value, so a document missing one renders the same every time.
+    """
+    layout = []
+    for name, field in model.model_fields.items():
+        default = None if field.is_required() or field.default_factory else field.default
+        layout.append((field.alias or name, default))
+    return layout
+
+
+def projection_for(layout: Layout, *extra: str) -> dict:
+    """Mongo projection fetching only the fields in ``layout`` plus ``extra``."""
+    projection = {key: 1 for key, _ in layout}
+    for key in extra:
+        projection[key] = 1
+    projection.setdefault("_id", 0)
+    return projection
+
+
+def shape_rows(rows: Iterable[dict], layout: Layout) -> List[dict]:
+    """Order and default raw documents to match the response model, without validation."""
+    return [{key: row.get(key, default) for key, default in layout} for row in rows]
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def dump_json(value) -> bytes:
+    """Compact JSON encoding of plain (already-shaped) data."""
+    if orjson is not None:
+        return orjson.dumps(value, default=_json_default)
+    return json.dumps(
+        value,
+        default=_json_default,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def dump_rows(rows: List[dict]) -> bytes:
+    """Encode already-shaped rows in a single pass."""
+    return dump_json(rows)
+
+
+def compute_etag(body: bytes) -> str:
+    """Strong ETag derived from the exact response bytes."""
+    return '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # If-None-Match uses the weak comparison function (RFC 9110 13.1.2)
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def conditional_json_response(
+    request: Request,
+    body: bytes,
+    cache_control: str,
+    etag: Optional[str] = None,
+    headers: Optional[Dict[str, str]] = None,
+    variants: Optional[CompressedVariants] = None,
+) -> Response:
+    """Return ``body`` as JSON, or an empty 304 when the client already has it.
+
+    With ``variants`` (the compressed forms cached alongside ``body``) the
+    response is sent precompressed when the client accepts it.
+    """
+    etag = etag or compute_etag(body)
+    response_headers = dict(headers or {})
+    response_headers["ETag"] = etag
+    if cache_control:
+        response_headers["Cache-Control"] = cache_control
+    if variants is not None:
+        response_headers["Vary"] = "Accept-Encoding"
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=response_headers)
+    if variants is not None:
+        encoding, body = variants.encode(request.headers.get("accept-encoding"))
+        if encoding is not None:
+            response_headers["Content-Encoding"] = encoding
+            response_headers["ETag"] = weak_etag(etag)
+    return Response(content=body, media_type="application/json", headers=response_headers)
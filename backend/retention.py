@@ -0,0 +1,203 @@
+"""Archive finished bookings out of the hot collection, and bring them back.
+
+Completed and declined bookings whose status last changed more than
+BOOKING_ARCHIVE_DAYS days ago (by created_at for bookings that predate
+``status_changed_at``) are moved in batches either to the
+``booking_inquiries_archive`` collection or to gzipped NDJSON files under
+ARCHIVE_DIR. Each batch is stored in the archive before it is deleted, so
+an interrupted run loses nothing; running again archives the rest, and
+anything stored twice is skipped on restore. Archived bookings no longer
+appear in the booking lists or /api/bookings/stats. Restored bookings are
+stamped with ``restored_at`` and are not archived again until that is
+older than the cutoff as well.
+
+Contact messages are not archived here; they expire through the TTL index
+set by CONTACT_RETENTION_DAYS (see ``indexes``).
+
+    python retention.py archive --dry-run
+    python retention.py archive --days 180 --to ndjson
+    python retention.py restore --from collection --id <booking id>
+    python retention.py restore --from archive/booking_inquiries.20250101T000000Z.ndjson.gz
+
+Meant to run from cron on one machine rather than inside every API worker.
+"""
+import argparse
+import asyncio
+import gzip
+import os
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from bson import json_util
+from dotenv import load_dotenv
+from pymongo.errors import BulkWriteError
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+from storage import open_database  # noqa: E402
+
+HOT_COLLECTION = "booking_inquiries"
+ARCHIVE_COLLECTION = "booking_inquiries_archive"
+
+BOOKING_ARCHIVE_DAYS = float(os.environ.get('BOOKING_ARCHIVE_DAYS', '365'))
+BOOKING_ARCHIVE_STATUSES = tuple(
+    status.strip() for status in os.environ.get('BOOKING_ARCHIVE_STATUSES', 'completed,declined').split(',')
+    if status.strip()
+)
+ARCHIVE_DIR = Path(os.environ.get('ARCHIVE_DIR') or ROOT_DIR / 'archive')
+
+
+def archive_query(cutoff: datetime, statuses: Iterable[str] = BOOKING_ARCHIVE_STATUSES) -> dict:
+    return {
+        "status": {"$in": list(statuses)},
+        "$and": [
+            {"$or": [
+                {"status_changed_at": {"$lt": cutoff}},
+                {"status_changed_at": None, "created_at": {"$lt": cutoff}},
+            ]},
+            {"$or": [{"restored_at": None}, {"restored_at": {"$lt": cutoff}}]},
+        ],
+    }
+
+
+async def insert_ignoring_duplicates(collection, documents: List[dict]) -> int:
+    """Insert ``documents``, skipping ones already stored; returns how many were new."""
+    try:
+        result = await collection.insert_many(documents, ordered=False)
+        return len(result.inserted_ids)
+    except BulkWriteError as exc:
+        errors = exc.details.get("writeErrors", [])
+        if any(error.get("code") != 11000 for error in errors):
+            raise
+        return exc.details.get("nInserted", len(documents) - len(errors))
+
+
+def write_ndjson(path: Path, documents: List[dict]) -> None:
+    # Each batch is its own gzip member; gzip readers see one continuous file
+    path.parent.mkdir(parents=True, exist_ok=True)
+    lines = "".join(json_util.dumps(document, json_options=json_util.RELAXED_JSON_OPTIONS) + "\n"
+                    for document in documents)
+    with open(path, "ab") as handle:
+        handle.write(gzip.compress(lines.encode("utf-8")))
+        handle.flush()
+        os.fsync(handle.fileno())
+
+
+def stamp_restored(documents: List[dict]) -> List[dict]:
+    restored_at = datetime.utcnow()
+    return [{**document, "restored_at": restored_at} for document in documents]
+
+
+def read_ndjson(path: Path):
+    with gzip.open(path, "rt", encoding="utf-8") as handle:
+        for line in handle:
+            if line.strip():
+                yield json_util.loads(line)
+
+
+async def archive_bookings(db, days: float = BOOKING_ARCHIVE_DAYS, target: str = "collection",
+                           out_dir: Path = ARCHIVE_DIR, batch_size: int = 500, dry_run: bool = False) -> dict:
+    """Move finished bookings older than ``days`` to ``target`` (``collection`` or ``ndjson``)."""
+    started = time.perf_counter()
+    query = archive_query(datetime.utcnow() - timedelta(days=days))
+    hot = db[HOT_COLLECTION]
+    if dry_run:
+        return {"archived": 0, "pending": await hot.count_documents(query)}
+
+    path = out_dir / f"{HOT_COLLECTION}.{datetime.utcnow():%Y%m%dT%H%M%SZ}.ndjson.gz"
+    archived, batches, last_id = 0, 0, None
+    while True:
+        batch_query = query if last_id is None else {"$and": [query, {"_id": {"$gt": last_id}}]}
+        batch = await hot.find(batch_query).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+        last_id = batch[-1]["_id"]
+        if target == "ndjson":
+            await asyncio.to_thread(write_ndjson, path, batch)
+        else:
+            await insert_ignoring_duplicates(db[ARCHIVE_COLLECTION], batch)
+        result = await hot.delete_many({"_id": {"$in": [document["_id"] for document in batch]}})
+        archived += result.deleted_count
+        batches += 1
+    return {
+        "archived": archived,
+        "batches": batches,
+        "file": str(path) if target == "ndjson" and archived else None,
+        "ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+async def restore_bookings(db, source: str = "collection", ids: Optional[List[str]] = None,
+                           batch_size: int = 500) -> dict:
+    """Copy archived bookings back into the hot collection.
+
+    ``source`` is ``collection`` or the path of an NDJSON archive. Restored
+    bookings are removed from the archive collection; archive files are
+    left in place. ``ids`` limits the restore to those bookings. Each
+    restored booking gets ``restored_at``, which keeps the next archive
+    run from moving it straight back.
+    """
+    hot, archive = db[HOT_COLLECTION], db[ARCHIVE_COLLECTION]
+    wanted = set(ids) if ids else None
+    restored = 0
+    if source == "collection":
+        query = {"id": {"$in": list(wanted)}} if wanted else {}
+        while True:
+            batch = await archive.find(query).limit(batch_size).to_list(batch_size)
+            if not batch:
+                break
+            restored += await insert_ignoring_duplicates(hot, stamp_restored(batch))
+            await archive.delete_many({"_id": {"$in": [document["_id"] for document in batch]}})
+        return {"restored": restored}
+
+    batch = []
+    for document in read_ndjson(Path(source)):
+        if wanted is None or document.get("id") in wanted:
+            batch.append(document)
+        if len(batch) >= batch_size:
+            restored += await insert_ignoring_duplicates(hot, stamp_restored(batch))
+            batch = []
+    if batch:
+        restored += await insert_ignoring_duplicates(hot, stamp_restored(batch))
+    return {"restored": restored}
+
+
+async def main(args) -> dict:
+    client, db = open_database()
+    try:
+        if args.command == "archive":
+            result = await archive_bookings(db, args.days, args.to, args.out, args.batch_size, args.dry_run)
+            if args.dry_run:
+                print(f"{result['pending']} bookings ({', '.join(BOOKING_ARCHIVE_STATUSES)}) older than "
+                      f"{args.days:g} days would be archived; nothing written")
+            else:
+                print(f"Archived {result['archived']} bookings in {result['batches']} batches "
+                      f"to {result['file'] or ARCHIVE_COLLECTION} ({result['ms']} ms)")
+        else:
+            result = await restore_bookings(db, args.source, args.id, args.batch_size)
+            print(f"Restored {result['restored']} bookings from {args.source}")
+        return result
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive and restore finished bookings")
+    commands = parser.add_subparsers(dest="command", required=True)
+    archive = commands.add_parser("archive", help="move finished bookings out of the hot collection")
+    archive.add_argument("--days", type=float, default=BOOKING_ARCHIVE_DAYS,
+                         help="age in days since the last status change (default: BOOKING_ARCHIVE_DAYS or 365)")
+    archive.add_argument("--to", choices=("collection", "ndjson"), default="collection",
+                         help=f"{ARCHIVE_COLLECTION} or a gzipped NDJSON file")
+    archive.add_argument("--out", type=Path, default=ARCHIVE_DIR, help="directory for NDJSON archives")
+    archive.add_argument("--dry-run", action="store_true", help="count the bookings without moving them")
+    restore = commands.add_parser("restore", help="bring archived bookings back")
+    restore.add_argument("--from", dest="source", default="collection",
+                         help="'collection' (default) or the path of an NDJSON archive")
+    restore.add_argument("--id", action="append", help="restore only this booking id (repeatable)")
+    for command in (archive, restore):
+        command.add_argument("--batch-size", type=int, default=500, help="documents per batch")
+    asyncio.run(main(parser.parse_args()))
@@ -1,92 +1,123 @@
+import argparse
 import asyncio
+import json
+import time
+from datetime import datetime
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import DeleteOne, UpdateOne
 import os
 from dotenv import load_dotenv
 from pathlib import Path
 
+from event_time import event_starts_at
+
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-async def seed_events():
+DEFAULT_FIXTURES = ROOT_DIR / 'fixtures' / 'events.json'
+
+# Fields an event fixture must provide; the rest default to None
+REQUIRED_FIELDS = ("id", "title", "venue", "address", "date", "time")
+OPTIONAL_FIELDS = ("description", "ticketUrl")
+
+
+def load_fixtures(path: Path) -> dict:
+    """Read event fixtures from a JSON array and index them by id."""
+    with open(path) as f:
+        events = json.load(f)
+    fixtures = {}
+    for position, event in enumerate(events):
+        missing = [field for field in REQUIRED_FIELDS if not event.get(field)]
+        if missing:
+            raise ValueError(f"Fixture #{position} is missing {', '.join(missing)}")
+        if event["id"] in fixtures:
+            raise ValueError(f"Fixture #{position} repeats id {event['id']!r}")
+        fields = {field: event[field] for field in REQUIRED_FIELDS}
+        fields.update({field: event.get(field) for field in OPTIONAL_FIELDS})
+        fields["starts_at"] = event_starts_at(fields["date"], fields["time"])
+        fixtures[event["id"]] = fields
+    return fixtures
+
+
+def diff_events(fixtures: dict, existing: dict, prune: bool):
+    """Return the bulk operations that bring ``existing`` in line with ``fixtures``.
+
+    Also returns a summary of ids per action. Unchanged events produce no
+    operation. Events missing from the fixtures are only deleted when
+    ``prune`` is set, because they may have been created through the API.
+    """
+    operations = []
+    summary = {"insert": [], "update": [], "delete": [], "unchanged": []}
+    for event_id, fields in fixtures.items():
+        current = existing.get(event_id)
+        if current is None:
+            operations.append(UpdateOne(
+                {"id": event_id},
+                {"$set": fields, "$setOnInsert": {"_id": event_id, "created_at": datetime.utcnow()}},
+                upsert=True,
+            ))
+            summary["insert"].append(event_id)
+            continue
+        changed = {field: value for field, value in fields.items() if current.get(field) != value}
+        if changed:
+            operations.append(UpdateOne({"id": event_id}, {"$set": changed}))
+            summary["update"].append(event_id)
+        else:
+            summary["unchanged"].append(event_id)
+    if prune:
+        for event_id in existing.keys() - fixtures.keys():
+            operations.append(DeleteOne({"id": event_id}))
+            summary["delete"].append(event_id)
+    return operations, summary
+
+
+async def seed_events(fixtures_path: Path = DEFAULT_FIXTURES, dry_run: bool = False, prune: bool = False):
+    started = time.perf_counter()
+    fixtures = load_fixtures(fixtures_path)
+
     mongo_url = os.environ['MONGO_URL']
     client = AsyncIOMotorClient(mongo_url)
     db = client[os.environ['DB_NAME']]
-    
-    # Check if events already exist
-    existing_events = await db.events.count_documents({})
-    if existing_events > 0:
-        print(f"Events already seeded ({existing_events} events found). Skipping...")
-        client.close()
-        return
-    
-    events = [
-        # Past Performances
-        {
-            "id": "1",
-            "title": "Sydney Festival 2025",
-            "venue": "Domain Theatre",
-            "address": "1 Art Gallery Road, The Domain, Sydney NSW 2000",
-            "date": "2025-08-15",
-            "time": "7:00 PM",
-            "description": "Join us for an unforgettable evening of South Asian fusion music at Sydney Festival 2025. Experience Eastern Empire's electrifying performance featuring both traditional and contemporary hits.",
-            "ticketUrl": "https://www.sydneyfestival.org.au/"
-        },
-        {
-            "id": "2",
-            "title": "Cultural Night at Opera House",
-            "venue": "Sydney Opera House - Studio",
-            "address": "Bennelong Point, Sydney NSW 2000",
-            "date": "2025-09-20",
-            "time": "8:00 PM",
-            "description": "An intimate evening celebrating South Asian music and culture. Limited seating available.",
-            "ticketUrl": "https://www.sydneyoperahouse.com/"
-        },
-        {
-            "id": "3",
-            "title": "Diwali Festival Performance",
-            "venue": "Parramatta Park",
-            "address": "Pitt Street &, Macquarie Street, Parramatta NSW 2150",
-            "date": "2025-10-25",
-            "time": "6:00 PM",
-            "description": "Celebrate the festival of lights with Eastern Empire! Free entry, family-friendly event.",
-            "ticketUrl": None
-        },
-        # Upcoming Shows
-        {
-            "id": "4",
-            "title": "New Year's Eve Gala",
-            "venue": "The Star Event Centre",
-            "address": "80 Pyrmont Street, Pyrmont NSW 2009",
-            "date": "2025-12-31",
-            "time": "9:00 PM",
-            "description": "Ring in the New Year with Eastern Empire! A spectacular night of music, dance, and celebration. Black tie event with dinner and entertainment.",
-            "ticketUrl": "https://www.star.com.au/"
-        },
-        {
-            "id": "5",
-            "title": "Australia Day Concert",
-            "venue": "Darling Harbour",
-            "address": "Darling Harbour, Sydney NSW 2000",
-            "date": "2026-01-26",
-            "time": "6:30 PM",
-            "description": "Celebrate Australia Day with Eastern Empire at this free outdoor concert. Bring your family and friends for an evening of multicultural music under the stars.",
-            "ticketUrl": None
-        },
-        {
-            "id": "6",
-            "title": "Valentine's Concert Series",
-            "venue": "City Recital Hall",
-            "address": "2 Angel Place, Sydney NSW 2000",
-            "date": "2026-02-14",
-            "time": "7:30 PM",
-            "description": "An intimate evening of romantic melodies and timeless classics. Perfect date night experience featuring Eastern Empire's signature blend of traditional and contemporary sounds.",
-            "ticketUrl": "https://www.cityrecitalhall.com/"
+
+    try:
+        projection = {field: 1 for field in REQUIRED_FIELDS + OPTIONAL_FIELDS + ("starts_at",)}
+        projection["_id"] = 0
+        existing = {
+            event["id"]: event
+            async for event in db.events.find({"id": {"$type": "string"}}, projection)
         }
-    ]
-    
-    result = await db.events.insert_many(events)
-    print(f"Successfully seeded {len(result.inserted_ids)} events")
-    client.close()
+        read_ms = (time.perf_counter() - started) * 1000
+
+        operations, summary = diff_events(fixtures, existing, prune)
+        for action in ("insert", "update", "delete"):
+            if summary[action]:
+                print(f"{action:>9}: {', '.join(summary[action])}")
+        print(f"unchanged: {len(summary['unchanged'])} events")
+
+        if not operations:
+            print(f"Events already in sync with {fixtures_path.name} ({read_ms:.1f} ms)")
+            return summary
+        if dry_run:
+            print(f"Dry run: {len(operations)} changes not applied ({read_ms:.1f} ms)")
+            return summary
+
+        write_started = time.perf_counter()
+        result = await db.events.bulk_write(operations, ordered=False)
+        write_ms = (time.perf_counter() - write_started) * 1000
+        print(
+            f"Applied {len(operations)} changes in one bulk_write: "
+            f"{result.upserted_count} inserted, {result.modified_count} updated, "
+            f"{result.deleted_count} deleted (read {read_ms:.1f} ms, write {write_ms:.1f} ms)"
+        )
+        return summary
+    finally:
+        client.close()
+
 
 if __name__ == "__main__":
-    asyncio.run(seed_events())
+    parser = argparse.ArgumentParser(description="Sync the events collection with a fixtures file")
+    parser.add_argument("--fixtures", type=Path, default=DEFAULT_FIXTURES, help="JSON array of events")
+    parser.add_argument("--dry-run", action="store_true", help="show the changes without writing them")
+    parser.add_argument("--prune", action="store_true", help="delete events that are not in the fixtures")
+    args = parser.parse_args()
+    asyncio.run(seed_events(args.fixtures, dry_run=args.dry_run, prune=args.prune))
@@ -0,0 +1,106 @@
+"""Production entry point for the API.
+
+    python -m backend                        # from the repository root
+    python backend/serve.py --workers 4 --port 8000
+
+Serves ``server:app`` with uvicorn, one worker process per available CPU
+unless ``--workers`` or WEB_CONCURRENCY says otherwise. uvloop and httptools
+are used when installed (``pip install uvloop httptools``), otherwise the
+stdlib event loop and h11.
+
+On SIGTERM each worker stops accepting connections, ends open event streams,
+waits up to ``--graceful-timeout`` seconds for in-flight requests, and then
+runs the app's shutdown hooks, which flush the write-behind queues and the
+pending snapshot before the database connection closes.
+
+Every worker has its own caches and connection pool. MONGO_POOL_BUDGET caps
+the connections of all workers together by splitting it into each worker's
+MONGO_MAX_POOL_SIZE. With change streams available the workers invalidate
+each other's caches; otherwise a write is seen by other workers once their
+cached entries expire (EVENTS_CACHE_TTL, BOOKING_STATS_TTL).
+"""
+import argparse
+import importlib.util
+import logging
+import os
+import sys
+
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+logger = logging.getLogger("uvicorn.error")
+
+
+def available_cpus() -> int:
+    try:
+        # CPUs this process may run on, which respects container CPU pinning
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on macOS or Windows
+        return os.cpu_count() or 1
+
+
+def installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def split_pool_budget(workers: int) -> None:
+    budget = os.environ.get('MONGO_POOL_BUDGET')
+    if budget and not os.environ.get('MONGO_MAX_POOL_SIZE'):
+        os.environ['MONGO_MAX_POOL_SIZE'] = str(max(int(budget) // workers, 1))
+
+
+class GracefulServer(uvicorn.Server):
+    """uvicorn server that ends live event streams as soon as shutdown starts.
+
+    uvicorn waits for open connections before running the shutdown hooks,
+    and an event stream never finishes on its own, so each one would
+    otherwise hold the worker until the graceful timeout.
+    """
+
+    def handle_exit(self, sig, frame) -> None:
+        app_module = sys.modules.get("server")
+        if app_module is not None:
+            app_module.stream_publisher.close()
+        super().handle_exit(sig, frame)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m backend", description="Run the API server")
+    parser.add_argument("--host", default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument("--port", type=int, default=int(os.environ.get('PORT', '8001')))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get('WEB_CONCURRENCY') or available_cpus()),
+                        help="worker processes (default: WEB_CONCURRENCY or the available CPUs)")
+    parser.add_argument("--graceful-timeout", type=float, default=float(os.environ.get('GRACEFUL_TIMEOUT', '30')),
+                        help="seconds in-flight requests get to finish on shutdown")
+    parser.add_argument("--log-level", default=os.environ.get('LOG_LEVEL', 'info'))
+    args = parser.parse_args(argv)
+
+    workers = max(args.workers, 1)
+    # Workers inherit the environment; server.py reads the worker count from it
+    os.environ['WEB_CONCURRENCY'] = str(workers)
+    split_pool_budget(workers)
+
+    config = uvicorn.Config(
+        "server:app",
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        loop="uvloop" if installed("uvloop") else "asyncio",
+        http="httptools" if installed("httptools") else "h11",
+        timeout_graceful_shutdown=args.graceful_timeout,
+        proxy_headers=True,
+        log_level=args.log_level,
+    )
+    server = GracefulServer(config)
+    logger.info("Serving on %s:%d with %d worker(s), loop=%s, http=%s",
+                args.host, args.port, workers, config.loop, config.http)
+    if workers > 1:
+        Multiprocess(config, target=server.run, sockets=[config.bind_socket()]).run()
+    else:
+        server.run()
+    if not server.started and workers == 1:
+        sys.exit(3)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,167 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError
+import asyncio
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional
+from typing import List, Literal, Optional
 import uuid
-from datetime import datetime
-
+import base64
+import json
+import time
+from datetime import datetime, date
+
+from booking_stats import BookingStats
+from booking_status import STATUS_PROJECTION, BookingStatus, BookingStatusChange, current_version, plan_change
+from bulk import bulk_report, parse_bulk_body, run_bulk, validate_items
+from cache import ResponseCache
+from compression import CompressedVariants, Compression, CompressionMiddleware
+from emails import DeliverabilityChecker, Email, KnownEmails
+from event_time import event_starts_at, local_day_start, local_today
+from export import export_response
+from indexes import ensure_indexes
+from metrics import (
+    Gauge,
+    MetricsMiddleware,
+    SlowRequestProfiler,
+    instrument_database,
+    registry,
+)
+from ratelimit import FormGuard, RouteLimits
+from responses import (
+    compute_etag,
+    conditional_json_response,
+    dump_json,
+    dump_rows,
+    projection_for,
+    render_json,
+    response_layout,
+    shape_rows,
+)
+from snapshot import SnapshotPublisher
+from storage import open_database, ping, storage_backend, warm_up
+from stream import ChangeStreamFeed, StreamPublisher
+from write_behind import WriteBehindQueue
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# Database connection (MongoDB by default, STORAGE_BACKEND=memory for in-process).
+# Opened in the startup hook so importing the app never touches the database.
+client = None
+db = None
+
+# Sockets opened before serving traffic, and the readiness probe's ping budget
+DB_WARM_CONNECTIONS = int(os.environ.get('DB_WARM_CONNECTIONS', os.environ.get('MONGO_MIN_POOL_SIZE') or '1'))
+DB_PING_TIMEOUT = float(os.environ.get('DB_PING_TIMEOUT', '2'))
+
+# Serialized GET /api/events responses, dropped on every write to events
+events_cache = ResponseCache(
+    "events",
+    max_entries=int(os.environ.get('EVENTS_CACHE_SIZE', '256')),
+    ttl=float(os.environ.get('EVENTS_CACHE_TTL', '30')),
+)
+
+# Booking pipeline summary for GET /api/bookings/stats. Booking writes made by
+# this process update it in place; it is recomputed after BOOKING_STATS_TTL
+# seconds to pick up writes from other workers.
+booking_stats = BookingStats(ttl=float(os.environ.get('BOOKING_STATS_TTL', '300')))
+
+# With SNAPSHOT_DIR set, event writes republish the static events snapshot
+# the frontend-only deployment reads (see snapshot.py) after SNAPSHOT_DELAY seconds.
+SNAPSHOT_DIR = os.environ.get('SNAPSHOT_DIR')
+
+# Live deltas on GET /api/stream. STREAM_SOURCE=auto follows MongoDB change
+# streams when the deployment supports them (replica sets) and otherwise has
+# the write handlers publish; "handlers" skips the change stream probe.
+# STREAM_PRE_IMAGES=1 reads deleted ids from pre-images (see ChangeStreamFeed).
+STREAM_SOURCE = os.environ.get('STREAM_SOURCE', 'auto').lower()
+STREAM_PRE_IMAGES = os.environ.get('STREAM_PRE_IMAGES', '').lower() in ('1', 'true', 'yes')
+stream_publisher = StreamPublisher(
+    buffer_size=int(os.environ.get('STREAM_CLIENT_BUFFER', '256')),
+    history=int(os.environ.get('STREAM_HISTORY', '1024')),
+    heartbeat=float(os.environ.get('STREAM_HEARTBEAT', '15')),
+)
+
+# gzip/brotli for responses of at least COMPRESSION_MIN_SIZE bytes. Cached
+# event pages keep their compressed forms, so hits are not recompressed.
+compression = Compression(
+    minimum_size=int(os.environ.get('COMPRESSION_MIN_SIZE', '1024')),
+    gzip_level=int(os.environ.get('GZIP_LEVEL', '6')),
+    brotli_quality=int(os.environ.get('BROTLI_QUALITY', '5')),
+)
+
+# Subscribed newsletter addresses, loaded at startup so repeat signups are
+# answered without a database round trip. New addresses of every form get a
+# background domain check (EMAIL_CHECK_WORKERS tasks, 0 turns it off) that
+# flags the stored record's email_status.
+newsletter_emails = KnownEmails()
+email_checker = DeliverabilityChecker(
+    workers=int(os.environ.get('EMAIL_CHECK_WORKERS', '4')),
+    timeout=float(os.environ.get('EMAIL_CHECK_TIMEOUT', '2')),
+)
+
+# Worker processes serving the app (set by `python -m backend`); each keeps its
+# own caches, rate limit buckets and stream subscribers.
+WORKERS = int(os.environ.get('WEB_CONCURRENCY', '1'))
+
+# Cache-Control sent with list responses. Events are public and can be held by
+# a CDN; the admin lists contain personal data and must always be revalidated.
+EVENTS_CACHE_CONTROL = os.environ.get('EVENTS_CACHE_CONTROL', 'public, max-age=60')
+ADMIN_CACHE_CONTROL = os.environ.get('ADMIN_CACHE_CONTROL', 'private, no-cache')
+
+# List endpoints build JSON straight from the projected documents. Set
+# VALIDATE_RESPONSES=1 to round-trip every row through its pydantic model.
+VALIDATE_RESPONSES = os.environ.get('VALIDATE_RESPONSES', '').lower() in ('1', 'true', 'yes')
+
+# Documents fetched per round trip (and per streamed chunk) by the export endpoints
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', '500'))
+
+# Optional write-behind mode for form submissions: acknowledge immediately and
+# insert in batches from a background task.
+WRITE_BEHIND = os.environ.get('WRITE_BEHIND', '').lower() in ('1', 'true', 'yes')
+write_behind_options = dict(
+    max_batch=int(os.environ.get('WRITE_BEHIND_BATCH', '100')),
+    flush_interval=float(os.environ.get('WRITE_BEHIND_INTERVAL', '0.5')),
+    max_queue=int(os.environ.get('WRITE_BEHIND_MAX_QUEUE', '10000')),
+)
+contact_writer = WriteBehindQueue("contact_messages", **write_behind_options)
+booking_writer = WriteBehindQueue("booking_inquiries", **write_behind_options)
+
+ExportFormat = Literal["ndjson", "csv"]
+EventOrder = Literal["asc", "desc"]
+
+# Bulk ingestion limits: items per request and upserts per bulk_write
+BULK_MAX_ITEMS = int(os.environ.get('BULK_MAX_ITEMS', '50000'))
+BULK_BATCH_SIZE = int(os.environ.get('BULK_BATCH_SIZE', '1000'))
+
+# Per-route limits for the public forms, as "count/seconds[:burst]" per client IP
+# and per email, plus a window in which identical submissions are absorbed.
+# Override with RATE_LIMIT_<ROUTE>_IP, RATE_LIMIT_<ROUTE>_EMAIL and
+# DEDUPE_WINDOW_<ROUTE>; RATE_LIMIT_ENABLED=0 turns all of it off.
+FORM_LIMITS = {
+    "newsletter": RouteLimits.from_env("newsletter", ip="10/60", email="3/3600", dedupe_window=10),
+    "contact": RouteLimits.from_env("contact", ip="5/60", email="3/600", dedupe_window=30),
+    "bookings": RouteLimits.from_env("bookings", ip="5/60", email="3/600", dedupe_window=30),
+}
+form_guard = FormGuard(
+    FORM_LIMITS if os.environ.get('RATE_LIMIT_ENABLED', '1').lower() not in ('0', 'false', 'no') else {},
+    trust_forwarded_for=os.environ.get('TRUST_FORWARDED_FOR', '').lower() in ('1', 'true', 'yes'),
+)
+
+# Requests slower than SLOW_REQUEST_MS are counted; SLOW_REQUEST_PROFILE=1 also
+# logs a sampled stack profile for each of them.
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', '0'))
+slow_request_profiler = (
+    SlowRequestProfiler(SLOW_REQUEST_MS)
+    if SLOW_REQUEST_MS and os.environ.get('SLOW_REQUEST_PROFILE', '').lower() in ('1', 'true', 'yes')
+    else None
+)
 
 # Create the main app without a prefix
 app = FastAPI()
@@ -31,9 +175,11 @@ class NewsletterSubscription(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     email: EmailStr
     subscribed_at: datetime = Field(default_factory=datetime.utcnow)
+    # Set by the background domain check; see emails.DeliverabilityChecker
+    email_status: Optional[str] = None
 
 class NewsletterSubscriptionCreate(BaseModel):
-    email: EmailStr
+    email: Email
 
 class ContactMessage(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -43,11 +189,12 @@ class ContactMessage(BaseModel):
     subject: str
     message: str
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    email_status: Optional[str] = None
 
 class ContactMessageCreate(BaseModel):
     firstName: str
     lastName: str
-    email: EmailStr
+    email: Email
     subject: str
     message: str
 
@@ -74,6 +221,10 @@ class EventCreate(BaseModel):
     description: Optional[str] = None
     ticketUrl: Optional[str] = None
 
+class EventImport(EventCreate):
+    # Existing events are matched on id; items without one are inserted
+    id: Optional[str] = None
+
 class BookingInquiry(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     name: str
@@ -87,10 +238,13 @@ class BookingInquiry(BaseModel):
     message: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     status: str = Field(default="pending")
+    # Bumped on every status change; see booking_status
+    version: int = 1
+    email_status: Optional[str] = None
 
 class BookingInquiryCreate(BaseModel):
     name: str
-    email: EmailStr
+    email: Email
     phone: Optional[str] = None
     eventType: str
     eventDate: Optional[str] = None
@@ -100,6 +254,128 @@ class BookingInquiryCreate(BaseModel):
     message: Optional[str] = None
 
 
+# Response layouts and projections for the list endpoints
+NEWSLETTER_LAYOUT = response_layout(NewsletterSubscription)
+NEWSLETTER_PROJECTION = projection_for(NEWSLETTER_LAYOUT)
+CONTACT_LAYOUT = response_layout(ContactMessage)
+CONTACT_PROJECTION = projection_for(CONTACT_LAYOUT)
+# `id` and `starts_at` are also needed to build the pagination cursor. `id`
+# is emitted too: deletes and stream deltas name events by it, while `_id`
+# holds the ObjectId for events that were seeded rather than created here.
+EVENT_LAYOUT = response_layout(Event) + [("id", None)]
+EVENT_PROJECTION = projection_for(EVENT_LAYOUT, "id", "starts_at")
+BOOKING_LAYOUT = response_layout(BookingInquiry)
+BOOKING_PROJECTION = projection_for(BOOKING_LAYOUT)
+
+def serialize_rows(rows: List[dict], model, layout) -> bytes:
+    if VALIDATE_RESPONSES:
+        # Keys the layout adds after the model's own fields are passed through
+        extra = [key for key, _ in layout[len(model.model_fields):]]
+        return render_json([
+            {**model(**row).model_dump(by_alias=True), **{key: row.get(key) for key in extra}} for row in rows
+        ])
+    return dump_rows(shape_rows(rows, layout))
+
+
+# Event pagination helpers
+def normalize_event_ids(events: List[dict]) -> None:
+    for event in events:
+        # Convert ObjectId to string if present
+        if "_id" in event:
+            event["_id"] = str(event["_id"])
+        if "id" not in event and "_id" in event:
+            event["id"] = event["_id"]
+
+def shape_event(document: dict) -> dict:
+    event = dict(document)
+    normalize_event_ids([event])
+    return shape_rows([event], EVENT_LAYOUT)[0]
+
+def shape_booking(document: dict) -> dict:
+    return shape_rows([document], BOOKING_LAYOUT)[0]
+
+def drop_stale_state(collection: str) -> None:
+    # Writes by any worker reach every worker's change feed
+    if collection == "events":
+        events_cache.invalidate()
+    elif collection == "booking_inquiries":
+        booking_stats.invalidate()
+
+change_feed = ChangeStreamFeed(stream_publisher, {
+    "events": ("events", shape_event),
+    "booking_inquiries": ("bookings", shape_booking),
+}, on_change=drop_stale_state, pre_images=STREAM_PRE_IMAGES)
+
+def notify(topic: str, delta: dict) -> None:
+    # With change streams active every write arrives through them instead
+    if not change_feed.active:
+        stream_publisher.publish(topic, delta)
+
+EVENTS_PAGE_SIZE = 100
+EVENTS_MAX_PAGE_SIZE = 1000
+
+def encode_event_cursor(event: dict) -> str:
+    """Encode the (starts_at, id) keyset position of an event as an opaque token."""
+    starts_at = event.get("starts_at")
+    raw = json.dumps([starts_at.isoformat() if starts_at else None, event.get("id")]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_event_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        last_start, last_id = json.loads(base64.urlsafe_b64decode(padded))
+        if last_start is not None:
+            last_start = datetime.fromisoformat(last_start)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return last_start, last_id
+
+def build_events_query(from_date: Optional[date], to_date: Optional[date],
+                       upcoming: Optional[bool], cursor: Optional[str], order: EventOrder = "asc") -> dict:
+    # Days are calendar days in EVENT_TIMEZONE, matched on the typed starts_at
+    date_range = {}
+    if from_date:
+        date_range["$gte"] = local_day_start(from_date)
+    if to_date:
+        date_range["$lt"] = local_day_start(to_date)
+    if upcoming is not None:
+        today = local_day_start(local_today())
+        bound = "$gte" if upcoming else "$lt"
+        if bound in date_range:
+            # Keep the tighter of the explicit and implicit bounds
+            pick = max if bound == "$gte" else min
+            date_range[bound] = pick(date_range[bound], today)
+        else:
+            date_range[bound] = today
+
+    clauses = []
+    if date_range:
+        clauses.append({"starts_at": date_range})
+    if cursor:
+        last_start, last_id = decode_event_cursor(cursor)
+        if order == "asc":
+            # Events without a start time sort first, so every dated event is after them
+            clauses.append({"$or": [
+                {"starts_at": {"$gt": last_start}} if last_start else {"starts_at": {"$ne": None}},
+                {"starts_at": last_start, "id": {"$gt": last_id}},
+            ]})
+        elif last_start:
+            # Descending, events without a start time come after every dated event
+            clauses.append({"$or": [
+                {"starts_at": {"$lt": last_start}},
+                {"starts_at": None},
+                {"starts_at": last_start, "id": {"$lt": last_id}},
+            ]})
+        else:
+            clauses.append({"starts_at": None, "id": {"$lt": last_id}})
+    if not clauses:
+        return {}
+    if len(clauses) == 1:
+        return clauses[0]
+    return {"$and": clauses}
+
+
+
 # Routes
 @api_router.get("/")
 async def root():
@@ -107,32 +383,106 @@ async def root():
 
 # Newsletter endpoints
 @api_router.post("/newsletter", response_model=NewsletterSubscription)
-async def subscribe_newsletter(input: NewsletterSubscriptionCreate):
-    # Check if email already exists
-    existing = await db.newsletter_subscriptions.find_one({"email": input.email})
-    if existing:
-        raise HTTPException(status_code=400, detail="Email already subscribed")
-    
-    subscription = NewsletterSubscription(**input.dict())
-    await db.newsletter_subscriptions.insert_one(subscription.dict())
+async def subscribe_newsletter(input: NewsletterSubscriptionCreate, request: Request):
+    async with form_guard.submission("newsletter", request, input.dict()) as submission:
+        if submission.duplicate is not None:
+            return submission.duplicate
+        if input.email in newsletter_emails:
+            raise HTTPException(status_code=400, detail="Email already subscribed")
+        subscription = NewsletterSubscription(**input.dict())
+        # The unique index on email still rejects duplicates the set has not
+        # seen yet (other workers, concurrent signups) atomically
+        try:
+            await db.newsletter_subscriptions.insert_one(subscription.dict())
+        except DuplicateKeyError:
+            newsletter_emails.add(input.email)
+            raise HTTPException(status_code=400, detail="Email already subscribed")
+        newsletter_emails.add(input.email)
+        email_checker.check(db.newsletter_subscriptions, subscription.id, subscription.email)
+        submission.result = subscription
     return subscription
 
+@api_router.post("/newsletter/bulk")
+async def bulk_subscribe_newsletter(request: Request):
+    """Subscribe many emails from a JSON array or NDJSON body.
+
+    Emails that are already subscribed are reported as ``matched`` and left
+    untouched; repeats within the same request are reported as ``duplicate``.
+    """
+    items = parse_bulk_body(await request.body(), request.headers.get("content-type"), BULK_MAX_ITEMS)
+    valid, rejected = validate_items(items, NewsletterSubscriptionCreate)
+    operations, seen = [], {}
+    for index, item in valid:
+        if item.email in seen:
+            rejected.append({"index": index, "key": item.email, "status": "duplicate"})
+            continue
+        subscription = NewsletterSubscription(email=item.email)
+        seen[item.email] = subscription.id
+        operations.append((index, item.email, UpdateOne(
+            {"email": item.email},
+            {"$setOnInsert": subscription.dict()},
+            upsert=True,
+        )))
+    outcomes, _ = await run_bulk(db.newsletter_subscriptions, operations, BULK_BATCH_SIZE)
+    for outcome in outcomes.values():
+        if outcome["status"] in ("created", "matched"):
+            newsletter_emails.add(outcome["key"])
+        if outcome["status"] == "created":
+            email_checker.check(db.newsletter_subscriptions, seen[outcome["key"]], outcome["key"])
+    return bulk_report(len(items), outcomes, rejected)
+
 @api_router.get("/newsletter", response_model=List[NewsletterSubscription])
-async def get_newsletter_subscriptions():
-    subscriptions = await db.newsletter_subscriptions.find().to_list(1000)
-    return [NewsletterSubscription(**sub) for sub in subscriptions]
+async def get_newsletter_subscriptions(request: Request):
+    subscriptions = await db.newsletter_subscriptions.find({}, NEWSLETTER_PROJECTION).to_list(1000)
+    body = serialize_rows(subscriptions, NewsletterSubscription, NEWSLETTER_LAYOUT)
+    return conditional_json_response(request, body, ADMIN_CACHE_CONTROL)
+
+@api_router.get("/newsletter/export")
+async def export_newsletter_subscriptions(fmt: ExportFormat = Query("ndjson", alias="format")):
+    cursor = db.newsletter_subscriptions.find({}, NEWSLETTER_PROJECTION, batch_size=EXPORT_BATCH_SIZE)
+    return export_response(cursor, NEWSLETTER_LAYOUT, fmt, "newsletter_subscriptions", EXPORT_BATCH_SIZE)
 
 # Contact form endpoints
 @api_router.post("/contact", response_model=ContactMessage)
-async def submit_contact(input: ContactMessageCreate):
-    message = ContactMessage(**input.dict())
-    await db.contact_messages.insert_one(message.dict())
+async def submit_contact(input: ContactMessageCreate, request: Request):
+    async with form_guard.submission("contact", request, input.dict()) as submission:
+        if submission.duplicate is not None:
+            return submission.duplicate
+        message = ContactMessage(**input.dict())
+        if WRITE_BEHIND:
+            await contact_writer.submit(message.dict())
+        else:
+            await db.contact_messages.insert_one(message.dict())
+        email_checker.check(db.contact_messages, message.id, message.email)
+        submission.result = message
     return message
 
 @api_router.get("/contact", response_model=List[ContactMessage])
-async def get_contact_messages():
-    messages = await db.contact_messages.find().sort("created_at", -1).to_list(100)
-    return [ContactMessage(**msg) for msg in messages]
+async def get_contact_messages(request: Request):
+    messages = await db.contact_messages.find({}, CONTACT_PROJECTION).sort("created_at", -1).to_list(100)
+    body = serialize_rows(messages, ContactMessage, CONTACT_LAYOUT)
+    return conditional_json_response(request, body, ADMIN_CACHE_CONTROL)
+
+@api_router.get("/contact/export")
+async def export_contact_messages(fmt: ExportFormat = Query("ndjson", alias="format")):
+    cursor = db.contact_messages.find({}, CONTACT_PROJECTION, batch_size=EXPORT_BATCH_SIZE).sort("created_at", -1)
+    return export_response(cursor, CONTACT_LAYOUT, fmt, "contact_messages", EXPORT_BATCH_SIZE)
+
+async def render_events_snapshot() -> bytes:
+    """Every event, rendered as GET /api/events lists them."""
+    events = await db.events.find({}, EVENT_PROJECTION).sort([("starts_at", 1), ("id", 1)]).to_list(None)
+    normalize_event_ids(events)
+    return serialize_rows(events, Event, EVENT_LAYOUT)
+
+snapshot_publisher = (
+    SnapshotPublisher(Path(SNAPSHOT_DIR), render_events_snapshot, float(os.environ.get('SNAPSHOT_DELAY', '2')))
+    if SNAPSHOT_DIR else None
+)
+
+def events_changed() -> None:
+    events_cache.invalidate()
+    if snapshot_publisher is not None:
+        snapshot_publisher.schedule()
 
 # Events endpoints
 @api_router.post("/events", response_model=Event)
@@ -140,50 +490,347 @@ async def create_event(input: EventCreate):
     event_dict = input.dict()
     event = Event(**event_dict)
     event_data = event.dict(by_alias=True)
+    # Store the id as a regular field too so it can take part in keyset pagination
+    event_data["id"] = event.id
+    event_data["starts_at"] = event_starts_at(event.date, event.time)
     await db.events.insert_one(event_data)
+    events_changed()
+    notify("events", {"op": "created", "id": event.id, "document": shape_event(event_data)})
     return event
 
+@api_router.post("/events/bulk")
+async def bulk_upsert_events(request: Request):
+    """Create or update many events from a JSON array or NDJSON body.
+
+    Items carrying an ``id`` replace the fields of the matching event (or
+    create it); items without one are inserted with a new id. Each item gets
+    a ``created``, ``matched``, ``duplicate``, ``invalid`` or ``error`` result.
+    """
+    items = parse_bulk_body(await request.body(), request.headers.get("content-type"), BULK_MAX_ITEMS)
+    valid, rejected = validate_items(items, EventImport)
+    operations, seen = [], set()
+    for index, item in valid:
+        event_id = item.id or str(uuid.uuid4())
+        if event_id in seen:
+            rejected.append({"index": index, "key": event_id, "status": "duplicate"})
+            continue
+        seen.add(event_id)
+        fields = item.dict(exclude={"id"})
+        fields["starts_at"] = event_starts_at(item.date, item.time)
+        operations.append((index, event_id, UpdateOne(
+            {"id": event_id},
+            {"$set": fields, "$setOnInsert": {"_id": event_id, "created_at": datetime.utcnow()}},
+            upsert=True,
+        )))
+    outcomes, changed = await run_bulk(db.events, operations, BULK_BATCH_SIZE)
+    if changed:
+        events_changed()
+        # One refetch hint rather than a delta per imported event
+        notify("events", {"op": "reset"})
+    return bulk_report(len(items), outcomes, rejected)
+
+async def load_events_page(query: dict, limit: int, order: EventOrder = "asc"):
+    direction = 1 if order == "asc" else -1
+    # Fetch one extra document to find out whether another page exists
+    events = await db.events.find(query, EVENT_PROJECTION).sort(
+        [("starts_at", direction), ("id", direction)]
+    ).to_list(limit + 1)
+    next_cursor = None
+    if len(events) > limit:
+        events = events[:limit]
+        next_cursor = encode_event_cursor(events[-1])
+    normalize_event_ids(events)
+    body = serialize_rows(events, Event, EVENT_LAYOUT)
+    # Compressed forms are made on first request and kept with the cache entry
+    return CompressedVariants(body, compression), next_cursor, compute_etag(body)
+
 @api_router.get("/events", response_model=List[Event])
-async def get_events():
-    events = await db.events.find().sort("date", 1).to_list(1000)
-    result = []
-    for event in events:
-        # Convert ObjectId to string if present
-        if "_id" in event:
-            event["_id"] = str(event["_id"])
-        if "id" not in event and "_id" in event:
-            event["id"] = event["_id"]
-        result.append(Event(**event))
-    return result
+async def get_events(
+    request: Request,
+    limit: int = Query(EVENTS_PAGE_SIZE, ge=1, le=EVENTS_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    upcoming: Optional[bool] = None,
+    order: EventOrder = "asc",
+):
+    """List events ordered by start time, then id.
+
+    ``order=desc`` lists the latest events first, which is how past shows
+    are read. ``from`` is inclusive and ``to`` is exclusive. When more events match than
+    fit in ``limit``, the ``X-Next-Cursor`` header carries the cursor for the
+    next page. Responses are served from ``events_cache`` when possible,
+    precompressed for clients that accept it, and carry an ETag so repeat
+    readers can revalidate with If-None-Match.
+    """
+    query = build_events_query(from_date, to_date, upcoming, cursor, order)
+    # The query embeds today's date when `upcoming` is set, so it is a safe key
+    cache_key = (json.dumps(query, sort_keys=True, default=str), limit, order)
+    (variants, next_cursor, etag), hit = await events_cache.get_or_load(
+        cache_key, lambda: load_events_page(query, limit, order)
+    )
+    headers = {"X-Cache": "HIT" if hit else "MISS"}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return conditional_json_response(
+        request, variants.body, EVENTS_CACHE_CONTROL, etag=etag, headers=headers, variants=variants
+    )
 
 @api_router.delete("/events/{event_id}")
 async def delete_event(event_id: str):
     result = await db.events.delete_one({"id": event_id})
+    events_changed()
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Event not found")
+    notify("events", {"op": "deleted", "id": event_id})
     return {"message": "Event deleted successfully"}
 
 # Booking inquiry endpoints
 @api_router.post("/bookings", response_model=BookingInquiry)
-async def submit_booking(input: BookingInquiryCreate):
-    booking = BookingInquiry(**input.dict())
-    await db.booking_inquiries.insert_one(booking.dict())
+async def submit_booking(input: BookingInquiryCreate, request: Request):
+    async with form_guard.submission("bookings", request, input.dict()) as submission:
+        if submission.duplicate is not None:
+            return submission.duplicate
+        booking = BookingInquiry(**input.dict())
+        if WRITE_BEHIND:
+            await booking_writer.submit(booking.dict())
+        else:
+            await db.booking_inquiries.insert_one(booking.dict())
+        booking_stats.record_insert(booking.dict())
+        email_checker.check(db.booking_inquiries, booking.id, booking.email)
+        notify("bookings", {"op": "created", "id": booking.id, "document": shape_booking(booking.dict())})
+        submission.result = booking
     return booking
 
 @api_router.get("/bookings", response_model=List[BookingInquiry])
-async def get_bookings():
-    bookings = await db.booking_inquiries.find().sort("created_at", -1).to_list(100)
-    return [BookingInquiry(**booking) for booking in bookings]
+async def get_bookings(request: Request):
+    bookings = await db.booking_inquiries.find({}, BOOKING_PROJECTION).sort("created_at", -1).to_list(100)
+    body = serialize_rows(bookings, BookingInquiry, BOOKING_LAYOUT)
+    return conditional_json_response(request, body, ADMIN_CACHE_CONTROL)
+
+@api_router.get("/bookings/export")
+async def export_bookings(fmt: ExportFormat = Query("ndjson", alias="format")):
+    cursor = db.booking_inquiries.find({}, BOOKING_PROJECTION, batch_size=EXPORT_BATCH_SIZE).sort("created_at", -1)
+    return export_response(cursor, BOOKING_LAYOUT, fmt, "booking_inquiries", EXPORT_BATCH_SIZE)
+
+@api_router.get("/bookings/stats")
+async def get_booking_stats(request: Request):
+    """Counts by status, event type, event month, configuration and guest count."""
+    stats = await booking_stats.get(db.booking_inquiries)
+    return conditional_json_response(request, render_json(stats), ADMIN_CACHE_CONTROL)
+
+async def apply_status_changes(changes: List[tuple]) -> dict:
+    """Apply ``(index, BookingStatusChange)`` pairs; return an outcome per index."""
+    changed_at = datetime.utcnow()
+    ids = [change.id for _, change in changes]
+    current = {
+        booking["id"]: booking
+        async for booking in db.booking_inquiries.find({"id": {"$in": ids}}, STATUS_PROJECTION)
+    }
+    outcomes, planned = {}, []
+    for index, change in changes:
+        outcome, operation = plan_change(current.get(change.id), change.status, change.version, changed_at)
+        if outcome is not None:
+            outcomes[index] = {"index": index, "key": change.id, **outcome}
+        else:
+            planned.append((index, change, operation, current_version(current[change.id]) + 1))
+
+    for start in range(0, len(planned), BULK_BATCH_SIZE):
+        batch = planned[start:start + BULK_BATCH_SIZE]
+        failed = {}
+        try:
+            result = await db.booking_inquiries.bulk_write([op for _, _, op, _ in batch], ordered=False)
+            matched = result.matched_count
+        except BulkWriteError as exc:
+            failed = {error["index"]: error.get("errmsg", "write failed") for error in exc.details.get("writeErrors", [])}
+            matched = exc.details.get("nMatched", 0)
+        applied = {position for position in range(len(batch)) if position not in failed}
+        if matched < len(applied):
+            # Some bookings changed between the read and the write; the ones
+            # at the planned status and version are ours
+            after = {
+                booking["id"]: booking
+                async for booking in db.booking_inquiries.find(
+                    {"id": {"$in": [batch[position][1].id for position in applied]}}, STATUS_PROJECTION
+                )
+            }
+            for position in list(applied):
+                _, change, _, version = batch[position]
+                booking = after.get(change.id) or {}
+                if booking.get("status") != change.status or booking.get("version") != version:
+                    applied.discard(position)
+        for position, (index, change, _, version) in enumerate(batch):
+            if position in failed:
+                outcomes[index] = {"index": index, "key": change.id, "status": "error", "errors": [failed[position]]}
+            elif position in applied:
+                before = current[change.id]
+                booking_stats.record_status_change(
+                    before, {**before, "status": change.status, "status_changed_at": changed_at}
+                )
+                notify("bookings", {
+                    "op": "updated", "id": change.id, "changes": {"status": change.status, "version": version},
+                })
+                outcomes[index] = {"index": index, "key": change.id, "status": "updated", "version": version}
+            else:
+                outcomes[index] = {"index": index, "key": change.id, "status": "conflict",
+                                   "errors": ["booking changed while this update was applied"]}
+    return outcomes
+
+@api_router.patch("/bookings/status")
+async def update_booking_statuses(request: Request):
+    """Apply many status changes from a JSON array or NDJSON body.
+
+    Each item is ``{"id", "status", "version"}``; ``version`` is optional and,
+    when given, must match the booking's current version. Every item gets an
+    ``updated``, ``unchanged``, ``not_found``, ``conflict``,
+    ``invalid_transition``, ``invalid``, ``duplicate`` or ``error`` result.
+    """
+    items = parse_bulk_body(await request.body(), request.headers.get("content-type"), BULK_MAX_ITEMS)
+    valid, rejected = validate_items(items, BookingStatusChange)
+    changes, seen = [], set()
+    for index, change in valid:
+        if change.id in seen:
+            rejected.append({"index": index, "key": change.id, "status": "duplicate"})
+            continue
+        seen.add(change.id)
+        changes.append((index, change))
+    outcomes = await apply_status_changes(changes) if changes else {}
+    return bulk_report(len(items), outcomes, rejected)
 
 @api_router.patch("/bookings/{booking_id}/status")
-async def update_booking_status(booking_id: str, status: str):
-    result = await db.booking_inquiries.update_one(
-        {"id": booking_id},
-        {"$set": {"status": status}}
-    )
-    if result.modified_count == 0:
+async def update_booking_status(booking_id: str, status: BookingStatus, version: Optional[int] = None):
+    """Move one booking to ``status``; pass ``version`` to guard against concurrent edits."""
+    outcome = (await apply_status_changes([(0, BookingStatusChange(id=booking_id, status=status, version=version))]))[0]
+    if outcome["status"] == "not_found":
         raise HTTPException(status_code=404, detail="Booking not found")
-    return {"message": "Booking status updated successfully"}
+    if outcome["status"] == "error":
+        raise HTTPException(status_code=500, detail=outcome["errors"][0])
+    if outcome["status"] in ("conflict", "invalid_transition"):
+        raise HTTPException(status_code=409, detail=outcome["errors"][0])
+    return {"message": "Booking status updated successfully", "status": status, "version": outcome["version"]}
+
+# Collections searched by GET /api/search, each through its `text_search` index
+SEARCH_SOURCES = {
+    "events": ("events", EVENT_PROJECTION, EVENT_LAYOUT),
+    "contact": ("contact_messages", CONTACT_PROJECTION, CONTACT_LAYOUT),
+    "bookings": ("booking_inquiries", BOOKING_PROJECTION, BOOKING_LAYOUT),
+}
+SearchType = Literal["events", "contact", "bookings"]
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+# Deep pages cost offset + limit rows from every collection
+SEARCH_MAX_OFFSET = int(os.environ.get('SEARCH_MAX_OFFSET', '1000'))
+
+async def search_collection(source: str, q: str, count: int) -> List[tuple]:
+    collection, projection, layout = SEARCH_SOURCES[source]
+    rows = await db[collection].find(
+        {"$text": {"$search": q}}, {**projection, "_score": {"$meta": "textScore"}}
+    ).sort([("_score", {"$meta": "textScore"})]).to_list(count)
+    if source == "events":
+        normalize_event_ids(rows)
+    scores = [row.pop("_score") for row in rows]
+    return [(score, source, document) for score, document in zip(scores, shape_rows(rows, layout))]
+
+@api_router.get("/search")
+async def search(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    type: Optional[List[SearchType]] = Query(None),
+    limit: int = Query(SEARCH_PAGE_SIZE, ge=1, le=SEARCH_MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0, le=SEARCH_MAX_OFFSET),
+):
+    """Full-text search over events, contact messages and booking inquiries.
+
+    Words match in any order (prefix ``-`` to exclude one, quote a phrase to
+    require it) and results from all collections are ranked together by text
+    score. ``type`` restricts the search to some collections; ``next_offset``
+    is null on the last page.
+    """
+    sources = list(dict.fromkeys(type or SEARCH_SOURCES))
+    # Any row on the requested page ranks within the first offset + limit of its collection
+    window = offset + limit
+    found = await asyncio.gather(*(search_collection(source, q, window + 1) for source in sources))
+    ranked = sorted((hit for hits in found for hit in hits), key=lambda hit: -hit[0])
+    page = ranked[offset:window]
+    body = {
+        "query": q,
+        "results": [
+            {"type": source, "score": round(score, 4), "document": document}
+            for score, source, document in page
+        ],
+        "next_offset": window if len(ranked) > window and window <= SEARCH_MAX_OFFSET else None,
+    }
+    return conditional_json_response(request, dump_json(body), ADMIN_CACHE_CONTROL)
+
+StreamTopic = Literal["events", "bookings"]
+
+@api_router.get("/stream")
+async def stream(request: Request, topic: Optional[List[StreamTopic]] = Query(None)):
+    """Server-Sent Events carrying a delta per write to events and/or bookings.
+
+    Each message is named after its topic and holds ``{"op": "created" |
+    "updated" | "deleted" | "reset", "id", "document" | "changes"}``. A
+    ``reset`` (as an op, or as its own event) means deltas were missed and
+    the list should be fetched again. Reconnecting clients resume from
+    Last-Event-ID.
+    """
+    return stream_publisher.response(topic or ["events", "bookings"], request.headers.get("last-event-id"))
+
+@api_router.get("/health/live")
+async def liveness():
+    return {"status": "ok"}
+
+@api_router.get("/health/ready")
+async def readiness():
+    """Report whether the database answers a ping within DB_PING_TIMEOUT."""
+    backend = storage_backend()
+    if db is None:
+        return JSONResponse(status_code=503, content={
+            "status": "starting", "database": {"backend": backend, "connected": False},
+        })
+    try:
+        latency = await ping(db, DB_PING_TIMEOUT)
+    except (PyMongoError, asyncio.TimeoutError) as exc:
+        return JSONResponse(status_code=503, content={
+            "status": "unavailable",
+            "database": {"backend": backend, "connected": False, "error": str(exc) or type(exc).__name__},
+        })
+    return {
+        "status": "ready",
+        "database": {"backend": backend, "connected": True, "ping_ms": round(latency, 2)},
+    }
+
+@api_router.get("/cache/stats")
+async def get_cache_stats():
+    return {
+        "caches": [events_cache.stats()],
+        "write_behind": [contact_writer.stats(), booking_writer.stats()] if WRITE_BEHIND else [],
+        "snapshot": snapshot_publisher.stats() if snapshot_publisher is not None else None,
+        "stream": {**stream_publisher.stats(), "source": "change_streams" if change_feed.active else "handlers"},
+        "emails": {**email_checker.stats(), "known_newsletter": len(newsletter_emails)},
+    }
+
+
+registry.register(Gauge(
+    "response_cache_entries", "Entries held by each response cache.", ("cache",),
+    lambda: [((events_cache.name,), len(events_cache))],
+))
+registry.register(Gauge(
+    "response_cache_lookups", "Response cache lookups by result since startup.", ("cache", "result"),
+    lambda: [((events_cache.name, "hit"), events_cache.hits), ((events_cache.name, "miss"), events_cache.misses)],
+))
+registry.register(Gauge(
+    "stream_subscribers", "Open /api/stream connections.", (),
+    lambda: [((), stream_publisher.stats()["subscribers"])],
+))
+registry.register(Gauge(
+    "write_behind_queued", "Submissions waiting in each write-behind queue.", ("collection",),
+    lambda: [((writer.name,), writer.stats()["queued"]) for writer in (contact_writer, booking_writer)],
+))
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
 
 
 # Include the router in the main app
@@ -195,8 +842,14 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Cache", "ETag", "Retry-After"],
 )
 
+app.add_middleware(CompressionMiddleware, compression=compression)
+
+# Added last so it wraps everything, including CORS preflights
+app.add_middleware(MetricsMiddleware, profiler=slow_request_profiler, slow_threshold_ms=SLOW_REQUEST_MS)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -204,6 +857,96 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def connect_db_client():
+    global client, db
+    if db is None:
+        client, db = open_database()
+    db = instrument_database(db)
+    if slow_request_profiler is not None:
+        slow_request_profiler.start()
+    try:
+        elapsed = await warm_up(db, DB_WARM_CONNECTIONS, DB_PING_TIMEOUT)
+        logger.info("Database ready, warmed %d connections in %.2f ms", DB_WARM_CONNECTIONS, elapsed)
+    except (PyMongoError, asyncio.TimeoutError) as exc:
+        # Keep starting up; /api/health/ready reports 503 until the database answers
+        logger.warning("Database not reachable at startup: %s", exc)
+
+# Startup steps that need the database get DB_PING_TIMEOUT each, so an
+# unreachable server cannot hold up startup; failed steps are retried in
+# the background with backoff until they succeed.
+startup_retries: list = []
+
+async def run_startup_step(name: str, step) -> bool:
+    try:
+        await asyncio.wait_for(step(), DB_PING_TIMEOUT)
+        return True
+    except (PyMongoError, asyncio.TimeoutError) as exc:
+        logger.warning("%s failed at startup (%s); retrying in the background", name, str(exc) or "timed out")
+        startup_retries.append(asyncio.create_task(retry_startup_step(name, step)))
+        return False
+
+async def retry_startup_step(name: str, step, delay: float = 2.0, max_delay: float = 60.0) -> None:
+    while True:
+        await asyncio.sleep(delay)
+        try:
+            await asyncio.wait_for(step(), DB_PING_TIMEOUT)
+        except (PyMongoError, asyncio.TimeoutError):
+            delay = min(delay * 2, max_delay)
+            continue
+        logger.info("%s succeeded on retry", name)
+        return
+
+async def build_indexes():
+    app.state.index_build_ms = await ensure_indexes(db)
+
+async def load_known_emails():
+    started = time.perf_counter()
+    count = await newsletter_emails.load(db.newsletter_subscriptions)
+    logger.info("Loaded %d newsletter addresses in %.1f ms", count, (time.perf_counter() - started) * 1000)
+
+@app.on_event("startup")
+async def create_db_indexes():
+    await run_startup_step("Index bootstrap", build_indexes)
+
+@app.on_event("startup")
+async def load_newsletter_emails():
+    # Until this succeeds, repeat signups are only caught by the unique index
+    await run_startup_step("Loading newsletter addresses", load_known_emails)
+    email_checker.start()
+
+@app.on_event("startup")
+async def start_write_behind():
+    if WRITE_BEHIND:
+        contact_writer.start(db.contact_messages)
+        booking_writer.start(db.booking_inquiries)
+
+@app.on_event("startup")
+async def start_change_feed():
+    if STREAM_SOURCE != "handlers":
+        await change_feed.start(db, DB_PING_TIMEOUT)
+    if WORKERS > 1 and not change_feed.active:
+        logger.warning(
+            "%d workers without change streams: caches are per worker, so other workers "
+            "see a write once their entries expire", WORKERS,
+        )
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    # End open event streams and stop following the database first
+    stream_publisher.close()
+    await change_feed.stop()
+    for task in startup_retries:
+        task.cancel()
+    await asyncio.gather(*startup_retries, return_exceptions=True)
+    startup_retries.clear()
+    await email_checker.stop()
+    # Flush queued submissions before the connection goes away
+    await contact_writer.drain()
+    await booking_writer.drain()
+    if snapshot_publisher is not None:
+        await snapshot_publisher.drain()
+    if slow_request_profiler is not None:
+        slow_request_profiler.stop()
+    if client is not None:
+        client.close()
\ No newline at end of file
@@ -0,0 +1,175 @@
+"""Static snapshot of the events list for the frontend-only deployment.
+
+The Netlify site has no backend, so the Gigs page reads its events from
+static files instead:
+
+    snapshot/manifest.json            {"events": "/snapshot/v/events.<hash>.json", ...}
+    snapshot/v/events.<hash>.json     same body as GET /api/events
+
+Versioned files never change, so they can be cached for a year; only the small
+manifest needs revalidating, and it is only rewritten when the version changes.
+No precompressed copies are written: Netlify compresses JSON itself and has no
+way to pick a .gz or .br file by Accept-Encoding. By default files go to
+frontend/public/snapshot, which the React build copies into the published site.
+
+    python snapshot.py                       # render from the database
+    python snapshot.py --fixtures fixtures/events.json
+
+With SNAPSHOT_DIR set, the API republishes after every event write (see
+``SnapshotPublisher``).
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+ROOT_DIR = Path(__file__).parent
+DEFAULT_SNAPSHOT_DIR = ROOT_DIR.parent / 'frontend' / 'public' / 'snapshot'
+# URL path the snapshot directory is published under
+SNAPSHOT_URL = os.environ.get('SNAPSHOT_URL', '/snapshot')
+
+logger = logging.getLogger(__name__)
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(path.name + '.tmp')
+    temporary.write_bytes(data)
+    os.replace(temporary, path)
+
+
+def publish(body: bytes, out_dir: Path, name: str = "events", keep: int = 3) -> dict:
+    """Write ``body`` as a versioned file, then point the manifest at it.
+
+    Versions older than the newest ``keep`` are removed; keeping a few lets
+    visitors holding a slightly stale manifest still load the file it names.
+    """
+    version = hashlib.blake2b(body, digest_size=8).hexdigest()
+    filename = f"{name}.{version}.json"
+    versions_dir = out_dir / 'v'
+    target = versions_dir / filename
+    if target.exists():
+        # Republishing an earlier version makes it the newest again
+        os.utime(target)
+    else:
+        write_atomic(target, body)
+
+    manifest_path = out_dir / 'manifest.json'
+    manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+    url = f"{SNAPSHOT_URL}/v/{filename}"
+    # An unchanged manifest is left alone, so a rerun with the same events
+    # does not show up as a deploy diff just for generated_at
+    if manifest.get(name) != url:
+        manifest[name] = url
+        manifest[f"{name}_count"] = len(json.loads(body))
+        manifest["generated_at"] = datetime.utcnow().isoformat() + "Z"
+        write_atomic(manifest_path, (json.dumps(manifest, indent=2, sort_keys=True) + "\n").encode())
+
+    versions = sorted(versions_dir.glob(f"{name}.*.json"), key=lambda path: path.stat().st_mtime, reverse=True)
+    for stale in [path for path in versions if path != target][max(keep - 1, 0):]:
+        # .gz/.br copies are left over from snapshots that still wrote them
+        for path in (stale, stale.with_name(stale.name + '.gz'), stale.with_name(stale.name + '.br')):
+            path.unlink(missing_ok=True)
+    return {"file": str(target), "version": version, "bytes": len(body)}
+
+
+class SnapshotPublisher:
+    """Republish the snapshot shortly after event writes.
+
+    ``schedule`` is cheap and coalesces: a burst of writes (a bulk import,
+    an admin editing several events) produces one render ``delay`` seconds
+    after the first of them, plus one more if writes arrive while rendering.
+    """
+
+    def __init__(self, out_dir: Path, render: Callable[[], Awaitable[bytes]], delay: float = 2.0):
+        self.out_dir = out_dir
+        self.render = render
+        self.delay = delay
+        self.published = 0
+        self.failures = 0
+        self._dirty = False
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def schedule(self) -> None:
+        self._dirty = True
+        if self._task is None or self._task.done():
+            self._wake.clear()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        try:
+            await asyncio.wait_for(self._wake.wait(), self.delay)
+        except asyncio.TimeoutError:
+            pass
+        while self._dirty:
+            self._dirty = False
+            await self._publish()
+
+    async def _publish(self) -> None:
+        try:
+            started = time.perf_counter()
+            body = await self.render()
+            result = await asyncio.to_thread(publish, body, self.out_dir)
+            self.published += 1
+            logger.info("Published events snapshot %s (%d bytes) in %.1f ms",
+                        result["version"], result["bytes"], (time.perf_counter() - started) * 1000)
+        except Exception:
+            self.failures += 1
+            logger.exception("Could not publish the events snapshot")
+
+    async def drain(self) -> None:
+        """Publish pending changes now rather than after the delay."""
+        if self._task is not None and not self._task.done():
+            self._wake.set()
+            await self._task
+
+    def stats(self) -> dict:
+        return {
+            "pending": self._dirty,
+            "published": self.published,
+            "failures": self.failures,
+        }
+
+
+async def main(args) -> dict:
+    import sys
+
+    sys.path.insert(0, str(ROOT_DIR))
+    if args.fixtures:
+        os.environ['STORAGE_BACKEND'] = 'memory'
+    import server
+    from storage import open_database
+
+    client, server.db = open_database()
+    try:
+        if args.fixtures:
+            from seed_data import diff_events, load_fixtures
+
+            operations, _ = diff_events(load_fixtures(args.fixtures), {}, prune=False)
+            await server.db.events.bulk_write(operations)
+            # Fixtures have no creation time; leaving it null means the
+            # snapshot version only changes when the fixtures do
+            await server.db.events.update_many({}, {"$unset": {"created_at": ""}})
+        body = await server.render_events_snapshot()
+        result = publish(body, args.out, keep=args.keep)
+        print(f"Wrote {result['file']} ({result['bytes']} bytes, "
+              f"{len(json.loads(body))} events) and {args.out / 'manifest.json'}")
+        return result
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Publish the static events snapshot")
+    parser.add_argument("--out", type=Path, default=Path(os.environ.get('SNAPSHOT_DIR') or DEFAULT_SNAPSHOT_DIR),
+                        help="snapshot directory (default: SNAPSHOT_DIR or frontend/public/snapshot)")
+    parser.add_argument("--fixtures", type=Path, help="render from a fixtures file instead of the database")
+    parser.add_argument("--keep", type=int, default=3, help="versions to keep in the snapshot directory")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,72 @@
+import asyncio
+import os
+import time
+
+STORAGE_BACKENDS = ("mongo", "memory")
+
+# Environment variables mapped onto AsyncIOMotorClient keyword arguments
+MONGO_CLIENT_OPTIONS = {
+    'MONGO_MAX_POOL_SIZE': ('maxPoolSize', int),
+    'MONGO_MIN_POOL_SIZE': ('minPoolSize', int),
+    'MONGO_MAX_IDLE_TIME_MS': ('maxIdleTimeMS', int),
+    'MONGO_CONNECT_TIMEOUT_MS': ('connectTimeoutMS', int),
+    'MONGO_SOCKET_TIMEOUT_MS': ('socketTimeoutMS', int),
+    'MONGO_SERVER_SELECTION_TIMEOUT_MS': ('serverSelectionTimeoutMS', int),
+    'MONGO_WAIT_QUEUE_TIMEOUT_MS': ('waitQueueTimeoutMS', int),
+    'MONGO_APP_NAME': ('appname', str),
+}
+
+
+def mongo_client_options() -> dict:
+    """Client options set in the environment; unset ones keep the driver default."""
+    options = {}
+    for variable, (option, cast) in MONGO_CLIENT_OPTIONS.items():
+        value = os.environ.get(variable)
+        if value:
+            options[option] = cast(value)
+    return options
+
+
+def storage_backend() -> str:
+    return os.environ.get('STORAGE_BACKEND', 'mongo').lower()
+
+
+def open_database(backend: str = None):
+    """Return ``(client, db)`` for the configured storage backend.
+
+    ``mongo`` (the default) connects with Motor using ``MONGO_URL`` and the
+    pool settings from ``mongo_client_options``; ``memory`` keeps everything
+    in-process (see ``memory_db``), which needs no database server and is
+    meant for tests and benchmarks. Neither touches the network until the
+    first operation.
+    """
+    backend = (backend or storage_backend()).lower()
+    if backend == "mongo":
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        client = AsyncIOMotorClient(os.environ['MONGO_URL'], **mongo_client_options())
+        return client, client[os.environ['DB_NAME']]
+    if backend == "memory":
+        from memory_db import MemoryClient
+
+        client = MemoryClient()
+        return client, client[os.environ.get('DB_NAME', 'eastern_empire')]
+    raise ValueError(f"Unknown STORAGE_BACKEND {backend!r}; expected one of {', '.join(STORAGE_BACKENDS)}")
+
+
+async def ping(db, timeout: float) -> float:
+    """Round-trip a ``ping`` command and return its latency in milliseconds."""
+    started = time.perf_counter()
+    await asyncio.wait_for(db.command("ping"), timeout)
+    return (time.perf_counter() - started) * 1000
+
+
+async def warm_up(db, connections: int, timeout: float) -> float:
+    """Open up to ``connections`` pooled sockets with concurrent pings.
+
+    Returns the elapsed time in milliseconds, so the first requests after a
+    cold start do not pay for the TCP/TLS handshakes.
+    """
+    started = time.perf_counter()
+    await asyncio.gather(*(ping(db, timeout) for _ in range(max(connections, 1))))
+    return (time.perf_counter() - started) * 1000
@@ -0,0 +1,323 @@
+"""Live deltas for events and bookings over Server-Sent Events.
+
+One ``StreamPublisher`` per process renders each delta once and fans it out
+to every subscriber of its topic. Publishing never waits on a client: each
+subscriber has a bounded buffer, and one that falls ``buffer_size`` messages
+behind is sent a ``reset`` (refetch the list) and disconnected instead of
+holding memory for it. Recent messages are kept so a reconnecting
+EventSource can resume from its Last-Event-ID.
+
+Deltas come from the write handlers by default. ``ChangeStreamFeed`` takes
+over when MongoDB change streams are available (replica sets), which also
+delivers writes made by other workers and other tools.
+"""
+import asyncio
+import logging
+import os
+from collections import deque
+from typing import Callable, Dict, Iterable, Optional
+
+from fastapi.responses import StreamingResponse
+from pymongo.errors import OperationFailure, PyMongoError
+
+from metrics import Counter, registry
+from responses import dump_json
+
+logger = logging.getLogger(__name__)
+
+STREAM_MESSAGES = registry.register(Counter(
+    "stream_messages_total", "Deltas published to live stream subscribers.", ("topic",),
+))
+STREAM_OVERFLOWS = registry.register(Counter(
+    "stream_overflows_total", "Subscribers disconnected for falling behind their buffer.", (),
+))
+
+
+class Subscription:
+    def __init__(self, topics: frozenset, buffer_size: int):
+        self.topics = topics
+        self.buffer_size = buffer_size
+        self.queue: deque = deque()
+        self.overflowed = False
+        self.closed = False
+        self._ready = asyncio.Event()
+
+    def push(self, message: bytes) -> None:
+        if len(self.queue) >= self.buffer_size:
+            self.overflowed = True
+        else:
+            self.queue.append(message)
+        self._ready.set()
+
+    def close(self) -> None:
+        self.closed = True
+        self._ready.set()
+
+    async def next(self, timeout: float) -> Optional[bytes]:
+        """Next message; None once the subscription is over. Raises TimeoutError when idle."""
+        while not self.queue:
+            if self.overflowed or self.closed:
+                return None
+            self._ready.clear()
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        if self.overflowed:
+            # Whatever is still queued is incomplete; the reset makes the client refetch
+            return None
+        return self.queue.popleft()
+
+
+class StreamPublisher:
+    def __init__(self, buffer_size: int = 256, history: int = 1024, heartbeat: float = 15.0):
+        self.buffer_size = buffer_size
+        self.heartbeat = heartbeat
+        # Event ids carry a per-process epoch, so ids from another process or an
+        # earlier run are recognised and answered with a reset
+        self.epoch = os.urandom(4).hex()
+        self.sequence = 0
+        self._history: deque = deque(maxlen=history)
+        self._subscribers: set = set()
+
+    def publish(self, topic: str, delta: dict) -> None:
+        self.sequence += 1
+        message = self._format(f"{self.epoch}-{self.sequence}", topic, dump_json(delta))
+        self._history.append((self.sequence, topic, message))
+        STREAM_MESSAGES.inc(topic)
+        for subscription in self._subscribers:
+            if topic in subscription.topics:
+                subscription.push(message)
+
+    @staticmethod
+    def _format(event_id: Optional[str], topic: str, data: bytes) -> bytes:
+        head = f"id: {event_id}\n" if event_id else ""
+        return f"{head}event: {topic}\n".encode() + b"data: " + data + b"\n\n"
+
+    def _reset(self, topics: Iterable[str]) -> bytes:
+        event_id = f"{self.epoch}-{self.sequence}"
+        return self._format(event_id, "reset", dump_json({"topics": sorted(topics)}))
+
+    def _replay(self, topics: frozenset, last_event_id: Optional[str]) -> list:
+        if not last_event_id:
+            return []
+        epoch, _, sequence = last_event_id.partition("-")
+        try:
+            sequence = int(sequence)
+        except ValueError:
+            return [self._reset(topics)]
+        oldest = self._history[0][0] if self._history else self.sequence + 1
+        if epoch != self.epoch or sequence > self.sequence or sequence < oldest - 1:
+            return [self._reset(topics)]
+        return [message for number, topic, message in self._history if number > sequence and topic in topics]
+
+    def subscribe(self, topics: Iterable[str], last_event_id: Optional[str] = None) -> Subscription:
+        subscription = Subscription(frozenset(topics), self.buffer_size)
+        for message in self._replay(subscription.topics, last_event_id):
+            subscription.push(message)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+
+    async def messages(self, subscription: Subscription):
+        """SSE body for one subscriber, with keep-alive comments while idle."""
+        try:
+            yield b"retry: 3000\n\n"
+            while True:
+                try:
+                    message = await subscription.next(self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+                if message is None:
+                    if subscription.overflowed:
+                        STREAM_OVERFLOWS.inc()
+                        yield self._reset(subscription.topics)
+                    return
+                yield message
+        finally:
+            self.unsubscribe(subscription)
+
+    def response(self, topics: Iterable[str], last_event_id: Optional[str] = None) -> StreamingResponse:
+        subscription = self.subscribe(topics, last_event_id)
+        return StreamingResponse(
+            self.messages(subscription),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    def close(self) -> None:
+        """End every open stream, e.g. before shutting down."""
+        for subscription in list(self._subscribers):
+            subscription.close()
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.sequence,
+            "buffered": sum(len(subscription.queue) for subscription in self._subscribers),
+        }
+
+
+# ChangeStreamFatalError, ChangeStreamHistoryLost: the resume token is no longer usable
+CHANGE_STREAM_HISTORY_LOST = (280, 286)
+
+
+class ChangeStreamFeed:
+    """Publish deltas from MongoDB change streams instead of the write handlers.
+
+    ``sources`` maps a collection name to ``(topic, shape)``, where ``shape``
+    turns a stored document into its API representation. ``on_change`` is
+    called with the collection name for every change, whichever process
+    made it, which lets each worker drop state the write made stale.
+
+    A delete event only carries the ObjectId, not the public ``id`` clients
+    key on. With ``pre_images`` (MongoDB 6.0+, with
+    ``changeStreamPreAndPostImages`` enabled on the collections) the deleted
+    document's ``id`` is read from its pre-image; without one the delete is
+    published as a ``reset``.
+    """
+
+    def __init__(self, publisher: StreamPublisher, sources: Dict[str, tuple], retry_delay: float = 2.0,
+                 on_change: Optional[Callable[[str], None]] = None, pre_images: bool = False):
+        self.publisher = publisher
+        self.sources = sources
+        self.retry_delay = retry_delay
+        self.on_change = on_change
+        self.pre_images = pre_images
+        self.active = False
+        self._tasks: list = []
+
+    async def start(self, db, timeout: Optional[float] = None) -> bool:
+        """Open the change streams; False while the write handlers keep publishing.
+
+        A deployment without change streams stays in handler mode. When the
+        database cannot be reached (within ``timeout`` seconds per probe),
+        the probe is retried in the background and the change streams take
+        over once it succeeds.
+        """
+        try:
+            streams, first = await self._open(db, timeout)
+        except (AttributeError, TypeError, OperationFailure) as exc:
+            logger.info("Change streams unavailable (%s); streaming deltas from write handlers", exc)
+            return False
+        except (PyMongoError, asyncio.TimeoutError) as exc:
+            logger.warning("Could not probe change streams (%s); streaming deltas from write handlers "
+                           "and retrying in the background", str(exc) or "timed out")
+            self._tasks = [asyncio.create_task(self._probe_later(db, timeout))]
+            return False
+        self._follow_all(db, streams, first)
+        return True
+
+    async def _open(self, db, timeout: Optional[float]) -> tuple:
+        streams, first = {}, {}
+        try:
+            for collection in self.sources:
+                stream = self._watch(db, collection)
+                # The aggregate is only sent on first use; a standalone server rejects it here
+                first[collection] = await asyncio.wait_for(stream.try_next(), timeout)
+                streams[collection] = stream
+        except Exception:
+            for stream in streams.values():
+                await stream.close()
+            raise
+        return streams, first
+
+    def _watch(self, db, collection: str, resume_after: Optional[dict] = None):
+        options = {"full_document_before_change": "whenAvailable"} if self.pre_images else {}
+        return db[collection].watch(full_document="updateLookup", resume_after=resume_after, **options)
+
+    def _follow_all(self, db, streams: dict, first: dict) -> None:
+        self.active = True
+        self._tasks = [
+            asyncio.create_task(self._follow(db, collection, stream, first[collection]))
+            for collection, stream in streams.items()
+        ]
+        logger.info("Streaming deltas from change streams on %s", ", ".join(streams))
+
+    async def _probe_later(self, db, timeout: Optional[float], max_delay: float = 60.0) -> None:
+        delay = self.retry_delay
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                streams, first = await self._open(db, timeout)
+            except (AttributeError, TypeError, OperationFailure) as exc:
+                logger.info("Change streams unavailable (%s); streaming deltas from write handlers", exc)
+                return
+            except (PyMongoError, asyncio.TimeoutError):
+                delay = min(delay * 2, max_delay)
+                continue
+            # Writes other processes made before now were never seen here
+            for collection, (topic, _) in self.sources.items():
+                if self.on_change is not None:
+                    self.on_change(collection)
+                self.publisher.publish(topic, {"op": "reset"})
+            self._follow_all(db, streams, first)
+            return
+
+    def _handle(self, collection: str, change: dict) -> None:
+        if self.on_change is not None:
+            self.on_change(collection)
+        topic, shape = self.sources[collection]
+        delta = change_delta(change, shape)
+        if delta is not None:
+            self.publisher.publish(topic, delta)
+
+    async def _follow(self, db, collection: str, stream, first: Optional[dict] = None) -> None:
+        topic, _ = self.sources[collection]
+        token = stream.resume_token
+        if first is not None:
+            self._handle(collection, first)
+        while True:
+            try:
+                async with stream:
+                    async for change in stream:
+                        token = stream.resume_token
+                        self._handle(collection, change)
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as exc:
+                logger.warning("Change stream on %s failed (%s); reopening", collection, exc)
+                if exc.code in CHANGE_STREAM_HISTORY_LOST:
+                    # Deltas were missed; subscribers have to refetch
+                    token = None
+                    if self.on_change is not None:
+                        self.on_change(collection)
+                    self.publisher.publish(topic, {"op": "reset"})
+            except PyMongoError as exc:
+                logger.warning("Change stream on %s failed (%s); reopening", collection, exc)
+            await asyncio.sleep(self.retry_delay)
+            stream = self._watch(db, collection, token)
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.active = False
+
+
+def change_delta(change: dict, shape: Callable[[dict], dict]) -> Optional[dict]:
+    """Translate a change event into the delta the write handlers would publish."""
+    operation = change.get("operationType")
+    key = change.get("documentKey", {}).get("_id")
+    document = change.get("fullDocument")
+    if operation == "insert" and document is not None:
+        shaped = shape(document)
+        return {"op": "created", "id": shaped.get("id") or str(key), "document": shaped}
+    if operation in ("update", "replace") and document is not None:
+        shaped = shape(document)
+        if operation == "update":
+            fields = change.get("updateDescription", {}).get("updatedFields", {})
+            changes = {name: value for name, value in shaped.items() if name in fields}
+        else:
+            changes = shaped
+        return {"op": "updated", "id": shaped.get("id") or str(key), "changes": changes}
+    if operation == "delete":
+        before = change.get("fullDocumentBeforeChange") or {}
+        if before.get("id") is not None:
+            return {"op": "deleted", "id": str(before["id"])}
+        # Only the ObjectId is known, which is not what clients key rows on
+        return {"op": "reset"}
+    if operation in ("drop", "rename", "dropDatabase", "invalidate"):
+        return {"op": "reset"}
+    return None
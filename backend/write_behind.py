@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import time
+from typing import List, Optional
+
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+# Queued by ``drain`` to end the batch being collected without waiting out flush_interval
+_FLUSH_NOW = object()
+
+
+class WriteBehindQueue:
+    """Buffer inserts for one collection and flush them with ``insert_many``.
+
+    Callers get control back as soon as the document is queued. A background
+    task writes a batch when ``max_batch`` documents are waiting or
+    ``flush_interval`` seconds have passed since the first one arrived. The
+    queue is bounded, so a stalled database eventually pushes back on callers
+    instead of growing without limit.
+    """
+
+    def __init__(self, name: str, max_batch: int = 100, flush_interval: float = 0.5,
+                 max_queue: int = 10000, max_retries: int = 3):
+        self.name = name
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        self.flushed = 0
+        self.batches = 0
+        self.failed = 0
+        self._collection = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, collection) -> None:
+        self._collection = collection
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run(), name=f"write-behind:{self.name}")
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def submit(self, document: dict) -> None:
+        if not self.running:
+            raise RuntimeError(f"Write-behind queue {self.name} is not running")
+        await self._queue.put(document)
+
+    async def _next_batch(self) -> List[dict]:
+        batch = []
+        while not batch:
+            document = await self._queue.get()
+            if document is _FLUSH_NOW:
+                self._queue.task_done()
+            else:
+                batch.append(document)
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                document = await asyncio.wait_for(self._queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            if document is _FLUSH_NOW:
+                self._queue.task_done()
+                break
+            batch.append(document)
+        return batch
+
+    async def _flush(self, batch: List[dict]) -> None:
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                await self._collection.insert_many(batch, ordered=False)
+                self.flushed += len(batch)
+                self.batches += 1
+                return
+            except BulkWriteError as exc:
+                # Per-document errors will not go away on retry. Duplicate
+                # keys mean an earlier attempt already stored the document.
+                errors = [error for error in exc.details.get("writeErrors", []) if error.get("code") != 11000]
+                self.flushed += len(batch) - len(errors)
+                self.failed += len(errors)
+                self.batches += 1
+                for error in errors:
+                    logger.error("Could not store %s document: %s", self.name, error.get("errmsg"))
+                return
+            except Exception:
+                logger.exception("Flushing %d %s documents failed (attempt %d/%d)",
+                                 len(batch), self.name, attempt, self.max_retries)
+                if attempt < self.max_retries:
+                    await asyncio.sleep(0.2 * 2 ** attempt)
+        self.failed += len(batch)
+        logger.error("Dropped %s documents after %d attempts: %s", self.name, self.max_retries,
+                     [document.get("id") for document in batch])
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._flush(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def drain(self) -> None:
+        """Flush everything still queued, then stop the background task."""
+        if self._task is None:
+            return
+        if self.running:
+            await self._queue.put(_FLUSH_NOW)
+            await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "running": self.running,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "failed": self.failed,
+        }
@@ -8,108 +8,152 @@ import axios from 'axios';
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = BACKEND_URL ? `${BACKEND_URL}/api` : null;
 
-// Fallback static events for when backend is not available
-const STATIC_EVENTS = [
-  // Past Performances
-  {
-    id: "1",
-    title: "Sydney Festival 2025",
-    venue: "Domain Theatre",
-    address: "1 Art Gallery Road, The Domain, Sydney NSW 2000",
-    date: "2025-08-15",
-    time: "7:00 PM",
-    description: "Join us for an unforgettable evening of South Asian fusion music at Sydney Festival 2025. Experience Eastern Empire's electrifying performance featuring both traditional and contemporary hits.",
-    ticketUrl: "https://www.sydneyfestival.org.au/"
-  },
-  {
-    id: "2",
-    title: "Cultural Night at Opera House",
-    venue: "Sydney Opera House - Studio",
-    address: "Bennelong Point, Sydney NSW 2000",
-    date: "2025-09-20",
-    time: "8:00 PM",
-    description: "An intimate evening celebrating South Asian music and culture. Limited seating available.",
-    ticketUrl: "https://www.sydneyoperahouse.com/"
-  },
-  {
-    id: "3",
-    title: "Diwali Festival Performance",
-    venue: "Parramatta Park",
-    address: "Pitt Street & Macquarie Street, Parramatta NSW 2150",
-    date: "2025-10-25",
-    time: "6:00 PM",
-    description: "Celebrate the festival of lights with Eastern Empire! Free entry, family-friendly event.",
-    ticketUrl: null
-  },
-  // Upcoming Shows
-  {
-    id: "4",
-    title: "New Year's Eve Gala",
-    venue: "The Star Event Centre",
-    address: "80 Pyrmont Street, Pyrmont NSW 2009",
-    date: "2025-12-31",
-    time: "9:00 PM",
-    description: "Ring in the New Year with Eastern Empire! A spectacular night of music, dance, and celebration. Black tie event with dinner and entertainment.",
-    ticketUrl: "https://www.star.com.au/"
-  },
-  {
-    id: "5",
-    title: "Australia Day Concert",
-    venue: "Darling Harbour",
-    address: "Darling Harbour, Sydney NSW 2000",
-    date: "2026-01-26",
-    time: "6:30 PM",
-    description: "Celebrate Australia Day with Eastern Empire at this free outdoor concert. Bring your family and friends for an evening of multicultural music under the stars.",
-    ticketUrl: null
-  },
-  {
-    id: "6",
-    title: "Valentine's Concert Series",
-    venue: "City Recital Hall",
-    address: "2 Angel Place, Sydney NSW 2000",
-    date: "2026-02-14",
-    time: "7:30 PM",
-    description: "An intimate evening of romantic melodies and timeless classics. Perfect date night experience featuring Eastern Empire's signature blend of traditional and contemporary sounds.",
-    ticketUrl: "https://www.cityrecitalhall.com/"
+// Events published as static files by backend/snapshot.py. The manifest names
+// the current versioned file, which can then be cached indefinitely.
+const SNAPSHOT_MANIFEST = `${process.env.PUBLIC_URL || ''}/snapshot/manifest.json`;
+
+const fetchSnapshotEvents = async () => {
+  const manifest = await axios.get(SNAPSHOT_MANIFEST);
+  const events = await axios.get(`${process.env.PUBLIC_URL || ''}${manifest.data.events}`);
+  return events.data || [];
+};
+
+// Local calendar date as YYYY-MM-DD, the upcoming/past boundary for the snapshot
+const todayISO = () => {
+  const now = new Date();
+  const pad = (n) => String(n).padStart(2, '0');
+  return `${now.getFullYear()}-${pad(now.getMonth() + 1)}-${pad(now.getDate())}`;
+};
+
+const isUpcoming = (event) => event.date >= todayISO();
+
+const eventKey = (event) => event.id;
+
+// Sort key matching the backend's start-time order: date, then the clock
+// time ("7:00 PM" or "19:00"); an unreadable time counts as midnight
+const startKey = (event) => {
+  const match = /(\d{1,2})(?::(\d{2}))?\s*([ap])?\.?m?\.?/i.exec(event.time || '');
+  let minutes = 0;
+  if (match) {
+    const hours = Number(match[1]) % (match[3] ? 12 : 24) + (match[3] && match[3].toLowerCase() === 'p' ? 12 : 0);
+    minutes = hours * 60 + Number(match[2] || 0);
   }
-];
+  return `${event.date || ''} ${String(minutes).padStart(4, '0')}`;
+};
+
+const byStart = (a, b) => startKey(a).localeCompare(startKey(b));
+
+// Largest page GET /api/events serves
+const EVENTS_PAGE_LIMIT = 1000;
+
+// Follows X-Next-Cursor so no upcoming show is cut off by the page size
+const fetchAllEvents = async (params) => {
+  let events = [];
+  let cursor;
+  do {
+    const response = await axios.get(`${API}/events`, { params: { ...params, limit: EVENTS_PAGE_LIMIT, cursor } });
+    events = events.concat(response.data || []);
+    cursor = response.headers['x-next-cursor'];
+  } while (cursor);
+  return events;
+};
 
 const Gigs = () => {
-  const [events, setEvents] = useState(STATIC_EVENTS);
+  // One state for both lists, so a live update can move an event between them
+  const [shows, setShows] = useState({ upcoming: [], past: [] });
+  const { upcoming: upcomingEvents, past: pastEvents } = shows;
   const [selectedDate, setSelectedDate] = useState(new Date());
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
 
   useEffect(() => {
     fetchEvents();
+    if (!API || typeof EventSource === 'undefined') {
+      return undefined;
+    }
+    // Live updates from the backend, applied to the lists in place so a write
+    // costs each visitor one small message rather than a refetch
+    const stream = new EventSource(`${API}/stream?topic=events`);
+    stream.addEventListener('events', (message) => {
+      const delta = JSON.parse(message.data);
+      if (delta.op === 'reset') {
+        fetchEvents();
+      } else {
+        applyDelta(delta);
+      }
+    });
+    // Sent when updates were missed, e.g. after a long disconnect
+    stream.addEventListener('reset', () => fetchEvents());
+    return () => stream.close();
   }, []);
 
-  const fetchEvents = async () => {
-    // If no backend URL is configured, use static events
-    if (!API) {
-      console.log('No backend URL configured, using static events');
-      setEvents(STATIC_EVENTS);
-      setLoading(false);
-      return;
-    }
+  // Remove the delta's event from both lists, then put its new version (if
+  // any) in the list its date belongs to: upcoming oldest first, past newest first
+  const applyDelta = (delta) => {
+    setShows((previous) => {
+      const { upcoming, past } = previous;
+      const current = [...upcoming, ...past].find(event => eventKey(event) === delta.id);
+      let updated = null;
+      if (delta.op === 'created') {
+        updated = delta.document;
+      } else if (delta.op === 'updated' && current) {
+        updated = { ...current, ...delta.changes };
+      } else if (delta.op === 'updated') {
+        // Not one of the listed shows; nothing to change
+        return previous;
+      }
+      const keep = (event) => eventKey(event) !== delta.id;
+      const nextUpcoming = upcoming.filter(keep);
+      const nextPast = past.filter(keep);
+      if (updated && isUpcoming(updated)) {
+        nextUpcoming.push(updated);
+        nextUpcoming.sort(byStart);
+      } else if (updated) {
+        nextPast.push(updated);
+        nextPast.sort((a, b) => byStart(b, a));
+      }
+      return { upcoming: nextUpcoming, past: nextPast };
+    });
+  };
+
+  const applySnapshotEvents = async () => {
+    const events = await fetchSnapshotEvents();
+    setShows({
+      upcoming: events.filter(isUpcoming),
+      // Most recent past show first, as the API lists them
+      past: events.filter(event => !isUpcoming(event)).reverse()
+    });
+  };
 
+  const fetchEvents = async () => {
     try {
-      const response = await axios.get(`${API}/events`);
-      setEvents(response.data || STATIC_EVENTS);
+      if (API) {
+        try {
+          // Let the backend split upcoming from past on its indexed start times,
+          // using the venue timezone rather than the visitor's clock. Past shows
+          // come newest first, so the page holds the most recent ones.
+          const [upcoming, past] = await Promise.all([
+            fetchAllEvents({ upcoming: true }),
+            axios.get(`${API}/events`, { params: { upcoming: false, order: 'desc', limit: EVENTS_PAGE_LIMIT } })
+          ]);
+          setShows({ upcoming, past: past.data || [] });
+          setError(null);
+          return;
+        } catch (error) {
+          console.error('Failed to fetch events, using the published snapshot:', error);
+        }
+      }
+      // No backend on the static deployment: read the snapshot, no API calls
+      await applySnapshotEvents();
       setError(null);
     } catch (error) {
-      console.error('Failed to fetch events, using static fallback:', error);
-      // Use static events as fallback
-      setEvents(STATIC_EVENTS);
-      setError(null); // Don't show error since we have fallback data
+      console.error('Failed to load the events snapshot:', error);
+      setError('Unable to load shows right now. Please check back soon.');
     } finally {
       setLoading(false);
     }
   };
 
-  const upcomingEvents = events.filter(event => new Date(event.date) >= new Date());
-  const pastEvents = events.filter(event => new Date(event.date) < new Date());
-
   return (
     <div className="min-h-screen bg-black text-white">
       {/* Hero Section */}
@@ -142,7 +186,7 @@ const Gigs = () => {
           ) : (
             <div className="grid grid-cols-1 md:grid-cols-2 gap-8">
               {upcomingEvents.map((event, index) => (
-                <Card key={event.id || event._id || index} className="bg-black border-zinc-800 hover:border-zinc-600 transition-all duration-300">
+                <Card key={eventKey(event) || index} className="bg-black border-zinc-800 hover:border-zinc-600 transition-all duration-300">
                   <CardHeader>
                     <CardTitle className="text-2xl text-white">{event.title}</CardTitle>
                   </CardHeader>
@@ -184,7 +228,7 @@ const Gigs = () => {
             <h2 className="text-4xl font-bold mb-12 text-center">Past Performances</h2>
             <div className="grid grid-cols-1 md:grid-cols-3 gap-6">
               {pastEvents.map((event, index) => (
-                <Card key={event.id || event._id || index} className="bg-zinc-900 border-zinc-800">
+                <Card key={eventKey(event) || index} className="bg-zinc-900 border-zinc-800">
                   <CardHeader>
                     <CardTitle className="text-lg text-white">{event.title}</CardTitle>
                   </CardHeader>
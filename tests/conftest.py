@@ -0,0 +1,52 @@
+"""Shared fixtures: the API served from the in-memory storage engine.
+
+Backend modules are imported flat, as ``server.py`` does, and read their
+configuration at import time, so the environment is set before anything
+from ``backend/`` is imported.
+"""
+import os
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ["STORAGE_BACKEND"] = "memory"
+os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+os.environ.setdefault("EMAIL_CHECK_WORKERS", "0")
+os.environ.setdefault("STREAM_SOURCE", "handlers")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def db():
+    from memory_db import MemoryClient
+
+    return MemoryClient()["eastern_empire_test"]
+
+
+@pytest.fixture
+async def api(db):
+    """An HTTP client for the app, on a fresh memory database per test."""
+    import server
+    from emails import KnownEmails
+
+    server.client, server.db = db.client, db
+    # Process-wide state would otherwise carry over from the previous test
+    server.newsletter_emails = KnownEmails()
+    server.events_cache.invalidate()
+    server.booking_stats.invalidate()
+    for hook in server.app.router.on_startup:
+        await hook()
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        yield client
+    for hook in server.app.router.on_shutdown:
+        await hook()
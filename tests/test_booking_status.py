@@ -0,0 +1,117 @@
+"""Booking status changes: transitions, version guards and lost races."""
+from datetime import datetime
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+def booking(booking_id, status="pending", version=None):
+    document = {
+        "id": booking_id, "name": "Sam", "email": "sam@example.com", "phone": "0400000000",
+        "eventType": "Wedding", "eventDate": "2031-03-14", "venue": "Hall", "guestCount": "120",
+        "configuration": "Full band", "status": status, "created_at": datetime(2030, 1, 1),
+    }
+    if version is not None:
+        document["version"] = version
+    return document
+
+
+async def stored(db, booking_id):
+    return await db.booking_inquiries.find_one({"id": booking_id}, {"_id": 0, "status": 1, "version": 1})
+
+
+async def test_batch_reports_every_outcome(api, db):
+    await db.booking_inquiries.insert_many([
+        booking("b1"), booking("b2"), booking("b3", version=2), booking("b4", status="declined", version=2),
+    ])
+    response = await api.patch("/api/bookings/status", json=[
+        {"id": "b1", "status": "confirmed"},
+        {"id": "b2", "status": "pending"},
+        {"id": "b3", "status": "confirmed", "version": 1},
+        {"id": "b4", "status": "confirmed"},
+        {"id": "missing", "status": "confirmed"},
+        {"id": "b1", "status": "declined"},
+        {"id": "b2", "status": "archived"},
+    ])
+    assert response.status_code == 200
+    report = response.json()
+    assert [(item["index"], item["status"]) for item in report["results"]] == [
+        (0, "updated"), (1, "unchanged"), (2, "conflict"), (3, "invalid_transition"),
+        (4, "not_found"), (5, "duplicate"), (6, "invalid"),
+    ]
+    assert report["results"][0]["version"] == 2
+    assert report["results"][2]["version"] == 2
+    assert report["received"] == 7
+
+    assert await stored(db, "b1") == {"status": "confirmed", "version": 2}
+    assert await stored(db, "b2") == {"status": "pending"}
+    assert await stored(db, "b3") == {"status": "pending", "version": 2}
+    assert await stored(db, "b4") == {"status": "declined", "version": 2}
+
+
+async def test_single_route_guards_the_version(api, db):
+    # Stored before versioning: no `version` field, treated as version 1
+    await db.booking_inquiries.insert_one(booking("b1"))
+    first = await api.patch("/api/bookings/b1/status", params={"status": "confirmed", "version": 1})
+    assert first.status_code == 200
+    assert first.json()["version"] == 2
+
+    stale = await api.patch("/api/bookings/b1/status", params={"status": "completed", "version": 1})
+    assert stale.status_code == 409
+    backwards = await api.patch("/api/bookings/b1/status", params={"status": "pending"})
+    assert backwards.status_code == 409
+    done = await api.patch("/api/bookings/b1/status", params={"status": "completed"})
+    assert done.json()["version"] == 3
+    missing = await api.patch("/api/bookings/nope/status", params={"status": "confirmed"})
+    assert missing.status_code == 404
+
+
+def race_before_write(monkeypatch, db, booking_id, update):
+    """Apply ``update`` to a booking between the planning read and the bulk_write."""
+    collection = db.booking_inquiries
+    bulk_write = collection.bulk_write
+
+    async def racing_bulk_write(requests, **kwargs):
+        await collection.update_one({"id": booking_id}, update)
+        return await bulk_write(requests, **kwargs)
+    monkeypatch.setattr(collection, "bulk_write", racing_bulk_write)
+
+
+async def test_lost_race_is_reported_as_conflict(api, db, monkeypatch):
+    await db.booking_inquiries.insert_many([booking("b1"), booking("b2")])
+    race_before_write(monkeypatch, db, "b2", {"$set": {"status": "declined", "version": 2}})
+    report = (await api.patch("/api/bookings/status", json=[
+        {"id": "b1", "status": "confirmed"},
+        {"id": "b2", "status": "confirmed"},
+    ])).json()
+    assert [item["status"] for item in report["results"]] == ["updated", "conflict"]
+    assert await stored(db, "b1") == {"status": "confirmed", "version": 2}
+    assert await stored(db, "b2") == {"status": "declined", "version": 2}
+
+
+async def test_race_that_made_the_same_change_counts_as_updated(api, db, monkeypatch):
+    await db.booking_inquiries.insert_many([booking("b1", version=1), booking("b2", version=1)])
+    # The concurrent writer lands exactly the planned status and version, so
+    # the re-read after the short matched_count cannot tell it apart
+    race_before_write(monkeypatch, db, "b2", {"$set": {"status": "confirmed", "version": 2}})
+    report = (await api.patch("/api/bookings/status", json=[
+        {"id": "b1", "status": "confirmed"},
+        {"id": "b2", "status": "confirmed"},
+    ])).json()
+    assert [(item["status"], item["version"]) for item in report["results"]] == [("updated", 2), ("updated", 2)]
+
+
+async def test_stats_follow_status_changes(api, db):
+    await db.booking_inquiries.insert_one(booking("b1"))
+    assert (await api.get("/api/bookings/stats")).json()["by_status"] == {"pending": 1}
+    await api.patch("/api/bookings/status", json=[{"id": "b1", "status": "confirmed"}])
+    assert (await api.get("/api/bookings/stats")).json()["by_status"] == {"confirmed": 1}
+
+    # Not in the loaded summary (another worker wrote it): reloaded rather
+    # than leaving pending at -1
+    await db.booking_inquiries.insert_one(booking("b2"))
+    await api.patch("/api/bookings/status", json=[{"id": "b2", "status": "confirmed"}])
+    stats = (await api.get("/api/bookings/stats")).json()
+    assert stats["total"] == 2
+    assert stats["by_status"] == {"confirmed": 2}
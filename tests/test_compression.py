@@ -0,0 +1,109 @@
+"""Compressed responses: cached variants, ETags and the middleware."""
+import os
+
+import pytest
+
+from compression import CompressedVariants, Compression, CompressionMiddleware
+
+pytestmark = pytest.mark.anyio
+
+
+def event(number):
+    return {"title": f"show {number}", "venue": "Enmore Theatre", "address": "118 Enmore Rd",
+            "date": f"2031-01-{number + 1:02d}", "time": "8:00 PM", "description": "An evening of fusion " * 5}
+
+
+async def get_events(api, **headers):
+    return await api.get("/api/events", headers=headers)
+
+
+@pytest.fixture
+async def events_page(api):
+    # Large enough to pass COMPRESSION_MIN_SIZE
+    for number in range(10):
+        assert (await api.post("/api/events", json=event(number))).status_code == 200
+    return api
+
+
+async def test_compressed_page_has_a_weak_etag(events_page):
+    plain = await get_events(events_page, **{"accept-encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert not plain.headers["etag"].startswith("W/")
+
+    compressed = await get_events(events_page, **{"accept-encoding": "gzip"})
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.headers["etag"] == "W/" + plain.headers["etag"]
+    assert compressed.headers["vary"] == "Accept-Encoding"
+    assert compressed.headers["x-cache"] == "HIT"
+    assert compressed.json() == plain.json()
+
+
+async def test_either_etag_revalidates_under_compression(events_page):
+    strong = (await get_events(events_page, **{"accept-encoding": "identity"})).headers["etag"]
+    weak = (await get_events(events_page, **{"accept-encoding": "gzip"})).headers["etag"]
+    for etag in (strong, weak):
+        response = await get_events(events_page, **{"accept-encoding": "gzip", "if-none-match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert "content-encoding" not in response.headers
+
+
+def counting(compression):
+    calls = []
+    compress = compression.compress
+
+    def counted(body, encoding):
+        calls.append(encoding)
+        return compress(body, encoding)
+    compression.compress = counted
+    return calls
+
+
+def test_variants_remember_when_compression_does_not_help():
+    compression = Compression(minimum_size=16)
+    calls = counting(compression)
+    body = os.urandom(4096)
+    variants = CompressedVariants(body, compression)
+    assert variants.encode("gzip") == (None, body)
+    assert variants.encode("gzip") == (None, body)
+    assert calls == ["gzip"]
+
+
+async def send_through(middleware, headers, accept_encoding="gzip"):
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+    scope = {"type": "http", "headers": [(b"accept-encoding", accept_encoding.encode())]}
+    await middleware(scope, None, send)
+    return sent
+
+
+def app_sending(body, headers):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(name.encode(), value.encode()) for name, value in headers.items()]})
+        await send({"type": "http.response.body", "body": body})
+    return app
+
+
+async def test_middleware_leaves_negotiated_responses_alone():
+    compression = Compression(minimum_size=16)
+    calls = counting(compression)
+    # A cached body its variants already found incompressible
+    body = os.urandom(4096)
+    headers = {"content-type": "application/json", "vary": "Accept-Encoding"}
+    sent = await send_through(CompressionMiddleware(app_sending(body, headers), compression), headers)
+    assert sent[1]["body"] == body
+    assert calls == []
+
+
+async def test_middleware_compresses_other_responses():
+    compression = Compression(minimum_size=16)
+    body = b'{"message": "' + b"a" * 2000 + b'"}'
+    app = app_sending(body, {"content-type": "application/json", "etag": '"abc"'})
+    start, message = await send_through(CompressionMiddleware(app, compression), {})
+    headers = dict(start["headers"])
+    assert headers[b"content-encoding"] == b"gzip"
+    assert headers[b"etag"] == b'W/"abc"'
+    assert len(message["body"]) < len(body)
@@ -0,0 +1,131 @@
+"""The events, newsletter and stats routes served from the memory engine."""
+import pytest
+from bson import ObjectId
+
+pytestmark = pytest.mark.anyio
+
+NDJSON = {"content-type": "application/x-ndjson"}
+
+
+def event(title, date, time="8:00 PM"):
+    return {"title": title, "venue": "Enmore Theatre", "address": "118 Enmore Rd", "date": date, "time": time}
+
+
+async def page_through(api, **params):
+    """Every event the listing returns, following X-Next-Cursor."""
+    titles, cursor, pages = [], None, 0
+    while True:
+        response = await api.get("/api/events", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        titles += [item["title"] for item in response.json()]
+        pages += 1
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            return titles, pages
+
+
+async def create_events(api, events):
+    for item in events:
+        assert (await api.post("/api/events", json=item)).status_code == 200
+
+
+async def test_keyset_pages_cover_every_event_once(api):
+    # Several events share a start time, so the id tiebreaker decides their order
+    await create_events(api, [event(f"show {number}", f"2031-0{number % 3 + 1}-01") for number in range(7)])
+    everything, pages = await page_through(api, limit=1000)
+    assert pages == 1
+    assert len(everything) == 7
+    for limit in (1, 2, 3):
+        titles, pages = await page_through(api, limit=limit)
+        assert titles == everything
+        assert pages == -(-7 // limit)
+        descending, _ = await page_through(api, limit=limit, order="desc")
+        assert descending == everything[::-1]
+
+
+async def test_date_filters_split_upcoming_and_past(api):
+    await create_events(api, [event("old", "2001-05-01"), event("older", "2000-05-01"), event("next", "2099-01-01")])
+    upcoming, _ = await page_through(api, upcoming="true")
+    past, _ = await page_through(api, upcoming="false", order="desc")
+    assert upcoming == ["next"]
+    assert past == ["old", "older"]
+    ranged, _ = await page_through(api, **{"from": "2000-01-01", "to": "2001-05-01"})
+    assert ranged == ["older"]
+
+
+async def test_invalid_cursor_is_rejected(api):
+    response = await api.get("/api/events", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+async def test_seeded_events_are_keyed_by_the_id_deletes_use(api, db, monkeypatch):
+    import server
+
+    # Seeded straight into MongoDB: an ObjectId `_id` next to the public `id`
+    await db.events.insert_one({**event("seeded", "2031-01-01"), "_id": ObjectId(), "id": "1",
+                                "starts_at": server.event_starts_at("2031-01-01", "8:00 PM")})
+    await create_events(api, [event("created", "2031-02-01")])
+    rows = (await api.get("/api/events")).json()
+    assert rows[0]["id"] == "1"
+
+    published = []
+    monkeypatch.setattr(server.stream_publisher, "publish", lambda topic, delta: published.append(delta))
+    for row in rows:
+        assert (await api.delete(f"/api/events/{row['id']}")).status_code == 200
+    # The frontend drops the row whose `id` matches the delta's
+    assert [delta["id"] for delta in published] == [row["id"] for row in rows]
+    assert (await api.get("/api/events")).json() == []
+
+
+async def test_bulk_event_import_reports_each_item(api):
+    body = "\n".join([
+        '{"id": "e1", "title": "One", "venue": "V", "address": "A", "date": "2031-01-01", "time": "8:00 PM"}',
+        '{"id": "e1", "title": "Again", "venue": "V", "address": "A", "date": "2031-01-01", "time": "8:00 PM"}',
+        '{"title": "No venue", "date": "2031-01-01"}',
+        '{not json',
+    ])
+    report = (await api.post("/api/events/bulk", content=body, headers=NDJSON)).json()
+    assert [item["status"] for item in report["results"]] == ["created", "duplicate", "invalid", "invalid"]
+    assert report["received"] == 4
+
+    again = (await api.post("/api/events/bulk", content=body.splitlines()[0], headers=NDJSON)).json()
+    assert again["results"] == [{"index": 0, "key": "e1", "status": "matched"}]
+
+
+async def test_bulk_import_that_changes_nothing_keeps_the_cache(api, monkeypatch):
+    import server
+
+    line = '{"id": "e1", "title": "One", "venue": "V", "address": "A", "date": "2031-01-01", "time": "8:00 PM"}'
+    await api.post("/api/events/bulk", content=line, headers=NDJSON)
+    assert (await api.get("/api/events")).headers["x-cache"] == "MISS"
+    published = []
+    monkeypatch.setattr(server.stream_publisher, "publish", lambda topic, delta: published.append(delta))
+
+    await api.post("/api/events/bulk", content=line, headers=NDJSON)
+    assert (await api.get("/api/events")).headers["x-cache"] == "HIT"
+    assert published == []
+
+    await api.post("/api/events/bulk", content=line.replace("One", "Renamed"), headers=NDJSON)
+    assert (await api.get("/api/events")).headers["x-cache"] == "MISS"
+    assert published == [{"op": "reset"}]
+
+
+async def test_newsletter_rejects_the_same_address_in_any_case(api):
+    assert (await api.post("/api/newsletter", json={"email": "Fan@Example.com"})).status_code == 200
+    response = await api.post("/api/newsletter", json={"email": " fan@example.COM "})
+    assert response.status_code == 400
+    subscribers = (await api.get("/api/newsletter")).json()
+    assert [item["email"] for item in subscribers] == ["fan@example.com"]
+
+
+async def test_booking_stats_fold_without_an_aggregation_pipeline(api, db):
+    booking = {
+        "name": "Sam", "email": "sam@example.com", "phone": "0400000000", "eventType": "Wedding",
+        "eventDate": "2031-03-14", "venue": "Hall", "guestCount": "about 120", "configuration": "Full band",
+    }
+    assert (await api.post("/api/bookings", json=booking)).status_code == 200
+    stats = (await api.get("/api/bookings/stats")).json()
+    assert stats["total"] == 1
+    assert stats["by_status"] == {"pending": 1}
+    assert stats["guest_count"] == {"100-199": 1}
+    assert stats["by_month"] == {"2031-03": 1}
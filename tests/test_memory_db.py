@@ -0,0 +1,139 @@
+"""The in-memory storage engine against the Motor behaviour handlers rely on."""
+from datetime import datetime
+
+import pytest
+from pymongo import ASCENDING, DeleteOne, IndexModel, InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+pytestmark = pytest.mark.anyio
+
+
+async def insert_people(db):
+    await db.people.insert_many([
+        {"_id": 1, "name": "ana", "age": 31, "city": "Sydney", "tags": ["a"], "address": {"zip": "2000"}},
+        {"_id": 2, "name": "ben", "age": 25, "city": "Melbourne"},
+        {"_id": 3, "name": "cat", "age": 40, "city": "Sydney", "tags": ["b"]},
+        {"_id": 4, "name": "dev", "age": None, "city": "Perth"},
+    ])
+
+
+async def names(cursor):
+    return [document["name"] for document in await cursor.to_list(None)]
+
+
+@pytest.mark.parametrize("query, expected", [
+    ({"city": "Sydney"}, ["ana", "cat"]),
+    ({"age": {"$gt": 25, "$lte": 40}}, ["ana", "cat"]),
+    ({"age": {"$in": [25, 40]}}, ["ben", "cat"]),
+    ({"$or": [{"city": "Perth"}, {"age": {"$lt": 30}}]}, ["ben", "dev"]),
+    ({"tags": {"$exists": False}}, ["ben", "dev"]),
+    ({"age": None}, ["dev"]),
+    ({"age": {"$type": "int"}}, ["ana", "ben", "cat"]),
+    ({"address.zip": "2000"}, ["ana"]),
+    ({"city": "Sydney", "age": {"$ne": 31}}, ["cat"]),
+])
+async def test_find_matches_query_operators(db, query, expected):
+    await insert_people(db)
+    assert await names(db.people.find(query).sort("_id", 1)) == expected
+    assert await db.people.count_documents(query) == len(expected)
+
+
+async def test_sort_follows_bson_type_order(db):
+    await db.values.insert_many([
+        {"_id": "date", "value": datetime(2030, 1, 1)},
+        {"_id": "string", "value": "b"},
+        {"_id": "number", "value": 7},
+        {"_id": "null", "value": None},
+        {"_id": "missing"},
+        {"_id": "float", "value": 2.5},
+    ])
+    ascending = [document["_id"] for document in await db.values.find().sort("value", 1).to_list(None)]
+    # Missing and null compare equal, so they only have to come first
+    assert set(ascending[:2]) == {"null", "missing"}
+    assert ascending[2:] == ["float", "number", "string", "date"]
+    descending = [document["_id"] for document in await db.values.find().sort("value", -1).to_list(None)]
+    assert descending[:4] == ["date", "string", "number", "float"]
+
+
+async def test_compound_sort_skip_limit_and_projection(db):
+    await insert_people(db)
+    cursor = db.people.find({}, {"_id": 0, "name": 1}).sort([("city", ASCENDING), ("age", -1)]).skip(1).limit(2)
+    assert await cursor.to_list(None) == [{"name": "dev"}, {"name": "cat"}]
+
+
+async def test_async_iteration_sees_every_document(db):
+    await db.items.insert_many([{"_id": number} for number in range(250)])
+    seen = [document["_id"] async for document in db.items.find({}, batch_size=100).sort("_id", -1)]
+    assert seen == list(range(249, -1, -1))
+
+
+async def test_unique_index_rejects_duplicate_inserts_and_updates(db):
+    await db.people.create_indexes([IndexModel([("name", ASCENDING)], name="name_unique", unique=True)])
+    await insert_people(db)
+    with pytest.raises(DuplicateKeyError):
+        await db.people.insert_one({"name": "ana"})
+    with pytest.raises(DuplicateKeyError):
+        await db.people.update_one({"_id": 2}, {"$set": {"name": "ana"}})
+    assert (await db.people.find_one({"_id": 2}))["name"] == "ben"
+
+
+async def test_partial_unique_index_only_covers_matching_documents(db):
+    await db.events.create_indexes([IndexModel(
+        [("id", ASCENDING)], name="id_unique", unique=True, partialFilterExpression={"id": {"$type": "string"}},
+    )])
+    # Documents without `id` are outside the index, so any number of them fit
+    await db.events.insert_many([{"title": "old"}, {"title": "older"}])
+    await db.events.insert_one({"id": "a"})
+    with pytest.raises(DuplicateKeyError):
+        await db.events.insert_one({"id": "a"})
+    assert await db.events.count_documents({}) == 3
+
+
+async def test_insert_rejects_an_existing_id(db):
+    await db.people.insert_one({"_id": "x", "name": "first"})
+    with pytest.raises(DuplicateKeyError):
+        await db.people.insert_one({"_id": "x", "name": "second"})
+    assert (await db.people.find_one({"_id": "x"}))["name"] == "first"
+
+
+async def test_upsert_reports_inserted_then_matched(db):
+    update = {"$setOnInsert": {"name": "ana"}, "$set": {"seen": True}}
+    first = await db.people.update_one({"email": "ana@example.com"}, update, upsert=True)
+    assert first.upserted_id is not None
+    assert first.matched_count == 0
+    second = await db.people.update_one({"email": "ana@example.com"}, update, upsert=True)
+    assert second.upserted_id is None
+    assert (second.matched_count, second.modified_count) == (1, 0)
+    stored = await db.people.find_one({"email": "ana@example.com"}, {"_id": 0})
+    assert stored == {"email": "ana@example.com", "name": "ana", "seen": True}
+
+
+async def test_bulk_write_result_counts(db):
+    await insert_people(db)
+    result = await db.people.bulk_write([
+        InsertOne({"_id": 5, "name": "eve"}),
+        UpdateOne({"name": "ben"}, {"$set": {"age": 26}}),
+        UpdateOne({"name": "fay"}, {"$setOnInsert": {"age": 50}}, upsert=True),
+        UpdateOne({"name": "nobody"}, {"$set": {"age": 1}}),
+        DeleteOne({"name": "dev"}),
+    ])
+    assert result.inserted_count == 1
+    assert (result.matched_count, result.modified_count) == (1, 1)
+    assert result.upserted_count == 1
+    assert list(result.upserted_ids) == [2]
+    assert result.deleted_count == 1
+    assert await names(db.people.find().sort("_id", 1)) == ["ana", "ben", "cat", "eve", "fay"]
+
+
+@pytest.mark.parametrize("ordered, inserted", [(True, 1), (False, 2)])
+async def test_bulk_write_errors_stop_only_ordered_batches(db, ordered, inserted):
+    await db.people.insert_one({"_id": 1})
+    with pytest.raises(BulkWriteError) as excinfo:
+        await db.people.bulk_write(
+            [InsertOne({"_id": 0}), InsertOne({"_id": 1}), InsertOne({"_id": 2})], ordered=ordered,
+        )
+    details = excinfo.value.details
+    assert [error["index"] for error in details["writeErrors"]] == [1]
+    assert details["writeErrors"][0]["code"] == 11000
+    assert details["nInserted"] == inserted
+    assert await db.people.count_documents({}) == 1 + inserted
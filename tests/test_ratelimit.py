@@ -0,0 +1,115 @@
+"""Token buckets and the duplicate-submission window on the public forms."""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from starlette.requests import Request
+
+import ratelimit
+from ratelimit import FormGuard, Limit, MemoryBucketStore, RouteLimits
+
+pytestmark = pytest.mark.anyio
+
+MESSAGE = {"firstName": "Sam", "lastName": "Lee", "email": "sam@example.com", "subject": "Hi", "message": "Hello"}
+
+
+def request_from(host="10.0.0.1"):
+    return Request({"type": "http", "method": "POST", "path": "/", "headers": [], "client": (host, 1234)})
+
+
+@pytest.fixture
+def guard_contact(monkeypatch):
+    """Install a FormGuard on the contact route; returns a setter for its limits."""
+    import server
+
+    def install(**limits):
+        guard = FormGuard({"contact": RouteLimits(**{"ip": None, "email": None, "dedupe_window": 0, **limits})})
+        monkeypatch.setattr(server, "form_guard", guard)
+        return guard
+    return install
+
+
+async def test_bucket_allows_the_burst_then_reports_the_wait():
+    store = MemoryBucketStore()
+    limit = Limit(rate=0.5, burst=2)
+    assert [await store.take("k", limit) for _ in range(2)] == [0.0, 0.0]
+    assert await store.take("k", limit) == pytest.approx(2.0, abs=0.01)
+    # Other keys have buckets of their own
+    assert await store.take("other", limit) == 0.0
+
+
+async def test_bucket_store_forgets_the_least_recently_seen_key():
+    store = MemoryBucketStore(max_keys=2)
+    limit = Limit(rate=0.001, burst=1)
+    await store.take("a", limit)
+    await store.take("b", limit)
+    await store.take("a", limit)
+    await store.take("c", limit)
+    assert list(store._buckets) == ["a", "c"]
+    # Forgotten, so "b" starts over with a full bucket
+    assert await store.take("b", limit) == 0.0
+
+
+async def test_duplicate_contact_submission_returns_the_first_response(api, db, guard_contact):
+    guard_contact(dedupe_window=30)
+    first = await api.post("/api/contact", json=MESSAGE)
+    second = await api.post("/api/contact", json=MESSAGE)
+    assert first.status_code == second.status_code == 200
+    assert second.json()["id"] == first.json()["id"]
+    assert await db.contact_messages.count_documents({}) == 1
+
+    other = await api.post("/api/contact", json={**MESSAGE, "message": "Something else"})
+    assert other.json()["id"] != first.json()["id"]
+
+
+async def test_rate_limited_submission_gets_429_with_retry_after(api, guard_contact):
+    guard_contact(ip=Limit(rate=1 / 60, burst=2))
+    for number in range(2):
+        assert (await api.post("/api/contact", json={**MESSAGE, "message": str(number)})).status_code == 200
+    response = await api.post("/api/contact", json={**MESSAGE, "message": "third"})
+    assert response.status_code == 429
+    assert 1 <= int(response.headers["retry-after"]) <= 60
+
+
+async def test_concurrent_duplicates_wait_for_the_first_response():
+    guard = FormGuard({"contact": RouteLimits(ip=None, email=None, dedupe_window=30)})
+    release = asyncio.Event()
+
+    async def submit(value):
+        async with guard.submission("contact", request_from(), MESSAGE) as submission:
+            if submission.duplicate is not None:
+                return submission.duplicate
+            await release.wait()
+            submission.result = value
+        return value
+
+    first = asyncio.create_task(submit("first"))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(submit("second"))
+    await asyncio.sleep(0)
+    release.set()
+    assert await asyncio.gather(first, second) == ["first", "first"]
+
+
+async def test_dedupe_entries_expire_by_their_own_window(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ratelimit, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    guard = FormGuard({}, max_recent=100)
+    guard._claim("long", 60)
+    guard._claim("short", 5)
+    now[0] += 10
+    # "short" expired even though the longer-lived entry was claimed before it
+    guard._claim("next", 5)
+    assert set(guard._recent) == {"long", "next"}
+    now[0] += 100
+    guard._claim("last", 5)
+    assert set(guard._recent) == {"last"}
+
+
+async def test_dedupe_window_is_capped_at_max_recent():
+    guard = FormGuard({}, max_recent=2)
+    guard._claim("a", 60)
+    guard._claim("b", 30)
+    guard._claim("c", 60)
+    # At the cap the entry closest to expiry goes first
+    assert set(guard._recent) == {"a", "c"}
@@ -0,0 +1,85 @@
+"""Archiving finished bookings and restoring them, on the memory engine."""
+from datetime import datetime, timedelta
+
+import pytest
+
+import retention
+
+pytestmark = pytest.mark.anyio
+
+OLD = datetime.utcnow() - timedelta(days=400)
+
+
+def booking(booking_id, status="completed", changed_at=OLD):
+    document = {"id": booking_id, "name": "Sam", "status": status, "created_at": OLD - timedelta(days=30)}
+    if changed_at is not None:
+        document["status_changed_at"] = changed_at
+    return document
+
+
+async def seed(db):
+    await db.booking_inquiries.insert_many([
+        booking("done"),
+        booking("declined", status="declined"),
+        # Predates status_changed_at, so created_at decides
+        booking("legacy", changed_at=None),
+        booking("recent", changed_at=datetime.utcnow() - timedelta(days=10)),
+        booking("open", status="confirmed"),
+    ])
+
+
+async def hot_ids(db):
+    return sorted(document["id"] for document in await db.booking_inquiries.find().to_list(None))
+
+
+async def test_dry_run_only_counts(db):
+    await seed(db)
+    assert await retention.archive_bookings(db, days=365, dry_run=True) == {"archived": 0, "pending": 3}
+    assert len(await hot_ids(db)) == 5
+    assert await db.booking_inquiries_archive.count_documents({}) == 0
+
+
+async def test_archive_to_the_collection_and_restore(db):
+    await seed(db)
+    result = await retention.archive_bookings(db, days=365, batch_size=2)
+    assert (result["archived"], result["batches"], result["file"]) == (3, 2, None)
+    assert await hot_ids(db) == ["open", "recent"]
+    assert await db.booking_inquiries_archive.count_documents({}) == 3
+
+    assert await retention.restore_bookings(db, ids=["done"]) == {"restored": 1}
+    assert await hot_ids(db) == ["done", "open", "recent"]
+    assert await db.booking_inquiries_archive.count_documents({}) == 2
+    assert await retention.restore_bookings(db) == {"restored": 2}
+    assert await db.booking_inquiries_archive.count_documents({}) == 0
+
+
+async def test_archive_to_a_file_and_restore(db, tmp_path):
+    await seed(db)
+    result = await retention.archive_bookings(db, days=365, target="ndjson", out_dir=tmp_path, batch_size=2)
+    assert result["archived"] == 3
+    assert [path.name for path in tmp_path.iterdir()] == [result["file"].rsplit("/", 1)[-1]]
+    assert await hot_ids(db) == ["open", "recent"]
+
+    restored = await retention.restore_bookings(db, result["file"], ids=["legacy", "done"])
+    assert restored == {"restored": 2}
+    # Running it again only meets bookings that are already back
+    assert await retention.restore_bookings(db, result["file"]) == {"restored": 1}
+    assert await hot_ids(db) == ["declined", "done", "legacy", "open", "recent"]
+    stored = await db.booking_inquiries.find_one({"id": "done"})
+    assert stored["status_changed_at"] == OLD.replace(microsecond=OLD.microsecond // 1000 * 1000)
+
+
+async def test_restored_bookings_are_not_archived_again(db, tmp_path):
+    await seed(db)
+    await retention.archive_bookings(db, days=365)
+    await retention.restore_bookings(db)
+    stored = await db.booking_inquiries.find_one({"id": "done"})
+    assert datetime.utcnow() - stored["restored_at"] < timedelta(minutes=1)
+
+    assert (await retention.archive_bookings(db, days=365))["archived"] == 0
+    assert (await retention.archive_bookings(db, days=365, dry_run=True))["pending"] == 0
+    assert len(await hot_ids(db)) == 5
+    # Once the restore itself is older than the cutoff they go again, with
+    # "recent" now past it too
+    assert (await retention.archive_bookings(db, days=-1))["archived"] == 4
+    assert await hot_ids(db) == ["open"]
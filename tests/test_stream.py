@@ -0,0 +1,65 @@
+"""StreamPublisher fan-out, overflow and Last-Event-ID replay."""
+import json
+
+import pytest
+
+from stream import StreamPublisher
+
+pytestmark = pytest.mark.anyio
+
+
+async def received(publisher, subscription):
+    """Messages a subscriber gets, as (event id, event name, data); ends the stream first."""
+    subscription.close()
+    messages = []
+    async for chunk in publisher.messages(subscription):
+        if chunk.startswith(b"retry:"):
+            continue
+        fields = dict(line.split(": ", 1) for line in chunk.decode().strip().split("\n"))
+        messages.append((fields.get("id"), fields["event"], json.loads(fields["data"])))
+    return messages
+
+
+async def test_subscribers_get_only_their_topics():
+    publisher = StreamPublisher()
+    events = publisher.subscribe(["events"])
+    both = publisher.subscribe(["events", "bookings"])
+    publisher.publish("events", {"op": "deleted", "id": "1"})
+    publisher.publish("bookings", {"op": "deleted", "id": "b1"})
+    assert [message[1:] for message in await received(publisher, events)] == [
+        ("events", {"op": "deleted", "id": "1"}),
+    ]
+    assert [message[1] for message in await received(publisher, both)] == ["events", "bookings"]
+    assert publisher.stats()["subscribers"] == 0
+
+
+async def test_subscriber_that_falls_behind_gets_a_reset():
+    publisher = StreamPublisher(buffer_size=2)
+    subscription = publisher.subscribe(["events"])
+    for number in range(3):
+        publisher.publish("events", {"op": "deleted", "id": str(number)})
+    # The two buffered deltas are incomplete without the third, so only the reset is sent
+    assert await received(publisher, subscription) == [
+        (f"{publisher.epoch}-3", "reset", {"topics": ["events"]}),
+    ]
+
+
+async def test_last_event_id_replays_what_was_missed():
+    publisher = StreamPublisher()
+    for number in range(3):
+        publisher.publish("events", {"op": "deleted", "id": str(number)})
+    publisher.publish("bookings", {"op": "deleted", "id": "b1"})
+    subscription = publisher.subscribe(["events"], last_event_id=f"{publisher.epoch}-1")
+    publisher.publish("events", {"op": "deleted", "id": "live"})
+    assert [(event_id, data["id"]) for event_id, _, data in await received(publisher, subscription)] == [
+        (f"{publisher.epoch}-2", "1"), (f"{publisher.epoch}-3", "2"), (f"{publisher.epoch}-5", "live"),
+    ]
+
+
+@pytest.mark.parametrize("last_event_id", ["0000-1", "{epoch}-99", "{epoch}-x", "{epoch}-0"])
+async def test_unknown_or_expired_event_id_gets_a_reset(last_event_id):
+    publisher = StreamPublisher(history=2)
+    for number in range(4):
+        publisher.publish("events", {"op": "deleted", "id": str(number)})
+    subscription = publisher.subscribe(["events"], last_event_id.format(epoch=publisher.epoch))
+    assert [event for _, event, _ in await received(publisher, subscription)] == ["reset"]
@@ -0,0 +1,87 @@
+"""WriteBehindQueue batching, draining and failed flushes."""
+import logging
+
+import pytest
+from pymongo.errors import AutoReconnect
+
+from write_behind import WriteBehindQueue
+
+pytestmark = pytest.mark.anyio
+
+
+class FlakyCollection:
+    """Fails the first ``failures`` insert_many calls, then hands them to ``collection``."""
+
+    def __init__(self, collection, failures):
+        self.collection = collection
+        self.failures = failures
+        self.calls = 0
+
+    async def insert_many(self, documents, **kwargs):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise AutoReconnect("connection reset")
+        return await self.collection.insert_many(documents, **kwargs)
+
+
+async def stored_ids(collection):
+    return sorted(document["id"] for document in await collection.find().to_list(None))
+
+
+async def test_drain_flushes_without_waiting_for_the_interval(db):
+    queue = WriteBehindQueue("contact_messages", max_batch=100, flush_interval=60)
+    queue.start(db.contact_messages)
+    for number in range(5):
+        await queue.submit({"id": f"m{number}"})
+    await queue.drain()
+    assert await stored_ids(db.contact_messages) == ["m0", "m1", "m2", "m3", "m4"]
+    assert queue.stats() == {
+        "name": "contact_messages", "running": False, "queued": 0, "flushed": 5, "batches": 1, "failed": 0,
+    }
+    with pytest.raises(RuntimeError):
+        await queue.submit({"id": "late"})
+
+
+async def test_full_batches_are_written_before_the_interval(db):
+    queue = WriteBehindQueue("contact_messages", max_batch=2, flush_interval=60)
+    queue.start(db.contact_messages)
+    for number in range(5):
+        await queue.submit({"id": f"m{number}"})
+    await queue.drain()
+    assert len(await stored_ids(db.contact_messages)) == 5
+    assert queue.batches == 3
+
+
+async def test_failed_flush_is_retried(db):
+    collection = FlakyCollection(db.contact_messages, failures=1)
+    queue = WriteBehindQueue("contact_messages", flush_interval=60, max_retries=2)
+    queue.start(collection)
+    await queue.submit({"id": "m1"})
+    await queue.drain()
+    assert collection.calls == 2
+    assert await stored_ids(db.contact_messages) == ["m1"]
+    assert (queue.flushed, queue.failed) == (1, 0)
+
+
+async def test_flush_that_keeps_failing_is_counted_and_logged(db, caplog):
+    queue = WriteBehindQueue("contact_messages", flush_interval=60, max_retries=1)
+    queue.start(FlakyCollection(db.contact_messages, failures=1))
+    await queue.submit({"id": "m1"})
+    await queue.submit({"id": "m2"})
+    with caplog.at_level(logging.ERROR, logger="write_behind"):
+        await queue.drain()
+    assert await stored_ids(db.contact_messages) == []
+    assert (queue.flushed, queue.failed) == (0, 2)
+    assert "Dropped contact_messages documents after 1 attempts: ['m1', 'm2']" in caplog.text
+
+
+async def test_duplicates_count_as_stored(db):
+    await db.contact_messages.insert_one({"_id": "dup", "id": "m0"})
+    queue = WriteBehindQueue("contact_messages", flush_interval=60)
+    queue.start(db.contact_messages)
+    # Stored by an earlier attempt that lost its reply
+    await queue.submit({"_id": "dup", "id": "m0"})
+    await queue.submit({"_id": "new", "id": "m1"})
+    await queue.drain()
+    assert await stored_ids(db.contact_messages) == ["m0", "m1"]
+    assert (queue.flushed, queue.failed) == (2, 0)